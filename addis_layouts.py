@@ -12,6 +12,8 @@ import plotly.express as px
 from config import brand_colors, header_style, kpi_card_style_2, card_style
 from shared_components import sidebar_addis as sidebar, city_selector
 from dashboard_components import create_nutrition_kpi_card, create_price_volatility_kpi_card
+from data_io import read_table
+from data_registry import registry
 
 
 def _red_graph_loading(children, loading_id=None):
@@ -37,9 +39,7 @@ def _red_graph_loading(children, loading_id=None):
 
 def stakeholders_tab_layout():
     """Addis Ababa stakeholders tab layout"""
-    # Import data at runtime to avoid circular imports
-    import app as main
-    df_sh = main.df_sh
+    df_sh = registry.get("addis", "stakeholders")
     
     return html.Div([
         city_selector(selected_city='addis', visible=False),  # Hidden but present for callback
@@ -290,8 +290,10 @@ def supply_tab_layout():
 
 def poverty_tab_layout():
     """Addis Ababa poverty tab layout"""
+    # Import constants at runtime to avoid circular imports
     import app as main
-    variables = main.variables
+    MPI = registry.get("addis", "mpi")
+    variables = [v for v in main.mpi_vars if v in MPI.columns]
     
     return html.Div([
         city_selector(selected_city='addis', visible=False),  # Hidden but present for callback
@@ -393,13 +395,22 @@ def poverty_tab_layout():
         # Right panel: map, full height
         html.Div([
             _red_graph_loading(
-                dcc.Graph(
-                    id='map',
-                    config={"displayModeBar": False, "scrollZoom": True, "responsive": True},
-                    style={"height": "100%",
-                           "width": "100%",
-                           "padding": "0",
-                           "margin": "0"}),
+                [
+                    # Figure for the variable (map-rendered: the variable and LOD
+                    # it was built at), and the district centroids a bar click
+                    # recentres on; combined into map in the browser
+                    # (assets/mpi_highlight.js).
+                    dcc.Store(id='map-figure'),
+                    dcc.Store(id='map-rendered'),
+                    dcc.Store(id='map-centroids', data=registry.get("addis", "mpi_centroids")),
+                    dcc.Graph(
+                        id='map',
+                        config={"displayModeBar": False, "scrollZoom": True, "responsive": True},
+                        style={"height": "100%",
+                               "width": "100%",
+                               "padding": "0",
+                               "margin": "0"}),
+                ],
                 loading_id="loading-map-addis",
             )
         ], style={
@@ -427,7 +438,7 @@ def poverty_tab_layout():
 def affordability_tab_layout():
     """Addis Ababa affordability tab layout"""
     import app as main
-    outlets_geojson_files = main.outlets_geojson_files_addis
+    outlets_geojson_files = registry.get("addis", "outlet_files")
     data_labels_food_env = main.data_labels_food_env
     cols_food_env = main.cols_food_env
     
@@ -564,6 +575,11 @@ def affordability_tab_layout():
 
                 # Right panel: map, full height
                 html.Div([
+                    # What the map currently shows, so callbacks can patch it instead of
+                    # re-sending the commune geometry; resets with the tab like the graph.
+                    dcc.Store(id='affordability-map-rendered'),
+                    # The figure, handed to the graph by assets/vector_tiles.js
+                    dcc.Store(id='affordability-map-figure'),
                     _red_graph_loading(
                         html.Div(
                             dcc.Graph(
@@ -606,8 +622,7 @@ def affordability_tab_layout():
 
 def sustainability_tab_layout():
     """Addis Ababa sustainability tab layout"""
-    import app as main
-    df_indicators = main.df_indicators
+    df_indicators = registry.get("addis", "sdg_indicators")
     
     display_cols = ['Dimensions', 'Components', 'Indicators', 'SDG impact area/target', 'SDG Numbers']
     df_display = df_indicators[display_cols]
@@ -800,8 +815,7 @@ def sustainability_tab_layout():
 
 def policies_tab_layout():
     """Addis Ababa policies tab layout"""
-    import app as main
-    df_policies = main.df_policies_addis
+    df_policies = registry.get("addis", "policies")
     
     return html.Div([
         city_selector(selected_city='addis', visible=False),  # Hidden but present for callback
@@ -1005,8 +1019,7 @@ def health_nutrition_tab_layout():
 
 def footprints_tab_layout():
     """Addis Ababa environmental footprints tab layout"""
-    import app as main
-    df_lca = main.df_lca
+    df_lca = registry.get("addis", "lca")
     
     return html.Div([
         city_selector(selected_city='addis', visible=False),  # Hidden but present for callback
@@ -1075,8 +1088,6 @@ def footprints_tab_layout():
 
 def addis_resilience_tab_layout(default_view=None):
     """Addis Ababa resilience tab layout with Socio-Economic Shocks (price volatility)"""
-    import app as main
-    
     # Load price volatility data
     volatility_csv_path = os.path.join(
         os.path.dirname(__file__), 
@@ -1090,12 +1101,12 @@ def addis_resilience_tab_layout(default_view=None):
     )
     
     try:
-        df_volatility = pd.read_csv(volatility_csv_path)
+        df_volatility = read_table(volatility_csv_path)
     except Exception as e:
         df_volatility = pd.DataFrame()
     
     try:
-        df_ufpri = pd.read_csv(ufpri_csv_path)
+        df_ufpri = read_table(ufpri_csv_path)
     except Exception as e:
         df_ufpri = pd.DataFrame()
     
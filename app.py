@@ -1,30 +1,21 @@
 import os
-import csv
-from functools import lru_cache
+import startup_trace
 import numpy as np
-import xarray as xr
-import rioxarray as rxr
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
 import pandas as pd
 import geopandas as gpd
-from shapely.ops import unary_union
-import seaborn as sns
 import plotly.express as px
 import json
 import dash
-from dash import Dash, html, dcc, Output, Input, State, callback, dash_table, ALL
+from dash import Dash, html, dcc, Output, Input, State, ALL, ClientsideFunction
 import dash_bootstrap_components as dbc
 import dash_auth  
-import dash_leaflet as dl
-from dash_extensions.javascript import assign
-import random
-from matplotlib.colors import ListedColormap, LinearSegmentedColormap
 import plotly.graph_objects as go
 import plotly.colors as pc
 import plotly.io as pio
-from plotly.subplots import make_subplots
-from lorem_text import lorem
+
+# Keep heavy libraries off the import path: import them inside the functions
+# that need them (see importtime.py for the startup budget check).
+startup_trace.checkpoint("import third-party libraries")
 
 import warnings
 warnings.filterwarnings("ignore")
@@ -39,10 +30,26 @@ _ESRI_TILE = {
     "source": ["https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}"],
 }
 
-from dashboard_components import create_nutrition_kpi_card
+from data_io import read_table, read_vector, read_report, source_files
+from data_manifest import cached_builder
+from data_reload import pin_requests_to_generation, register_admin_routes, start_watcher
+from figure_optimizer import encode_array, register_figure_optimizer
+from geojson_encoder import feature_collection
+import geometry_meta
+import mpi_districts
+import mpi_ranking
+from geometry_lod import LOD_ZOOMS, is_finer, lod_for_zoom, simplify_gdf, simplify_geojson, zoom_from_relayout
+from isochrone_store import union_categories
+import outlet_store
+import outlet_clusters
+from outlet_clusters import register_cluster_routes
+import coverage_raster
+from topojson_codec import encode_topology, figure_payload
+import vector_tiles
+from vector_tiles import register_tile_routes, tile_url
 import addis_config
 import hanoi_config
-from shared_components import sidebar, footer, city_selector
+from shared_components import footer, city_selector
 from addis_layouts import (
     stakeholders_tab_layout, supply_tab_layout, poverty_tab_layout,
     affordability_tab_layout, sustainability_tab_layout, policies_tab_layout,
@@ -58,6 +65,7 @@ from hanoi_layouts import (
     render_temporal_resilience_layout,
     render_lulc_resilience_layout,
 )
+startup_trace.checkpoint("import dashboard modules")
 
 app = Dash(__name__, suppress_callback_exceptions=True, external_stylesheets=[dbc.themes.BOOTSTRAP])
 app.server.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -70,84 +78,141 @@ auth = dash_auth.BasicAuth(
     {VALID_USERNAME: VALID_PASSWORD}
 )
 
-
-def _path_mtime(path):
-    try:
-        return os.path.getmtime(path)
-    except OSError:
-        return 0.0
+# Requests stay on one dataset generation; POST /admin/reload (only with
+# ADMIN_RELOAD_TOKEN set) or the DATA_WATCH_INTERVAL_S watcher swaps in a
+# new one. See data_reload.py. The watcher is started per serving process:
+# by gunicorn.conf.py:post_worker_init, or below for the dev server, never at
+# import (a preloading gunicorn master would fork with it running).
+pin_requests_to_generation(app.server)
+register_admin_routes(app.server)
+# Typed arrays, rounded coordinates and template stripping for every figure response.
+register_figure_optimizer(app.server)
+# /tiles/<city>/<layer>/<z>/<x>/<y>.pbf for the food-environment overlays.
+register_tile_routes(app.server)
+# /clusters/<city>/<z> for zoom-aware outlet clusters.
+register_cluster_routes(app.server)
+startup_trace.checkpoint("create Dash app")
 
 
 def _figure_from_json(fig_json):
     return pio.from_json(fig_json) if fig_json else go.Figure()
 
 
-@lru_cache(maxsize=96)
-def _read_geojson_cached(path):
-    return gpd.read_file(path).to_crs("EPSG:4326")
+@cached_builder(lambda path, columns=None: [path], maxsize=96)
+def _read_geojson_cached(path, columns=None):
+    return read_vector(path, columns=columns)
+
+
+def _food_env_deps(city_key):
+    return {
+        "addis": [food_env_path],
+        "hanoi": [food_env_path_hanoi, food_env_values_path_hanoi],
+    }.get(city_key, [])
 
 
-def _load_food_env_layer(geojson_path, values_csv_path=None, join_key_candidates=None):
-    if not os.path.exists(geojson_path):
+@cached_builder(lambda city_key, level=None: _food_env_deps(city_key), maxsize=2 * (len(LOD_ZOOMS) + 1), persist=True)
+def _get_food_env_features(city_key, level=None):
+    gdf = registry.get(city_key, "food_env") if city_key in {"addis", "hanoi"} else None
+    if gdf is None:
         return None
 
-    gdf = gpd.read_file(geojson_path).to_crs("EPSG:4326")
+    keep_cols = [c for c in ["Dist_Name", "Dist_name", "shapeName", "district", "name", "ma_xa"] if c in gdf.columns]
+    return feature_collection(simplify_gdf(gdf[keep_cols + ["geometry"]], level), keep_cols)
 
-    if values_csv_path and os.path.exists(values_csv_path):
-        try:
-            candidate_keys = list(join_key_candidates or [])
-            dtype_map = {col: "string" for col in candidate_keys}
-            df_values = pd.read_csv(values_csv_path, dtype=dtype_map, keep_default_na=False)
-            join_key = next(
-                (col for col in candidate_keys if col in gdf.columns and col in df_values.columns),
-                None,
-            )
-            if join_key:
-                gdf[join_key] = gdf[join_key].astype("string").str.strip()
-                df_values[join_key] = df_values[join_key].astype("string").str.strip()
 
-                df_values = df_values[df_values[join_key].notna() & (df_values[join_key] != "")].copy()
-                df_values = df_values.drop_duplicates(subset=[join_key])
+def _mpi_deps(city_key, level=None):
+    return {
+        "addis": [os.path.join(addis_mpi_dir, "addis_districts_MPI.geojson")],
+        "hanoi": [
+            os.path.join(hanoi_mpi_dir, "hanoi_communes.geojson"),
+            os.path.join(hanoi_mpi_dir, "hanoi_communes_MPI_long.csv"),
+        ],
+    }.get(city_key, [])
 
-                gdf = gdf.merge(df_values, on=join_key, how="left")
-                gdf = gpd.GeoDataFrame(gdf, geometry="geometry", crs="EPSG:4326")
-            else:
-                print(f"[WARN] No common join key found for food environment layer: {geojson_path}")
-        except Exception as exc:
-            print(f"[WARN] Could not merge food environment values from CSV: {exc}")
 
-    return gdf
+@cached_builder(_mpi_deps, maxsize=2 * len(LOD_ZOOMS), persist=True)
+def _get_mpi_geojson_lod(city_key, level):
+    return feature_collection(simplify_gdf(registry.get(city_key, "mpi"), level))
 
 
-@lru_cache(maxsize=4)
-def _get_food_env_geojson(city_key):
-    gdf = gdf_food_env if city_key == "addis" else gdf_food_env_hanoi if city_key == "hanoi" else None
-    if gdf is None:
-        return None
+def _mpi_geojson_for_level(city_key, level):
+    """MPI choropleth GeoJSON at LOD level (None: full detail)."""
+    if level is None:
+        return registry.get(city_key, "mpi_geojson")
+    return _get_mpi_geojson_lod(city_key, level)
 
-    keep_cols = [c for c in ["Dist_Name", "Dist_name", "shapeName", "district", "name", "ma_xa"] if c in gdf.columns]
-    slim_gdf = gdf[keep_cols + ["geometry"]].copy() if keep_cols else gdf[["geometry"]].copy()
-    return slim_gdf.to_json()
 
+def _refined_lod(relayout_data, rendered):
+    """(True, LOD) when a map zoomed to relayout_data needs finer geometry than rendered["lod"], else (False, None).
+
+    Zooming out keeps the finer geometry already on screen.
+    """
+    lod = lod_for_zoom(zoom_from_relayout(relayout_data, None) or 0)
+    if not rendered or not is_finer(lod, rendered.get("lod")):
+        return False, None
+    return True, lod
+
+
+_MPI_ID_PROPERTY = {"addis": "Dist_Name", "hanoi": "ma_xa"}
+
+# Zoom the MPI maps recentre at on a bar click (MPI_FOCUS_ZOOM in
+# assets/mpi_highlight.js).
+MPI_FOCUS_ZOOM = 10
 
-@lru_cache(maxsize=48)
-def _build_isochrone_union_geojson(isochrones_path_local, selected_isochrones_key):
+
+@cached_builder(
+    lambda isochrones_path_local, selected_isochrones_key, level=None: [
+        os.path.join(isochrones_path_local, filename) for filename in (selected_isochrones_key or ())
+    ],
+    maxsize=48,
+    persist=True,
+)
+def _build_isochrone_union_features(isochrones_path_local, selected_isochrones_key, level=None):
     if not selected_isochrones_key:
         return None
 
-    geoms = []
-    for filename in selected_isochrones_key:
-        path = os.path.join(isochrones_path_local, filename)
-        if os.path.exists(path):
-            gdf = _read_geojson_cached(path)
-            geoms.extend([geom for geom in gdf.geometry if geom is not None and not geom.is_empty])
-
-    if not geoms:
+    # One pre-dissolved polygon per category (see isochrone_store.py)
+    unioned = union_categories(isochrones_path_local, selected_isochrones_key)
+    if unioned is None:
         return None
 
-    unioned = unary_union(geoms)
     union_gdf = gpd.GeoDataFrame({"geometry": [unioned]}, crs="EPSG:4326")
-    return union_gdf.to_json()
+    return feature_collection(simplify_gdf(union_gdf, level))
+
+
+@cached_builder(coverage_raster.sources, maxsize=2)
+def _get_food_env_layer(city_key):
+    """Food-environment layer with any missing access metrics filled in from the coverage rasters."""
+    gdf = registry.get(city_key, "food_env")
+    if gdf is None:
+        return None
+    missing = [col for col in ACCESS_METRIC_GROUPS if col not in gdf.columns]
+    if not missing:
+        return gdf
+    gdf = gdf.copy()
+    try:
+        for col in missing:
+            by_area, _ = coverage_raster.access_share(city_key, coverage_raster.OUTLET_GROUPS[ACCESS_METRIC_GROUPS[col]])
+            gdf[col] = by_area.astype("float32")
+    except Exception as exc:
+        print(f"[WARN] Could not compute access metrics for {city_key}: {exc}")
+    return gdf
+
+
+def _access_annotations(city_key, selected_outlets):
+    """Map annotation with the share of residents within 30 minutes of the selected outlet types."""
+    if not city_key or not selected_outlets:
+        return []
+    try:
+        _, share = coverage_raster.access_share(city_key, selected_outlets)
+    except Exception as exc:
+        print(f"[WARN] Could not compute outlet access for {city_key}: {exc}")
+        return []
+    return [dict(
+        text=f"<b>{share:.1f}%</b> of residents live within 30 min of the selected outlet types",
+        x=0.99, y=0.01, xref="paper", yref="paper", xanchor="right", yanchor="bottom",
+        showarrow=False, align="right", bgcolor='rgba(255,255,255,0.8)', font=dict(size=12),
+    )]
 
 #colors = {
 #  'eco_green': '#AFC912',
@@ -181,13 +246,13 @@ plotting_palette_cat = [
     "#d33030",
 ]
 
-_cmap_full = plt.get_cmap('RdYlBu_r')
-_cmap = mcolors.LinearSegmentedColormap.from_list(
-    'RdYlGn_r_clipped',
-    _cmap_full(np.linspace(0.25, 1.0, 256))
-)
-
-drought_colorscale = [[round(i/9, 2), mcolors.to_hex(_cmap(i/9))] for i in range(10)]
+# Precomputed from matplotlib's RdYlBu_r clipped to [0.25, 1.0] and sampled at
+# 10 evenly spaced stops, so matplotlib is not needed at startup.
+drought_colorscale = [
+    [0.0, '#90c3dd'], [0.11, '#bde2ee'], [0.22, '#e5f5ef'], [0.33, '#fffebe'],
+    [0.44, '#fee597'], [0.56, '#fdbf71'], [0.67, '#f88c51'], [0.78, '#ea5739'],
+    [0.89, '#ce2827'], [1.0, '#a50026'],
+]
 
 
 tabs = [
@@ -205,49 +270,15 @@ tabs = [
 ]
 
 # -------------------------- Loading and Formatting All Data ------------------------- #
+# Datasets are loaded lazily through the (city, domain) registry in data_registry.py.
+
+from data_registry import (
+    registry, parse_preload_spec,
+    data_root, addis_mpi_dir, hanoi_mpi_dir, hanoi_resilience_dir, hanoi_climate_dir,
+    isochrones_path, isochrones_path_hanoi,
+    food_env_path, food_env_path_hanoi, food_env_values_path_hanoi,
+)
 
-homepath = os.path.dirname(os.path.abspath(__file__))
-data_root = os.path.join(homepath, "assets", "data")
-
-addis_root = os.path.join(data_root, "addis")
-addis_mpi_dir = os.path.join(addis_root, "mpi")
-addis_stakeholders_dir = os.path.join(addis_root, "stakeholders")
-addis_food_env_dir = os.path.join(addis_root, "food_environment")
-addis_policy_dir = os.path.join(addis_root, "policy")
-addis_environment_dir = os.path.join(addis_root, "environment")
-
-hanoi_root = os.path.join(data_root, "hanoi")
-hanoi_mpi_dir = os.path.join(hanoi_root, "mpi")
-hanoi_stakeholders_dir = os.path.join(hanoi_root, "stakeholders")
-hanoi_policy_dir = os.path.join(hanoi_root, "policy")
-hanoi_supply_dir = os.path.join(hanoi_root, "supply_chain")
-hanoi_affordability_dir = os.path.join(hanoi_root, "affordability")
-hanoi_nutrition_dir = os.path.join(hanoi_root, "nutrition")
-hanoi_food_env_dir = os.path.join(hanoi_root, "food_environment")
-hanoi_resilience_dir = os.path.join(hanoi_root, "resilience")
-hanoi_climate_dir = os.path.join(hanoi_resilience_dir, "precomputed_hanoi_climate_vars")
-atlas_csv_path = os.path.join(homepath, "EcoFoodSystems_indicator_architecture - 260326 - Hanoi_rewritten_descriptions_final.csv")
-
-# Loading and Formatting MPI Data
-MPI = gpd.read_file(os.path.join(addis_mpi_dir, "addis_districts_MPI.geojson"))#.set_index('Dist_Name')
-MPI['Multidimensional Poverty Index'] = MPI['Multidimensional Poverty Index'].astype(float)
-MPI['Dist_Name'] = MPI['Dist_Name'].astype(str)
-geojson = json.loads(MPI.to_json())
-
-# Loading and Formatting MPI CSV Data=
-# Detect numeric columns in the GeoJSON and coerce to numeric where possible
-geo_vars = []
-for _col in MPI.columns:
-    if _col in ['geometry', 'Dist_Name']:
-        continue
-    coerced = pd.to_numeric(MPI[_col], errors='coerce')
-    if coerced.notna().any():
-        MPI[_col] = coerced
-        geo_vars.append(_col)
-
-# Loading and Formatting MPI CSV Data (fallback)
-df_mpi = pd.read_csv(os.path.join(addis_mpi_dir, "addis_mpi_long.csv"))
-vars_csv = list(df_mpi['Variable'].unique())
 # Universal list of MPI variables (source of truth for dropdown ordering)
 mpi_vars = [
     'Multidimensional Poverty Index',
@@ -259,43 +290,16 @@ mpi_vars = [
     'Electricity'
 ]
 
-# For Addis, use the universal list but only include variables present in the GeoDataFrame
-variables = [v for v in mpi_vars if v in MPI.columns]
-
-# Loading and Formatting Food Systems Stakeholders Data
-df_sh = pd.read_csv(os.path.join(addis_stakeholders_dir, "addis_stakeholders_cleaned.csv")).dropna(how='any').astype(str)
-df_sh.rename(columns={'Area of Activity (Food Systems Value Chain)': 'Area of Activity'}, inplace=True)
-
-# Format Website column as clickable markdown links
-if 'Website' in df_sh.columns:
-    df_sh['Website'] = df_sh['Website'].apply(
-        lambda x: f'[Link Available]({x})' if x and x.startswith('http') else '--'
-    )
-
-# Pre-calculate fixed column widths (6px per character, min 80px, max 200px)
-column_widths = {}
-for col in df_sh.columns:
-    max_len = max(len(str(col)), df_sh[col].astype(str).str.len().max())
-    column_widths[col] = min(max(max_len * 6, 80), 200)
-
-total_table_width = sum(column_widths.values())
-
-# Loading GeoJSON files for Food Outlets
-outlets_path = os.path.join(addis_food_env_dir, "jsons_addis_foodoutlets")
-outlets_geojson_files_addis = sorted(os.listdir(outlets_path))
-
-# Loading GeoJSON files for Isochrones (30-minute accessibility polygons)
-isochrones_path = os.path.join(addis_food_env_dir, "isochrones_addis")
-isochrones_geojson_files_addis = sorted(os.listdir(isochrones_path)) if os.path.exists(isochrones_path) else []
-food_env_path = os.path.join(addis_food_env_dir, "addis_diet_env_mapping.geojson")
-gdf_food_env = gpd.read_file(food_env_path).to_crs('EPSG:4326')
-
 # Define food environment metrics and their labels
 cols_food_env = ['density_healthyout', 'density_unhealthyout', 'density_mixoutlets',
-                 'ratio_obesogenic'] #, 'pct_access_healthy', 'ptc_access_unhealthy']
+                 'ratio_obesogenic', 'pct_access_healthy', 'ptc_access_unhealthy']
 
 data_labels_food_env = ['Healthy Outlet Density', 'Unhealthy Outlet Density', 'Mixed Outlet Density',
-                        'Obesogenic Ratio'] #, 'Percent Access to Healthy Food', 'Percent Access to Unhealthy Food']
+                        'Obesogenic Ratio', 'Percent Access to Healthy Food', 'Percent Access to Unhealthy Food']
+
+# Access metrics computed from the isochrone coverage rasters (coverage_raster.py)
+# when a city's food-environment layer does not ship them.
+ACCESS_METRIC_GROUPS = {'pct_access_healthy': 'healthy', 'ptc_access_unhealthy': 'unhealthy'}
 
 # Define which metrics are "good" when higher (True) or "bad" when higher (False)
 metric_direction = {
@@ -344,149 +348,15 @@ FOOD_ENV_NEUTRAL_BONE_SCALE = [
     [1.00, "#c5b395"],
 ]
 
-# Loading supply flow data for Sankey Diagram
-df_sankey = pd.read_csv(os.path.join(hanoi_supply_dir, 'hanoi_supply.csv'))
-
-df_policies_addis = pd.read_csv(os.path.join(addis_policy_dir, 'addis_policy_database.csv')).drop('Unnamed: 0',axis=1)
-# Ensure link columns render as markdown links in the DataTable
-if 'Document Link' in df_policies_addis.columns:
-    df_policies_addis['Document Link'] = df_policies_addis['Document Link'].apply(
-        lambda x: f'[Link Available]({x})' if x and str(x).startswith('http') else '--'
-    )
-
-if 'Available website' in df_policies_addis.columns:
-    df_policies_addis['Available website'] = df_policies_addis['Available website'].apply(
-        lambda x: f'[Link Available]({x})' if x and str(x).startswith('http') else '--'
-    )
-
-df_indicators = pd.read_csv(os.path.join(addis_policy_dir, 'addis_policy_database_expanded_sdg.csv'))
-
-# Create SDG logos as list of numbers for rendering
-def get_sdg_numbers(row):
-    sdg_cols = ['SDG_1', 'SDG_2', 'SDG_3', 'SDG_4', 'SDG_5']
-    sdg_numbers = []
-    for col in sdg_cols:
-        if pd.notna(row[col]) and str(row[col]).strip():
-            # Extract just the number (e.g., "1.3.1" -> "1", "2.1" -> "2")
-            sdg_num = str(row[col]).split('.')[0]
-            if sdg_num.isdigit() and sdg_num not in sdg_numbers:
-                sdg_numbers.append(sdg_num)
-    return ', '.join(sdg_numbers) if sdg_numbers else '--'
-
-df_indicators['SDG Numbers'] = df_indicators.apply(get_sdg_numbers, axis=1)
-
-df_env = pd.read_csv(os.path.join(addis_environment_dir, 'addis_lca_pivot.csv'))
-df_lca = df_env  # Alias for compatibility
-
-# -------------------------- Loading Hanoi Data ------------------------- #
-
-# Hanoi MPI Data (commune level)
-MPI_hanoi = gpd.read_file(os.path.join(hanoi_mpi_dir, "hanoi_communes.geojson"))
-MPI_hanoi['Name'] = MPI_hanoi['Name'].astype(str)
-MPI_hanoi['ma_xa'] = MPI_hanoi['ma_xa'].astype(str)
-
-# Load long-format MPI CSV and pivot to wide, then merge into GeoDataFrame
-df_mpi_hanoi = pd.read_csv(os.path.join(hanoi_mpi_dir, "hanoi_communes_MPI_long.csv"))
-df_mpi_wide = df_mpi_hanoi.pivot_table(index='Name', columns='Variable', values='Value').reset_index()
-df_mpi_wide.columns.name = None
-MPI_hanoi = MPI_hanoi.merge(df_mpi_wide, on='Name', how='left')
-
-# Detect numeric MPI columns (all columns added from the pivot)
-geo_vars = []
-for _col in MPI_hanoi.columns:
-    if _col in ['geometry', 'Name', 'ma_xa']:
-        continue
-    coerced = pd.to_numeric(MPI_hanoi[_col], errors='coerce')
-    if coerced.notna().any():
-        MPI_hanoi[_col] = coerced
-        geo_vars.append(_col)
-
-geojson_hanoi = json.loads(MPI_hanoi.to_json())
-
-# Hanoi Stakeholders Data
-df_sh_hanoi = pd.read_csv(os.path.join(hanoi_stakeholders_dir, "hanoi_stakeholders.csv")).dropna(how='any').astype(str)
-
-if 'Website' in df_sh_hanoi.columns:
-    df_sh_hanoi['Website'] = df_sh_hanoi['Website'].apply(
-        lambda x: f'[Link Available]({x})' if x and x.startswith('http') else '--'
-    )
-
-# Hanoi policy database
-df_policies_hanoi = pd.read_csv(os.path.join(hanoi_policy_dir, 'hanoi_policy_database_cleaned.csv'))#.drop('Unnamed: 0',axis=1)
-
-if 'Document Link' in df_policies_hanoi.columns:
-    df_policies_hanoi['Document Link'] = df_policies_hanoi['Document Link'].apply(
-        lambda x: f'[Link Available]({x})' if x and str(x).startswith('http') else '--'
-    )
-
-    df_policies_hanoi['Available website'] = df_policies_hanoi['Available website'].apply(
-        lambda x: f'[Link Available]({x})' if x and str(x).startswith('http') else '--'
-    )
-
-# Loading GeoJSON files for Food Outlets
-outlets_path_hanoi = os.path.join(hanoi_food_env_dir, "jsons_hanoi_foodoutlets")
-outlets_geojson_files_hanoi = sorted(os.listdir(outlets_path_hanoi))
-
-# Hanoi food-environment choropleth (minified base geometry + values CSV when available)
-food_env_path_hanoi = os.path.join(hanoi_food_env_dir, "hanoi_diet_env_mapping.geojson")
-food_env_values_path_hanoi = os.path.join(hanoi_food_env_dir, "hanoi_diet_env_mapping_values.csv")
-gdf_food_env_hanoi = None
-try:
-    gdf_food_env_hanoi = _load_food_env_layer(
-        food_env_path_hanoi,
-        food_env_values_path_hanoi,
-        join_key_candidates=["ma_xa", "shapeID", "Dist_Name", "Dist_name"],
-    )
-except Exception as e:
-    print(f"Error loading Hanoi food environment layer: {e}")
-
-# Loading GeoJSON files for Isochrones (30-minute accessibility polygons)
-isochrones_path_hanoi = os.path.join(hanoi_food_env_dir, "isochrones_hanoi")
-isochrones_geojson_files_hanoi = sorted(os.listdir(isochrones_path_hanoi)) if os.path.exists(isochrones_path_hanoi) else []
-
-# Hanoi affordability data
-df_affordability_hanoi = pd.read_csv(os.path.join(hanoi_affordability_dir, 'hanoi_affordability_cleaned.csv'))
-
-# Hanoi dietary data
-df_diet_2_hanoi = pd.read_csv(os.path.join(hanoi_nutrition_dir, 'hanoi_health_nutrition_cleaned.csv'))
-
-
-def _load_indicator_atlas_records(csv_path):
-    if not os.path.exists(csv_path):
-        return []
-    with open(csv_path, newline='', encoding='utf-8-sig') as f:
-        rows = list(csv.reader(f))
-    if len(rows) < 2:
-        return []
-
-    # Find the real header row dynamically (some files include a title/metadata row first).
-    header_idx = None
-    for idx, row in enumerate(rows):
-        normalized = [str(c).strip() for c in row]
-        if 'Domain / Sub-theme' in normalized and 'Indicator name' in normalized:
-            header_idx = idx
-            break
-
-    if header_idx is None:
-        return []
-
-    header = [str(c).strip() for c in rows[header_idx]]
-    records = []
-    for row in rows[header_idx + 1:]:
-        if not any((c or '').strip() for c in row):
-            continue
-        if len(row) < len(header):
-            row = row + [''] * (len(header) - len(row))
-        rec = dict(zip(header, row[:len(header)]))
-        indicator_name = (rec.get('Indicator name') or '').strip()
-        if not indicator_name:
-            continue
-        records.append(rec)
-    return records
-
-
-atlas_records_hanoi = _load_indicator_atlas_records(atlas_csv_path)
 
+# Optionally warm selected datasets at import, e.g. PRELOAD_DATASETS="hanoi" or "all".
+startup_trace.checkpoint("define constants")
+_preload_spec = os.environ.get('PRELOAD_DATASETS', '').strip()
+if _preload_spec:
+    _preload_seconds = registry.preload(parse_preload_spec(_preload_spec))
+    print(f"Preloaded datasets in {_preload_seconds:.2f} s")
+    print(read_report(data_root))
+    startup_trace.checkpoint("preload datasets")
 
 
 # ── District climate indicators ───────────────────────────────────────────────
@@ -498,11 +368,16 @@ _lulc_stats_csv = os.path.join(hanoi_resilience_dir, "lulc_stats.csv")
 _communes_geojson_path = os.path.join(hanoi_mpi_dir, "hanoi_communes.geojson")
 _region_quarterly_path = os.path.join(hanoi_climate_dir, "regional_quarterly_climate.csv")
 _slopes_path = os.path.join(hanoi_climate_dir, "regional_indicator_slopes.csv")
+_static_composites_csv = os.path.join(hanoi_climate_dir, "static_climate_composites.csv")
+
+_RESILIENCE_DEPS = [_climate_csv, _districts_path]
+_LULC_DEPS = [_lulc_stats_csv, _communes_geojson_path]
+_REGION_DEPS = [_region_quarterly_path, _slopes_path]
 
 
-@lru_cache(maxsize=1)
+@cached_builder(_RESILIENCE_DEPS, maxsize=1)
 def _get_resilience_context():
-    district_climate_df = pd.read_csv(_climate_csv).reset_index()
+    district_climate_df = read_table(_climate_csv).reset_index()
     district_climate_df["quarter"] = district_climate_df["quarter"].astype(str)
 
     resilience_gdf = _read_geojson_cached(_districts_path).copy()
@@ -528,23 +403,42 @@ def _get_resilience_context():
     return {
         "district_climate_df": district_climate_df,
         "districts_unique": districts_unique,
-        "resilience_base_geojson": json.loads(districts_unique.to_json()),
         "join_key": join_key,
         "featureidkey": featureidkey,
         "all_quarters": tuple(sorted(district_climate_df["quarter"].unique())),
     }
 
 
-@lru_cache(maxsize=1)
+@cached_builder(_RESILIENCE_DEPS, maxsize=len(LOD_ZOOMS), persist=True)
+def _get_resilience_geojson_lod(level):
+    return feature_collection(simplify_gdf(_get_resilience_context()["districts_unique"], level))
+
+
+@cached_builder([_islands_path], maxsize=len(LOD_ZOOMS) + 1)
+def _get_islands_geojson(level=None):
+    with open(_islands_path) as fh:
+        return simplify_geojson(json.load(fh), level)
+
+
+@cached_builder(_RESILIENCE_DEPS + [_islands_path], maxsize=len(LOD_ZOOMS), persist=True)
+def _get_drought_topology(level):
+    layers = {"districts": _get_resilience_geojson_lod(level)}
+    if os.path.exists(_islands_path):
+        layers["islands"] = _get_islands_geojson(level)
+    return encode_topology(layers, properties=["shapeID", "shapeName"])
+
+
+@cached_builder(_LULC_DEPS, maxsize=1)
 def _get_lulc_context():
     lulc_stats_gdf = None
+    lulc_meta = None
     indicator_options = []
     map_center = {"lat": 21.03, "lon": 105.85}
 
     if os.path.exists(_lulc_stats_csv) and os.path.exists(_communes_geojson_path):
         try:
             communes_gdf = _read_geojson_cached(_communes_geojson_path).copy()
-            lulc_df = pd.read_csv(_lulc_stats_csv)
+            lulc_df = read_table(_lulc_stats_csv)
             lulc_stats_gdf = gpd.GeoDataFrame(
                 pd.concat(
                     [communes_gdf.set_index("Name"), lulc_df.set_index("Name").drop(columns=["ma_xa"], errors="ignore")],
@@ -558,12 +452,9 @@ def _get_lulc_context():
             lulc_stats_gdf = lulc_stats_gdf[lulc_stats_gdf["geometry"].is_valid & ~lulc_stats_gdf["geometry"].is_empty].copy()
             lulc_stats_gdf["__rid"] = lulc_stats_gdf["ma_xa"].astype(str)
 
+            lulc_meta = geometry_meta.metadata_table(lulc_stats_gdf, "Name")
             if not lulc_stats_gdf.empty:
-                minx, miny, maxx, maxy = lulc_stats_gdf.total_bounds
-                map_center = {
-                    "lat": float((miny + maxy) / 2.0),
-                    "lon": float((minx + maxx) / 2.0),
-                }
+                map_center = geometry_meta.view(lulc_meta)["center"]
 
             excluded_lulc_cols = {"Name", "ma_xa", "geometry", "__rid"}
             lulc_columns = []
@@ -580,16 +471,17 @@ def _get_lulc_context():
 
     return {
         "gdf": lulc_stats_gdf,
+        "meta": lulc_meta,
         "indicator_options": indicator_options,
         "map_center": map_center,
     }
 
 
-@lru_cache(maxsize=1)
+@cached_builder(_REGION_DEPS, maxsize=1)
 def _get_region_quarterly_context():
     return {
-        "region_quarterly": pd.read_csv(_region_quarterly_path),
-        "slopes_df": pd.read_csv(_slopes_path),
+        "region_quarterly": read_table(_region_quarterly_path),
+        "slopes_df": read_table(_slopes_path),
     }
 
 # Paths for cached EMDAT parquet files (resilience)
@@ -597,6 +489,7 @@ EMDAT_COUNTS_PQ = os.path.join(hanoi_resilience_dir, "emdat_counts.parquet")
 EMDAT_TOTALS_PQ = os.path.join(hanoi_resilience_dir, "emdat_totals.parquet")
 EMDAT_COUNTS_CSV = os.path.join(hanoi_resilience_dir, "emdat_counts.csv")
 EMDAT_TOTALS_CSV = os.path.join(hanoi_resilience_dir, "emdat_totals.csv")
+_EMDAT_DEPS = [EMDAT_COUNTS_PQ, EMDAT_TOTALS_PQ, EMDAT_COUNTS_CSV, EMDAT_TOTALS_CSV]
 
 def _load_emdat_cached():
     if os.path.exists(EMDAT_COUNTS_PQ) and os.path.exists(EMDAT_TOTALS_PQ):
@@ -619,8 +512,8 @@ def _load_emdat_cached():
 
     return None, None
 
-@lru_cache(maxsize=8)
-def _build_resilience_figure_cached(size_max, counts_pq_mtime, totals_pq_mtime, counts_csv_mtime, totals_csv_mtime):
+@cached_builder(_EMDAT_DEPS, maxsize=8, persist=True)
+def _build_resilience_figure_cached(size_max):
     df_counts, df_totals = _load_emdat_cached()
     fig = build_resilience_figure_from_cache(df_counts=df_counts, df_totals=df_totals, size_max=size_max)
     return fig.to_json()
@@ -628,15 +521,7 @@ def _build_resilience_figure_cached(size_max, counts_pq_mtime, totals_pq_mtime,
 
 def build_resilience_figure_from_cache(df_counts=None, df_totals=None, size_max=40):
     if df_counts is None and df_totals is None:
-        return _figure_from_json(
-            _build_resilience_figure_cached(
-                size_max,
-                _path_mtime(EMDAT_COUNTS_PQ),
-                _path_mtime(EMDAT_TOTALS_PQ),
-                _path_mtime(EMDAT_COUNTS_CSV),
-                _path_mtime(EMDAT_TOTALS_CSV),
-            )
-        )
+        return _figure_from_json(_build_resilience_figure_cached(size_max))
 
     if df_counts is None or df_totals is None:
         df_counts, df_totals = _load_emdat_cached()
@@ -646,6 +531,8 @@ def build_resilience_figure_from_cache(df_counts=None, df_totals=None, size_max=
             empty.update_layout(margin=dict(l=10, r=10, t=10, b=10), height=420)
             return empty
 
+    from plotly.subplots import make_subplots
+
     fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.9, 0.4], vertical_spacing=0.06)
 
     counts = df_counts.copy()
@@ -1370,6 +1257,7 @@ def make_region_kpi_card(region_name, quarter_value, all_values, all_quarters, s
 
 #------------------------- App Layout ----------------------- #
 
+startup_trace.checkpoint("define constants and builders")
 app.layout = html.Div([
     dcc.Loading(
         id="global-page-loader",
@@ -1391,6 +1279,7 @@ app.layout = html.Div([
     "height": "100vh",
     "width": "100vw"
 })
+startup_trace.checkpoint("build app layout")
 
 # ------------------------- Callbacks ------------------------- #
 
@@ -1430,6 +1319,7 @@ def store_selected_city(city):
     
 )
 def update_bar(selected_variable):
+    MPI = registry.get("addis", "mpi")
     # Use only the MPI GeoDataFrame for plotting (no CSV fallback)
     if selected_variable in MPI.columns:
         df_plot = MPI[['Dist_Name', selected_variable]].dropna(subset=[selected_variable]).copy()
@@ -1467,54 +1357,46 @@ def update_bar(selected_variable):
         empty_fig.update_layout(margin=dict(l=10, r=10, t=10, b=72), height=360)
         return empty_fig
 
-# Adding MPI map and linking it to the bar chart via click
+# MPI map for the selected variable. Bar clicks highlight and recentre on a
+# district in the browser (assets/mpi_highlight.js), from the centroids
+# shipped with the layout, without a server round trip. A zoom past what the
+# rendered LOD (map-rendered) is lossless for rebuilds it in finer detail.
 @app.callback(
-    Output('map', 'figure'),
-    Input('bar-plot', 'clickData'),
-    Input('variable-dropdown', 'value')
+    Output('map-figure', 'data'),
+    Output('map-rendered', 'data'),
+    Input('variable-dropdown', 'value'),
+    Input('map', 'relayoutData'),
+    State('map-rendered', 'data')
 )
-def update_map_on_bar_click(clickData, selected_variable):
-    center = {
-        "lat": MPI.geometry.centroid.y.mean(),
-        "lon": MPI.geometry.centroid.x.mean()
-    }
+def update_map(selected_variable, relayout_data=None, rendered=None):
+    lod = lod_for_zoom(10)
+    if rendered:
+        refine, needed = _refined_lod(relayout_data, rendered)
+        if rendered.get("variable") == selected_variable and not refine:
+            return dash.no_update, dash.no_update
+        # Never coarser than what is on screen
+        lod = needed if refine else rendered.get("lod")
+    return _mpi_map_payload_addis(selected_variable, lod), {"variable": selected_variable, "lod": lod}
+
+
+def _mpi_map_payload_addis(selected_variable, lod):
+    MPI = registry.get("addis", "mpi")
+    center = geometry_meta.view(registry.get("addis", "mpi_meta"))["center"]
     zoom = 10
 
-    MPI_display = MPI.copy()
-    MPI_display['opacity'] = 0.7
-    MPI_display['line_width'] = 0.8
-
-    # If a bar is clicked, zoom to that district
-    if clickData and 'points' in clickData:
-        selected_dist = clickData['points'][0]['y']  # y is Dist_Name for horizontal bar
-        match = MPI[MPI['Dist_Name'] == selected_dist]
-        if not match.empty:
-            #centroid = match.geometry.centroid
-            center = {
-                "lat": match.geometry.centroid.y.values[0],
-                "lon": match.geometry.centroid.x.values[0]
-            }
-            #area = match.geometry.area.values[0]
-            #zoom = max(8, min(12, 12 - area * 150))  # Zoom in closer
-            # Highlight: set opacity and line_width for the selected district
-
-            zoom = 10
-            MPI_display.loc[MPI_display['Dist_Name'] == selected_dist, 'opacity'] = 1
-            MPI_display.loc[MPI_display['Dist_Name'] == selected_dist, 'line_width'] = 2
-
     # Choose choropleth column: prefer selected variable if present in GeoJSON, else fall back to 'Multidimensional Poverty Index'
     choropleth_col = selected_variable if selected_variable in MPI.columns else ('Multidimensional Poverty Index' if 'Multidimensional Poverty Index' in MPI.columns else None)
 
     if choropleth_col is None:
         empty_fig = go.Figure()
         empty_fig.update_layout(paper_bgcolor=brand_colors['White'], plot_bgcolor=brand_colors['White'], margin=dict(l=0, r=0, t=0, b=0))
-        return empty_fig
+        return figure_payload(empty_fig, None, {})
 
     labels = {choropleth_col: choropleth_col, 'Dist_Name': 'District Name'}
 
     fig = px.choropleth_mapbox(
         MPI,
-        geojson=geojson,
+        geojson=_mpi_geojson_for_level("addis", lod),
         locations="Dist_Name",
         featureidkey="properties.Dist_Name",
         color=choropleth_col,
@@ -1532,18 +1414,22 @@ def update_map_on_bar_click(clickData, selected_variable):
     fig.update_layout(
     paper_bgcolor=brand_colors['White'],
     plot_bgcolor=brand_colors['White'],
-    margin=dict(l=0, r=0, t=0, b=0)
+    margin=dict(l=0, r=0, t=0, b=0),
+    # Re-sent finer geometry keeps the user's pan and zoom
+    uirevision='mpi-map'
     )
 
-    # Update per-feature opacity and line width upon click to highlight 
-    fig.update_traces(
-        marker=dict(
-            opacity=MPI_display['opacity'],
-            line=dict(width=MPI_display['line_width'], color='black')
-        )
-    )
+    fig.update_traces(marker=dict(opacity=0.7, line=dict(width=0.8, color='black')))
+    return figure_payload(fig, None, {})
 
-    return fig
+
+app.clientside_callback(
+    ClientsideFunction(namespace="mpi", function_name="highlight"),
+    Output('map', 'figure'),
+    Input('map-figure', 'data'),
+    Input('bar-plot', 'clickData'),
+    State('map-centroids', 'data'),
+)
 
 
 
@@ -1552,10 +1438,8 @@ def update_map_on_bar_click(clickData, selected_variable):
     Input('variable-dropdown', 'value')
 )
 def add_outlets_map(selected_variable):
-    center = {
-        "lat": MPI.geometry.centroid.y.mean(),
-        "lon": MPI.geometry.centroid.x.mean()
-    }
+    MPI = registry.get("addis", "mpi")
+    center = geometry_meta.view(registry.get("addis", "mpi_meta"))["center"]
     zoom = 10
 
     # For the outlets map, use the selected variable if available so color matches the main choropleth
@@ -1569,7 +1453,8 @@ def add_outlets_map(selected_variable):
 
     fig = px.choropleth_mapbox(
         MPI,
-        geojson=geojson,
+        # Full detail: this map has no zoom-driven refinement
+        geojson=_mpi_geojson_for_level("addis", None),
         locations="Dist_Name",
         featureidkey="properties.Dist_Name",
         color=choropleth_col,
@@ -1603,6 +1488,7 @@ def add_outlets_map(selected_variable):
     State('selected_slice', 'data')
 )
 def update_pie(filter_by, clickData, current_selected):
+    df_sh = registry.get("addis", "stakeholders")
     if filter_by == 'Area':
         df_count = df_sh['Area of Activity (Food Systems Value Chain)'].value_counts().reset_index()
         df_count.columns = ['name', 'count']
@@ -1645,6 +1531,7 @@ def update_pie(filter_by, clickData, current_selected):
     Input('selected_slice', 'data')
 )
 def filter_table(filter_by, selected):
+    df_sh = registry.get("addis", "stakeholders")
     if selected:
         if filter_by == 'Area':
             df_filtered = df_sh[df_sh['Area of Activity (Food Systems Value Chain)'] == selected]
@@ -1657,22 +1544,7 @@ def filter_table(filter_by, selected):
         return df_sh.to_dict('records')
     
 
-def _build_affordability_figure(
-    selected_outlets,
-    selected_metric,
-    relayout_data,
-    outlets_geojson_files_local,
-    isochrones_geojson_files_local,
-    outlets_path_local,
-    isochrones_path_local,
-    gdf_food_env_local=None,
-    cols_food_env_local=None,
-    data_labels_food_env_local=None,
-    metric_direction_local=None,
-    center_default=None,
-    zoom_default=11,
-    city_key=None,
-):
+def _selected_outlets_and_isochrones(selected_outlets, outlets_geojson_files_local, isochrones_geojson_files_local):
     # Normalize selection
     if selected_outlets and "SELECT_ALL" in selected_outlets:
         selected_outlets = outlets_geojson_files_local.copy()
@@ -1683,80 +1555,66 @@ def _build_affordability_figure(
 
     # Derive isochrones
     selected_isochrones = []
-    if selected_outlets:
-        for outlet_file in selected_outlets:
-            iso_file = outlet_file.replace('.geojson', '_isochrone30min.geojson')
-            if iso_file in isochrones_geojson_files_local:
-                selected_isochrones.append(iso_file)
+    for outlet_file in selected_outlets:
+        iso_file = outlet_file.replace('.geojson', '_isochrone30min.geojson')
+        if iso_file in isochrones_geojson_files_local:
+            selected_isochrones.append(iso_file)
+    return selected_outlets, selected_isochrones
 
-    # Preserve zoom/center
-    if relayout_data and 'mapbox.center' in relayout_data:
-        center = relayout_data['mapbox.center']
-        zoom = relayout_data.get('mapbox.zoom', zoom_default)
-    else:
-        center = center_default or {"lat": 0, "lon": 0}
-        zoom = zoom_default
 
-    fig = go.Figure()
+def _food_env_metric_style(
+    selected_metric,
+    gdf_food_env_local,
+    cols_food_env_local,
+    data_labels_food_env_local=None,
+    metric_direction_local=None,
+):
+    """z, colorscale and hovertemplate of the food-environment choropleth, or None if there is no layer."""
+    if not selected_metric or gdf_food_env_local is None or cols_food_env_local is None:
+        return None
+    if selected_metric not in gdf_food_env_local.columns:
+        return None
 
-    # Choropleth if provided
-    if selected_metric and gdf_food_env_local is not None and cols_food_env_local is not None:
-        gdf = gdf_food_env_local.copy()
-        if selected_metric in gdf.columns:
-            gdf[selected_metric] = pd.to_numeric(gdf[selected_metric], errors='coerce')
-            metric_label = (
-                data_labels_food_env_local[cols_food_env_local.index(selected_metric)]
-                if (data_labels_food_env_local is not None and selected_metric in cols_food_env_local)
-                else selected_metric
-            )
+    metric_label = (
+        data_labels_food_env_local[cols_food_env_local.index(selected_metric)]
+        if (data_labels_food_env_local is not None and selected_metric in cols_food_env_local)
+        else selected_metric
+    )
 
-            direction = None
-            if metric_direction_local is not None:
-                direction = metric_direction_local.get(selected_metric, None)
+    direction = None
+    if metric_direction_local is not None:
+        direction = metric_direction_local.get(selected_metric, None)
 
-            if direction is True:
-                colorscale = FOOD_ENV_POS_SCALE
-            elif direction is False:
-                colorscale = FOOD_ENV_NEG_SCALE
-            else:
-                colorscale = FOOD_ENV_NEUTRAL_BONE_SCALE
+    if direction is True:
+        colorscale = FOOD_ENV_POS_SCALE
+    elif direction is False:
+        colorscale = FOOD_ENV_NEG_SCALE
+    else:
+        colorscale = FOOD_ENV_NEUTRAL_BONE_SCALE
 
-            hover_label_col = next(
-                (c for c in ["Dist_Name", "Dist_name", "shapeName", "district", "name", "ma_xa"] if c in gdf.columns),
-                None,
-            )
-            hover_text = gdf[hover_label_col].astype(str) if hover_label_col else gdf.index.astype(str)
+    return dict(
+        z=pd.to_numeric(gdf_food_env_local[selected_metric], errors='coerce').to_numpy(),
+        colorscale=colorscale,
+        hovertemplate='<b>%{text}</b><br>' + metric_label + ': %{z:.2f}<extra></extra>',
+    )
 
-            geojson_cols = [hover_label_col, "geometry"] if hover_label_col else ["geometry"]
-            if city_key in {"addis", "hanoi"}:
-                cached_geojson = _get_food_env_geojson(city_key)
-                geojson_data = json.loads(cached_geojson) if cached_geojson else json.loads(gdf[geojson_cols].to_json())
-            else:
-                geojson_data = json.loads(gdf[geojson_cols].to_json())
-
-            fig.add_trace(go.Choroplethmapbox(
-                geojson=geojson_data,
-                locations=gdf.index,
-                z=gdf[selected_metric],
-                colorscale=colorscale,
-                marker=dict(opacity=0.7, line=dict(color='#222', width=1)),
-                hovertemplate='<b>%{text}</b><br>' + metric_label + ': %{z:.2f}<extra></extra>',
-                text=hover_text,
-                showscale=False
-            ))
+
+def _affordability_overlay_traces(selected_outlets, selected_isochrones, isochrones_path_local, level=None, city_key=None):
+    """Isochrone union and outlet marker traces drawn above the choropleth, at LOD level."""
+    traces = []
 
     # Isochrones: union selected isochrone polygons into a single layer with fixed opacity
     if selected_isochrones:
         try:
-            union_geojson = _build_isochrone_union_geojson(
+            geojson_data = _build_isochrone_union_features(
                 isochrones_path_local,
                 tuple(sorted(selected_isochrones)),
+                level,
             )
-            if union_geojson:
-                geojson_data = json.loads(union_geojson)
+            if geojson_data:
                 # single uniform color (light orange) with requested alpha (0.6)
                 iso_color = '#83dfe9'
-                fig.add_trace(go.Choroplethmapbox(
+                traces.append(go.Choroplethmapbox(
                     geojson=geojson_data,
                     locations=[0],
                     z=[1],
@@ -1769,24 +1627,188 @@ def _build_affordability_figure(
         except Exception as e:
             print(f"Error unioning isochrones: {e}")
 
-    # Outlets
+    # Outlets: every selected category in one trace, coloured by category code
+    if selected_outlets and city_key:
+        try:
+            store = outlet_store.load_outlets(city_key)
+            codes = outlet_store.category_codes(city_key, selected_outlets)
+            # Store code -> position in the selection, which picks the palette colour
+            position = np.full(len(store["categories"]), -1, dtype=np.int16)
+            position[codes] = np.arange(len(codes))
+            mask = outlet_store.select(city_key, selected_outlets)
+            traces.append(go.Scattermapbox(
+                lat=store["lat"][mask],
+                lon=store["lon"][mask],
+                mode='markers',
+                marker=dict(size=6, opacity=0.8, **_outlet_category_colors(
+                    position[store["category"][mask]], [store["categories"][c] for c in codes]
+                )),
+                name='Food outlets',
+                showlegend=False,
+                hoverinfo='skip'
+            ))
+        except Exception as e:
+            print(f"Error loading outlets for {city_key}: {e}")
+    return traces
+
+
+def _outlet_palette(num_outlets):
+    return pc.sample_colorscale("Spectral", [n / max(num_outlets - 1, 1) for n in range(num_outlets)])
+
+
+def _outlet_legend_name(filename):
+    parts = filename.split('_')
+    return parts[1] if len(parts) < 4 else f"{parts[1]} {parts[2]}"
+
+
+def _outlet_category_colors(codes, categories):
+    """Marker colour settings for points coloured by position in categories.
+
+    A stepped colorscale gives each category its palette colour, and the
+    colorbar, ticked with the category names, stands in for a legend.
+    """
+    palette = _outlet_palette(len(categories))
+    colorscale = []
+    for i, color in enumerate(palette):
+        colorscale += [[i / len(palette), color], [(i + 1) / len(palette), color]]
+    return dict(
+        color=codes,
+        colorscale=colorscale,
+        cmin=-0.5,
+        cmax=len(palette) - 0.5,
+        showscale=True,
+        colorbar=dict(
+            title=dict(text='Outlet type'),
+            tickvals=list(range(len(categories))),
+            ticktext=[_outlet_legend_name(c) for c in categories],
+            x=0.99, xanchor='right', y=0.5, len=0.9, thickness=12,
+            bgcolor='rgba(255,255,255,0.8)', outlinewidth=0,
+        ),
+    )
+
+
+def _affordability_tile_overlays(city_key, selected_outlets, selected_isochrones):
+    """Mapbox layers reading the isochrones and outlets from /tiles, plus a category-key trace.
+
+    The browser then fetches only the tiles in view at the current zoom
+    (see vector_tiles.py) instead of every selected point and polygon.
+    """
+    stem = lambda filename: os.path.splitext(filename)[0]
+    layers, traces = [], []
+    if selected_isochrones:
+        categories = sorted(stem(f).replace('_isochrone30min', '') for f in selected_isochrones)
+        layers.append(dict(
+            sourcetype="vector",
+            source=[tile_url(city_key, "isochrones", categories, app.config.requests_pathname_prefix)],
+            sourcelayer="isochrones",
+            type="fill",
+            color='#83dfe9',
+            opacity=0.6,
+        ))
+    marker_palette = _outlet_palette(len(selected_outlets))
+    for i, filename in enumerate(selected_outlets):
+        # One layer per category: Plotly's mapbox layers take a fixed colour,
+        # not a data-driven expression. The tiles hold clusters up to
+        # CLUSTER_MAX_ZOOM (outlet_clusters.py) and the outlets above it.
+        layers.append(dict(
+            sourcetype="vector",
+            source=[tile_url(city_key, "outlets", [stem(filename)], app.config.requests_pathname_prefix)],
+            sourcelayer=stem(filename),
+            type="circle",
+            circle=dict(radius=4),
+            color=marker_palette[i],
+            opacity=0.8,
+        ))
     if selected_outlets:
-        num_outlets = len(selected_outlets)
-        marker_palette = pc.sample_colorscale("Spectral", [n / max(num_outlets - 1, 1) for n in range(num_outlets)])
-        for i, filename in enumerate(selected_outlets):
-            try:
-                outlet_gdf = _read_geojson_cached(os.path.join(outlets_path_local, filename)).copy()
-                marker_color = marker_palette[i]
-                fig.add_trace(go.Scattermapbox(
-                    lat=outlet_gdf.geometry.y,
-                    lon=outlet_gdf.geometry.x,
-                    mode='markers',
-                    marker=dict(size=6, color=marker_color, opacity=0.8),
-                    name=filename.split('_')[1] if len(filename.split('_')) < 4 else f"{filename.split('_')[1]} {filename.split('_')[2]}",
-                    hoverinfo='skip'
-                ))
-            except Exception as e:
-                print(f"Error loading outlet {filename}: {e}")
+        # Mapbox layers have no legend entry; an empty trace carries the category key.
+        traces.append(go.Scattermapbox(
+            lat=[None],
+            lon=[None],
+            mode='markers',
+            marker=_outlet_category_colors([0], [stem(f) for f in selected_outlets]),
+            name='Food outlets',
+            showlegend=False,
+            hoverinfo='skip'
+        ))
+    return traces, layers
+
+
+def _affordability_overlays(selected_outlets, selected_isochrones, isochrones_path_local, level=None, city_key=None):
+    """(traces, extra mapbox layers) for the overlays above the choropleth."""
+    if vector_tiles.ENABLED and city_key:
+        return _affordability_tile_overlays(city_key, selected_outlets, selected_isochrones)
+    traces = _affordability_overlay_traces(selected_outlets, selected_isochrones, isochrones_path_local, level, city_key)
+    return traces, []
+
+
+def _food_env_label_column(gdf):
+    """Column naming the food-environment areas in hover labels, or None."""
+    return next((c for c in ["Dist_Name", "Dist_name", "shapeName", "district", "name", "ma_xa"] if c in gdf.columns), None)
+
+
+def _food_env_geojson(city_key, gdf, level):
+    """Food-environment choropleth GeoJSON at LOD level (cached for the two cities)."""
+    geojson_data = _get_food_env_features(city_key, level) if city_key in {"addis", "hanoi"} else None
+    if geojson_data is None:
+        label_col = _food_env_label_column(gdf)
+        geojson_cols = [label_col] if label_col else []
+        geojson_data = feature_collection(simplify_gdf(gdf[geojson_cols + ["geometry"]], level), geojson_cols)
+    return geojson_data
+
+
+def _build_affordability_figure(
+    selected_outlets,
+    selected_metric,
+    relayout_data,
+    outlets_geojson_files_local,
+    isochrones_geojson_files_local,
+    isochrones_path_local,
+    gdf_food_env_local=None,
+    cols_food_env_local=None,
+    data_labels_food_env_local=None,
+    metric_direction_local=None,
+    center_default=None,
+    zoom_default=11,
+    city_key=None,
+):
+    selected_outlets, selected_isochrones = _selected_outlets_and_isochrones(
+        selected_outlets, outlets_geojson_files_local, isochrones_geojson_files_local
+    )
+
+    # Preserve zoom/center
+    if relayout_data and 'mapbox.center' in relayout_data:
+        center = relayout_data['mapbox.center']
+    else:
+        center = center_default or {"lat": 0, "lon": 0}
+    zoom = zoom_from_relayout(relayout_data, zoom_default)
+    level = lod_for_zoom(zoom)
+
+    fig = go.Figure()
+
+    # Choropleth if provided; always trace 0 so metric changes can patch it in place
+    style = _food_env_metric_style(
+        selected_metric, gdf_food_env_local, cols_food_env_local,
+        data_labels_food_env_local, metric_direction_local,
+    )
+    if style is not None:
+        gdf = gdf_food_env_local
+        hover_label_col = _food_env_label_column(gdf)
+        hover_text = gdf[hover_label_col].astype(str) if hover_label_col else gdf.index.astype(str)
+
+        fig.add_trace(go.Choroplethmapbox(
+            geojson=_food_env_geojson(city_key, gdf, level),
+            locations=gdf.index,
+            marker=dict(opacity=0.7, line=dict(color='#222', width=1)),
+            text=hover_text,
+            showscale=False,
+            **style
+        ))
+
+    overlay_traces, overlay_layers = _affordability_overlays(
+        selected_outlets, selected_isochrones, isochrones_path_local, level, city_key
+    )
+    for trace in overlay_traces:
+        fig.add_trace(trace)
 
     # Ensure basemap renders even when no traces were added: add an invisible Scattermapbox
     # This prevents Plotly from switching to a Cartesian empty plot when no layers are selected.
@@ -1805,32 +1827,95 @@ def _build_affordability_figure(
             pass
 
     fig.update_layout(
-        mapbox=dict(style="white-bg", layers=[_ESRI_TILE], center=center, zoom=zoom),
+        mapbox=dict(style="white-bg", layers=[_ESRI_TILE] + overlay_layers, center=center, zoom=zoom),
         margin=dict(l=0, r=0, t=0, b=0),
         paper_bgcolor=brand_colors['White'],
         showlegend=True if (selected_outlets or selected_isochrones) else False,
         legend=dict(x=0.01, y=0.99, bgcolor='rgba(255,255,255,0.8)'),
+        annotations=_access_annotations(city_key, selected_outlets),
         uirevision='constant'
     )
 
     return fig
 
 
+def _update_affordability_map(rendered, selected_outlets, selected_metric, relayout_data, **build_kwargs):
+    """Figure (or Patch) for an affordability map, plus the new contents of its rendered-store.
+
+    The commune geometry is shipped once, in the first full figure. While the
+    choropleth stays on screen, a metric change only patches trace 0's z,
+    colorscale and hovertemplate, and an outlet change only swaps the overlay
+    traces above it, so neither re-sends the geometry. A zoom past what the
+    rendered LOD level (rendered["level"]) is lossless for patches in finer
+    geometry; other pans and zooms change nothing.
+    """
+    outlets, isochrones = _selected_outlets_and_isochrones(
+        selected_outlets,
+        build_kwargs["outlets_geojson_files_local"],
+        build_kwargs["isochrones_geojson_files_local"],
+    )
+    style = _food_env_metric_style(
+        selected_metric,
+        build_kwargs.get("gdf_food_env_local"),
+        build_kwargs.get("cols_food_env_local"),
+        build_kwargs.get("data_labels_food_env_local"),
+        build_kwargs.get("metric_direction_local"),
+    )
+    city_key = build_kwargs.get("city_key")
+    needed = lod_for_zoom(zoom_from_relayout(relayout_data, build_kwargs.get("zoom_default", 11)))
+    shown_metric = selected_metric if style is not None else None
+    refine = bool(rendered) and is_finer(needed, rendered.get("level"))
+
+    if rendered and rendered.get("metric") == shown_metric and rendered.get("outlets") == outlets and not refine:
+        # A pan or zoom the rendered geometry is already detailed enough for
+        return dash.no_update, dash.no_update
+
+    if style is None or not rendered or not rendered.get("metric"):
+        fig = _build_affordability_figure(selected_outlets, selected_metric, relayout_data, **build_kwargs)
+        overlays = len(fig.data) - 1 if style is not None else 0
+        return fig, {"metric": shown_metric, "outlets": outlets, "overlays": overlays, "level": needed}
+
+    level = needed if refine else rendered.get("level")
+    patched = dash.Patch()
+    if rendered["metric"] != selected_metric:
+        patched["data"][0].update(style)
+    if refine:
+        patched["data"][0]["geojson"] = _food_env_geojson(city_key, build_kwargs["gdf_food_env_local"], level)
+    overlays = rendered.get("overlays", 0)
+    # Isochrone unions are simplified too, unless they come as vector tiles
+    refine_overlays = refine and bool(isochrones) and not vector_tiles.ENABLED
+    if rendered.get("outlets") != outlets or refine_overlays:
+        # Drop the old overlays from the end, keeping the choropleth at index 0
+        for index in range(overlays, 0, -1):
+            del patched["data"][index]
+        traces, layers = _affordability_overlays(
+            outlets, isochrones, build_kwargs["isochrones_path_local"], level, city_key,
+        )
+        if traces:
+            patched["data"].extend(traces)
+        patched["layout"]["mapbox"]["layers"] = [_ESRI_TILE] + layers
+        patched["layout"]["annotations"] = _access_annotations(city_key, outlets)
+        patched["layout"]["showlegend"] = bool(outlets or isochrones)
+        overlays = len(traces)
+    return patched, {"metric": selected_metric, "outlets": outlets, "overlays": overlays, "level": level}
+
+
 @app.callback(
-    Output('affordability-map', 'figure'),
-    [Input("food-outlets-and-isochrones", "value"), Input("choropleth-select", "value")],
-    [State('affordability-map', 'relayoutData')]
+    [Output('affordability-map-figure', 'data'), Output('affordability-map-rendered', 'data')],
+    [Input("food-outlets-and-isochrones", "value"), Input("choropleth-select", "value"),
+     Input('affordability-map', 'relayoutData')],
+    [State('affordability-map-rendered', 'data')]
 )
-def update_affordability_map(selected_outlets, selected_metric, relayout_data):
-    return _build_affordability_figure(
+def update_affordability_map(selected_outlets, selected_metric, relayout_data, rendered=None):
+    return _update_affordability_map(
+        rendered,
         selected_outlets,
         selected_metric,
         relayout_data,
-        outlets_geojson_files_addis,
-        isochrones_geojson_files_addis,
-        outlets_path,
-        isochrones_path,
-        gdf_food_env_local=gdf_food_env,
+        outlets_geojson_files_local=registry.get("addis", "outlet_files"),
+        isochrones_geojson_files_local=registry.get("addis", "isochrone_files"),
+        isochrones_path_local=isochrones_path,
+        gdf_food_env_local=_get_food_env_layer("addis"),
         cols_food_env_local=cols_food_env,
         data_labels_food_env_local=data_labels_food_env,
         metric_direction_local=metric_direction,
@@ -1843,6 +1928,16 @@ def update_affordability_map(selected_outlets, selected_metric, relayout_data):
 # Hanoi callback is defined later; avoid duplicate callback registration here.
 
 
+# The affordability figures reach Plotly through the browser, which makes
+# their vector tile URLs absolute (assets/vector_tiles.js).
+for _graph_id in ("affordability-map", "affordability-map-hanoi"):
+    app.clientside_callback(
+        ClientsideFunction(namespace="vector_tiles", function_name="figure"),
+        Output(_graph_id, "figure"),
+        Input(f"{_graph_id}-figure", "data"),
+    )
+
+
 @app.callback(
     [Output("kpi-total-flow", "children"),
      Output("urban-indicator", "figure"),
@@ -1850,6 +1945,7 @@ def update_affordability_map(selected_outlets, selected_metric, relayout_data):
     Input("slider", "value"))
 
 def update_sankey(value):
+    df_sankey = registry.get("hanoi", "sankey")
     df_sankey_filt = df_sankey[df_sankey['Year']==int(value)]
     flow1 = df_sankey_filt[['province', 'Target', 'Supply to Hanoi']].rename(
         columns={'province':'source', 'Target':'target', 'Supply to Hanoi':'supply'})
@@ -1915,6 +2011,7 @@ def update_sankey(value):
     [Input('food-group-select', 'value')]
 )
 def update_food_items_grid(selected_group):
+    df_lca = registry.get("addis", "lca")
     # Filter items by selected group
     filtered_df = df_lca[df_lca['Food Group'] == selected_group].sort_values('Item Cd')
     
@@ -2069,6 +2166,7 @@ def update_food_items_grid(selected_group):
      Input('sdg-clear-filter', 'n_clicks')]
 )
 def filter_by_sdg(*args):
+    df_indicators = registry.get("addis", "sdg_indicators")
     ctx = dash.callback_context
     
     # Default style for buttons
@@ -2191,7 +2289,7 @@ def render_tab_content(n_home, n1, n2, n3, n4, n5, n6, n7, n8, n9, n10, n11, n12
         # Open the indicator atlas directly (city-specific)
         _atlas_city = selected_city if selected_city in ('hanoi', 'addis') else 'hanoi'
         if _atlas_city == 'hanoi':
-            return _with_stubs(indicator_atlas_layout_hanoi(atlas_records_hanoi))
+            return _with_stubs(indicator_atlas_layout_hanoi(registry.get("hanoi", "atlas")))
         else:
             return _with_stubs(sustainability_tab_layout())
     else:
@@ -2307,133 +2405,323 @@ def open_atlas_target_tab(_n_clicks):
 
 # ------------------------- Hanoi Callbacks ------------------------- #
 
-# Hanoi MPI bar chart
+# Hanoi MPI bar chart: one page of the communes ranked by the variable
+# (mpi_ranking.py), so the figure stays the same size whatever the commune count.
 @app.callback(
     Output('bar-plot-hanoi', 'figure'),
+    Output('bar-page-hanoi', 'data'),
+    Output('bar-page-label-hanoi', 'children'),
     Input('variable-dropdown-hanoi', 'value'),
+    Input('bar-rank-direction-hanoi', 'value'),
+    Input('bar-search-hanoi', 'value'),
+    Input('bar-page-prev-hanoi', 'n_clicks'),
+    Input('bar-page-next-hanoi', 'n_clicks'),
+    State('bar-page-hanoi', 'data'),
     prevent_initial_call=False
 )
-def update_bar_hanoi(selected_variable):
-    # If the selected variable exists as a column in the GeoDataFrame, use it directly
-
-    df_plot = MPI_hanoi[['Name', selected_variable]].dropna(subset=[selected_variable]).copy()
-    df_plot = df_plot.sort_values(selected_variable, ascending=False)
-    fig = px.bar(
-        df_plot,
-        x=selected_variable,
-        y='Name',
-        orientation='h',
-        hover_data=['Name'],
-        labels={'Name': "Commune", selected_variable: 'Percentage of Deprived Households'},
-        color_discrete_sequence=[brand_colors['Red']]
-    )
-
-    nrows = df_plot.shape[0]
+def update_bar_hanoi(selected_variable, direction, search, prev_clicks, next_clicks, offset):
+    ctx = dash.callback_context
+    trigger = ctx.triggered[0]['prop_id'].split('.')[0] if ctx.triggered else None
+    step = {'bar-page-prev-hanoi': -1, 'bar-page-next-hanoi': 1}.get(trigger, 0)
+    return _mpi_bar_page_hanoi(selected_variable, direction, search, offset, step)
+
+
+def _mpi_bar_page_hanoi(selected_variable, direction='top', search=None, offset=0, step=0):
+    """Bar figure, offset and label of a page of the Hanoi ranking; step pages back (-1) or on (1)."""
+    ranking = registry.get("hanoi", "mpi_ranking")
+    values = registry.get("hanoi", "mpi_values")
+    direction = direction if direction in mpi_ranking.DIRECTIONS else 'top'
+
+    # Paging moves the window; anything else starts over at the searched
+    # commune (centred in the page), or at the top of the ranking.
+    match = mpi_ranking.find(ranking, selected_variable, direction, search)
+    if step:
+        offset = (offset or 0) + step * mpi_ranking.PAGE_SIZE
+    elif match is not None:
+        offset = match - mpi_ranking.PAGE_SIZE // 2
+    else:
+        offset = 0
+    features, ranks, total = mpi_ranking.window(ranking, selected_variable, direction, offset)
+    offset = mpi_ranking.clamp_offset(ranking, selected_variable, offset)
 
-    computed_height = int(max(320, min(800, 28 * nrows)))
+    if total == 0:
+        empty_fig = go.Figure()
+        empty_fig.add_annotation(text="Selected variable not found in MPI data",
+                                 showarrow=False,
+                                 xref='paper', yref='paper', x=0.5, y=0.5,
+                                 font=dict(size=14))
+        empty_fig.update_layout(margin=dict(l=10, r=10, t=10, b=72), height=360)
+        return empty_fig, 0, ""
 
-    fig.update_layout(yaxis={'categoryorder': 'total ascending'},
-                      height=computed_height,
+    names = [ranking["names"][i] for i in features]
+    matched = mpi_ranking.ranked(ranking, selected_variable, direction)[match] if match is not None else None
+    fig = go.Figure(go.Bar(
+        x=values[selected_variable][features],
+        y=names,
+        orientation='h',
+        marker_color=[brand_colors['Brown'] if i == matched else brand_colors['Red'] for i in features],
+        customdata=ranks,
+        hovertemplate=f"Commune=%{{y}}<br>Rank %{{customdata}} of {total}<br>Percentage of Deprived Households=%{{x}}<extra></extra>",
+    ))
+    fig.update_layout(yaxis={'autorange': 'reversed', 'title': "Commune"},
+                      xaxis={'title': 'Percentage of Deprived Households'},
+                      height=int(max(320, 28 * mpi_ranking.PAGE_SIZE)),
                       margin=dict(l=10, r=10, t=10, b=72),
                       xaxis_title_standoff=18,
                       hoverlabel=dict(bgcolor="white", font_color="black"),
                       uirevision='bar-uirev')
-    return fig
 
+    first = offset + 1
+    last = offset + len(features)
+    label = f"{'Highest' if direction == 'top' else 'Lowest'} {first}–{last} of {total}"
+    return fig, offset, label
 
-# Hanoi MPI map
-@app.callback(
-    Output('map-hanoi', 'figure'),
-    Input('bar-plot-hanoi', 'clickData'),
-    Input('variable-dropdown-hanoi', 'value')
-)
-def update_map_on_bar_click_hanoi(clickData, selected_variable):
-    center = {
-        "lat": MPI_hanoi.geometry.centroid.y.mean(),
-        "lon": MPI_hanoi.geometry.centroid.x.mean()
+
+def _mpi_default_variable(city_key):
+    """MPI variable the map shows when the selected one is missing: 'Normalized', else the first."""
+    values = registry.get(city_key, "mpi_values")
+    return 'Normalized' if 'Normalized' in values else next(iter(values), None)
+
+
+# Hanoi MPI map: the districts, coloured by population-weighted rollups of
+# the commune values, or one district's communes after a click on it
+# (mpi_districts.py). The geometry of a level travels once, as TopoJSON,
+# in map-hanoi-topology; a variable change only sends that level's colour
+# values (map-hanoi-values). Both are combined into map-hanoi in the
+# browser (assets/mpi_highlight.js), which also applies the bar-click highlight.
+_HANOI_DISTRICTS_PATH = os.path.join(hanoi_mpi_dir, "hanoi_districts_MPI.geojson")
+# Commune populations (dan_so) weighting the district rollups: the same
+# shapefile components the "mpi_neadmin" registry entry is keyed on.
+_HANOI_POPULATION_PATHS = source_files(os.path.join(hanoi_mpi_dir, "Hanoi_MPI_neadmin_indicators_010426.shp"))
+
+
+def _mpi_level_hanoi(district=None):
+    """Features of a Hanoi MPI map level: the districts (district None) or one district's communes.
+
+    Returns {"gdf", "id" (feature id column), "label", "values" ({variable:
+    float32 values in feature order}), "scale" (the values the colour range
+    spans: every commune's, so districts compare) and "meta"}, or None for an
+    unknown district.
+    """
+    if district is None:
+        return {
+            "gdf": registry.get("hanoi", "mpi_districts"),
+            "id": "Dist_Name",
+            "label": "District",
+            "values": registry.get("hanoi", "mpi_district_values"),
+            "scale": registry.get("hanoi", "mpi_district_values"),
+            "meta": registry.get("hanoi", "mpi_district_meta"),
+        }
+    names = registry.get("hanoi", "mpi_districts")["Dist_Name"].tolist()
+    if district not in names:
+        return None
+    rows = mpi_districts.commune_rows(registry.get("hanoi", "mpi_commune_district"), names.index(district))
+    return {
+        "gdf": registry.get("hanoi", "mpi").iloc[rows],
+        "id": "ma_xa",
+        "label": "ma_xa",
+        "values": {k: v[rows] for k, v in registry.get("hanoi", "mpi_values").items()},
+        "scale": registry.get("hanoi", "mpi_values"),
+        "meta": registry.get("hanoi", "mpi_meta").iloc[rows],
     }
-    zoom = 8.4
-
-    MPI_display = MPI_hanoi.copy()
-    MPI_display['opacity'] = 0.7
-    MPI_display['line_width'] = 0.8
-
-    if clickData and 'points' in clickData:
-        selected_dist = clickData['points'][0]['y']
-        match = MPI_hanoi[MPI_hanoi['Name'] == selected_dist]
-        if not match.empty:
-            center = {
-                "lat": match.geometry.centroid.y.values[0],
-                "lon": match.geometry.centroid.x.values[0]
-            }
-            zoom = 10
-            MPI_display.loc[MPI_display['Name'] == selected_dist, 'opacity'] = 1
-            MPI_display.loc[MPI_display['Name'] == selected_dist, 'line_width'] = 2
 
-    # Choose choropleth column: prefer selected variable if present in GeoJSON, else fall back to 'Normalized'
-    choropleth_col = selected_variable if selected_variable in MPI_hanoi.columns else ('Normalized' if 'Normalized' in MPI_hanoi.columns else None)
 
-    if choropleth_col is not None:
-        color_kwargs = dict(color=choropleth_col)
-        labels = {choropleth_col: choropleth_col, 'Name': 'Commune Name'}
-    else:
+def _mpi_view_hanoi(district=None):
+    """Centre and zoom the Hanoi MPI map opens a level at, or None."""
+    level = _mpi_level_hanoi(district)
+    if level is None or level["meta"].empty:
+        return None
+    view = geometry_meta.view(level["meta"])
+    return {"center": view["center"], "zoom": 8.4 if district is None else view["zoom"]}
+
+
+def _mpi_lod_hanoi(district=None):
+    """LOD a level opens with: lossless at its opening zoom and at the zoom a bar click recentres at."""
+    view = _mpi_view_hanoi(district)
+    return lod_for_zoom(max(view["zoom"] if view else 0, MPI_FOCUS_ZOOM))
+
+
+@cached_builder(
+    lambda district=None, lod=None: _mpi_deps("hanoi") + [_HANOI_DISTRICTS_PATH] + _HANOI_POPULATION_PATHS,
+    maxsize=16,
+)
+def _get_mpi_map_payload_hanoi(district=None, lod=None):
+    """Map payload of a level (see _mpi_level_hanoi) with its geometry at LOD lod (None: full detail)."""
+    level = _mpi_level_hanoi(district)
+    # Coloured by the fallback variable until map-hanoi-values arrives
+    choropleth_col = _mpi_default_variable("hanoi")
+    if level is None or choropleth_col is None or level["meta"].empty:
         # No choropleth column available; create empty figure
         empty_fig = go.Figure()
         empty_fig.update_layout(paper_bgcolor=brand_colors['White'], plot_bgcolor=brand_colors['White'], margin=dict(l=0, r=0, t=0, b=0))
-        return empty_fig
+        return figure_payload(empty_fig, None, {})
 
-    fig = px.choropleth_mapbox(
-        MPI_hanoi,
-        geojson=geojson_hanoi,
-        locations="ma_xa",
-        featureidkey="properties.ma_xa",
-        color=choropleth_col,
-        color_continuous_scale="YlOrRd",
-        opacity=0.7,
-        labels=labels,
-        mapbox_style="white-bg",
-        zoom=zoom,
-        center=center
-    )
+    view = _mpi_view_hanoi(district)
+    center, zoom = view["center"], view["zoom"]
+    gdf = simplify_gdf(level["gdf"][[level["id"], "geometry"]], lod)
+    geojson = feature_collection(gdf, [level["id"]])
 
-    fig.update_layout(coloraxis_colorbar=None)
-    fig.update_coloraxes(showscale=False)
+    fig = go.Figure(go.Choroplethmapbox(
+        geojson=geojson,
+        locations=gdf[level["id"]].tolist(),
+        featureidkey=f"properties.{level['id']}",
+        z=level["values"][choropleth_col],
+        coloraxis="coloraxis",
+        hovertemplate=f"{level['label']}=%{{location}}<br>{choropleth_col}=%{{z}}<extra></extra>",
+    ))
     fig.update_layout(
+        coloraxis=dict(colorscale="YlOrRd", showscale=False),
         paper_bgcolor=brand_colors['White'],
         plot_bgcolor=brand_colors['White'],
         margin=dict(l=0, r=0, t=0, b=0),
-        mapbox=dict(style="white-bg", layers=[_ESRI_TILE], center=center, zoom=zoom)
+        mapbox=dict(style="white-bg", layers=[_ESRI_TILE], center=center, zoom=zoom),
+        # Re-sent finer geometry (update_map_hanoi) keeps the user's pan and zoom
+        uirevision='mpi-map-hanoi'
     )
 
-    fig.update_traces(
-        marker=dict(
-            opacity=MPI_display['opacity'],
-            line=dict(width=MPI_display['line_width'], color='black')
-        )
+    fig.update_traces(marker=dict(opacity=0.7, line=dict(width=0.8, color='black')))
+    return figure_payload(fig, encode_topology({"mpi": geojson}, properties=[level["id"]]), {0: "mpi"})
+
+
+def _mpi_values_payload(city_key, variable, district=None):
+    """Colour values of one MPI variable for the browser: a float32 typed array, its range and hover text.
+
+    For Hanoi, district picks the map level (see _mpi_level_hanoi).
+    """
+    if city_key == "hanoi":
+        level = _mpi_level_hanoi(district)
+        if level is None:
+            return None
+        values, scale, label = level["values"], level["scale"], level["label"]
+    else:
+        values, label = registry.get(city_key, "mpi_values"), _MPI_ID_PROPERTY[city_key]
+        scale = values
+    variable = variable if variable in values else _mpi_default_variable(city_key)
+    if variable is None:
+        return None
+    z = values[variable]
+    finite = scale[variable][np.isfinite(scale[variable])]
+    return {
+        "variable": variable,
+        "z": encode_array(z),
+        "cmin": float(finite.min()) if len(finite) else None,
+        "cmax": float(finite.max()) if len(finite) else None,
+        "hovertemplate": f"{label}=%{{location}}<br>{variable}=%{{z}}<extra></extra>",
+    }
+
+
+def _mpi_level_controls_hanoi(district):
+    """Centroids a bar click recentres on, the level label and whether 'All districts' is disabled."""
+    level = _mpi_level_hanoi(district)
+    if level is None:
+        return None, "", True
+    if district is None:
+        return geometry_meta.centroid_payload(level["meta"]), "Districts: click one to see its communes", True
+    return geometry_meta.centroid_payload(level["meta"]), f"{district}: {len(level['meta'])} communes", False
+
+
+# A variable change only sends colour values; a level change also sends the
+# level's geometry, in the same response so the two always match. A zoom
+# past what the rendered LOD (map-hanoi-rendered) is lossless for re-sends
+# the geometry in finer detail.
+@app.callback(
+    Output('map-hanoi-topology', 'data'),
+    Output('map-hanoi-values', 'data'),
+    Output('map-hanoi-centroids', 'data'),
+    Output('map-hanoi-level-label', 'children'),
+    Output('map-hanoi-back', 'disabled'),
+    Output('map-hanoi-rendered', 'data'),
+    Input('variable-dropdown-hanoi', 'value'),
+    Input('map-hanoi-district', 'data'),
+    Input('map-hanoi', 'relayoutData'),
+    State('map-hanoi-rendered', 'data'),
+)
+def update_map_hanoi(selected_variable, district, relayout_data, rendered):
+    ctx = dash.callback_context
+    trigger = ctx.triggered[0]['prop_id'].split('.')[0] if ctx.triggered else None
+    unchanged = (dash.no_update,) * 4
+    if trigger == 'variable-dropdown-hanoi':
+        return (dash.no_update, _mpi_values_payload("hanoi", selected_variable, district)) + unchanged
+    if trigger == 'map-hanoi':
+        refine, lod = _refined_lod(relayout_data, rendered)
+        if not refine or rendered.get("district") != district:
+            return (dash.no_update,) * 6
+        return (_get_mpi_map_payload_hanoi(district, lod),) + unchanged + ({"district": district, "lod": lod},)
+    lod = _mpi_lod_hanoi(district)
+    return (
+        (_get_mpi_map_payload_hanoi(district, lod), _mpi_values_payload("hanoi", selected_variable, district))
+        + _mpi_level_controls_hanoi(district)
+        + ({"district": district, "lod": lod},)
     )
-    return fig
+
+
+# Drill-down: a click on a district opens its communes, a bar click opens
+# the clicked commune's district and 'All districts' goes back.
+@app.callback(
+    Output('map-hanoi-district', 'data'),
+    Input('map-hanoi', 'clickData'),
+    Input('bar-plot-hanoi', 'clickData'),
+    Input('map-hanoi-back', 'n_clicks'),
+    State('map-hanoi-district', 'data'),
+    prevent_initial_call=True
+)
+def drill_map_hanoi(map_click, bar_click, _back_clicks, district):
+    ctx = dash.callback_context
+    if not ctx.triggered:
+        return dash.no_update
+    trigger = ctx.triggered[0]['prop_id'].split('.')[0]
+    if trigger == 'map-hanoi-back':
+        return None if district is not None else dash.no_update
+
+    names = registry.get("hanoi", "mpi_districts")["Dist_Name"].tolist()
+    if trigger == 'map-hanoi':
+        # Commune clicks (once drilled down) leave the level as it is.
+        point = (map_click or {}).get("points", [{}])[0]
+        target = point.get("location") if district is None else None
+    else:
+        point = (bar_click or {}).get("points", [{}])[0]
+        communes = registry.get("hanoi", "mpi")["Name"].tolist()
+        commune = str(point.get("y"))
+        assigned = registry.get("hanoi", "mpi_commune_district")
+        row = assigned[communes.index(commune)] if commune in communes else -1
+        target = names[row] if row >= 0 else None
+    if target not in names or target == district:
+        return dash.no_update
+    return target
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace="mpi", function_name="recolour"),
+    Output('map-hanoi', 'figure'),
+    Input('map-hanoi-topology', 'data'),
+    Input('map-hanoi-values', 'data'),
+    Input('bar-plot-hanoi', 'clickData'),
+    State('map-hanoi-centroids', 'data'),
+)
 
 # Hanoi affordability map with outlet layers and isochrones
 @app.callback(
-    Output('affordability-map-hanoi', 'figure'),
-    [Input("food-outlets-and-isochrones-hanoi", "value"), Input("choropleth-select-hanoi", "value")],
-    [State('affordability-map-hanoi', 'relayoutData')]
+    [Output('affordability-map-hanoi-figure', 'data'), Output('affordability-map-hanoi-rendered', 'data')],
+    [Input("food-outlets-and-isochrones-hanoi", "value"), Input("choropleth-select-hanoi", "value"),
+     Input('affordability-map-hanoi', 'relayoutData')],
+    [State('affordability-map-hanoi-rendered', 'data')]
 )
-def update_affordability_map_hanoi(selected_outlets, selected_metric, relayout_data):
+def update_affordability_map_hanoi(selected_outlets, selected_metric, relayout_data, rendered=None):
+    gdf_food_env_hanoi = _get_food_env_layer("hanoi")
     # Delegate to shared builder to avoid duplicate callbacks
-    return _build_affordability_figure(
+    return _update_affordability_map(
+        rendered,
         selected_outlets,
         selected_metric,
         relayout_data,
-        outlets_geojson_files_hanoi,
-        isochrones_geojson_files_hanoi,
-        outlets_path_hanoi,
-        isochrones_path_hanoi,
+        outlets_geojson_files_local=registry.get("hanoi", "outlet_files"),
+        isochrones_geojson_files_local=registry.get("hanoi", "isochrone_files"),
+        isochrones_path_local=isochrones_path_hanoi,
         gdf_food_env_local=gdf_food_env_hanoi,
         cols_food_env_local=cols_food_env if gdf_food_env_hanoi is not None else None,
         data_labels_food_env_local=data_labels_food_env if gdf_food_env_hanoi is not None else None,
         metric_direction_local=metric_direction if gdf_food_env_hanoi is not None else None,
-        center_default={"lat": MPI_hanoi.geometry.centroid.y.mean(), "lon": MPI_hanoi.geometry.centroid.x.mean()},
+        center_default=geometry_meta.view(registry.get("hanoi", "mpi_meta"))["center"],
         zoom_default=10,
         city_key="hanoi",
     )
@@ -2447,6 +2735,7 @@ def update_affordability_map_hanoi(selected_outlets, selected_metric, relayout_d
     prevent_initial_call=False
 )
 def update_sankey_hanoi(value):
+    df_sankey = registry.get("hanoi", "sankey")
     df_sankey_filt = df_sankey[df_sankey['Year']==int(value)]
     flow1 = df_sankey_filt[['province', 'Target', 'Supply to Hanoi']].rename(
         columns={'province':'source', 'Target':'target', 'Supply to Hanoi':'supply'})
@@ -2513,6 +2802,7 @@ def update_sankey_hanoi(value):
     Input('affordability-filter-dropdown-hanoi','value')
 )
 def update_affordability_trend_hanoi(selected_variable):
+    df_affordability_hanoi = registry.get("hanoi", "affordability")
     titles = {
         'foodExp_totalExp': 'Food Expenditure from Total Expenses (%)',
         'foodExp_totalInc': 'Food Expenditure from Household Income (%)',
@@ -2562,6 +2852,7 @@ def update_affordability_trend_hanoi(selected_variable):
     Input('health-filter-dropdown-hanoi','value')
 )
 def update_health_trend_hanoi(selected_variable):
+    df_diet_2_hanoi = registry.get("hanoi", "nutrition")
     df_filt = df_diet_2_hanoi[df_diet_2_hanoi['Cat']==selected_variable]
 
     fig = px.line(df_filt, 
@@ -2593,12 +2884,17 @@ def update_health_trend_hanoi(selected_variable):
 
 # ── Drought Indicator callback ────────────────────────────────────────────────────────
 
-@lru_cache(maxsize=64)
-def _build_drought_map_cached(slider_idx, indicator):
+# Zooms the drought and LULC maps open at; their boundaries are first sent
+# at the LOD for these and refined on zoom (refine_drought_map, refine_lulc_map).
+DROUGHT_MAP_ZOOM = 5
+LULC_MAP_ZOOM = 9
+
+
+@cached_builder(_RESILIENCE_DEPS + _REGION_DEPS + [_static_composites_csv, _islands_path], maxsize=64, persist=True)
+def _build_drought_map_cached(slider_idx, indicator, lod=lod_for_zoom(DROUGHT_MAP_ZOOM)):
     resilience_ctx = _get_resilience_context()
     district_climate_df = resilience_ctx["district_climate_df"]
     districts_unique = resilience_ctx["districts_unique"]
-    resilience_base_geojson = resilience_ctx["resilience_base_geojson"]
     district_join_key = resilience_ctx["join_key"]
     district_featureidkey = resilience_ctx["featureidkey"]
     all_quarters = resilience_ctx["all_quarters"]
@@ -2608,15 +2904,17 @@ def _build_drought_map_cached(slider_idx, indicator):
     slopes_df = region_ctx["slopes_df"]
 
     _map_layout = dict(
-        mapbox=dict(style="white-bg", layers=[_ESRI_TILE], center={"lat": 16.0, "lon": 106.0}, zoom=5),
+        mapbox=dict(style="white-bg", layers=[_ESRI_TILE], center={"lat": 16.0, "lon": 106.0}, zoom=DROUGHT_MAP_ZOOM),
         margin=dict(l=0, r=0, t=0, b=0),
         showlegend=False,
         coloraxis_showscale=False,
+        # Re-sent finer geometry keeps the user's pan and zoom
+        uirevision="drought-map",
     )
 
     if not all_quarters:
         empty_fig = go.Figure().update_layout(**_map_layout)
-        return empty_fig.to_json(), "", [], {"display": "block"}
+        return figure_payload(empty_fig, None, {}), "", [], {"display": "block"}
 
     safe_idx = max(0, min(int(slider_idx), len(all_quarters) - 1))
     quarter = all_quarters[safe_idx]
@@ -2624,7 +2922,7 @@ def _build_drought_map_cached(slider_idx, indicator):
 
     if cfg is None:
         empty_fig = go.Figure().update_layout(**_map_layout)
-        return empty_fig.to_json(), quarter, [], {"display": "block"}
+        return figure_payload(empty_fig, None, {}), quarter, [], {"display": "block"}
 
     col = cfg["col"]
     keep_cols = [district_join_key, col]
@@ -2632,8 +2930,7 @@ def _build_drought_map_cached(slider_idx, indicator):
         keep_cols.append("shapeName")
 
     if isinstance(indicator, str) and (indicator.startswith("class_") or indicator.startswith("drought_resistance")):
-        spei_csv = os.path.join(hanoi_climate_dir, "static_climate_composites.csv")
-        spei_df = pd.read_csv(spei_csv)
+        spei_df = read_table(_static_composites_csv)
         df = spei_df[keep_cols].dropna(subset=[col])
         slider_style = {"display": "none"}
         plot_gdf = districts_unique.merge(df, on=district_join_key, how="left")
@@ -2675,6 +2972,7 @@ def _build_drought_map_cached(slider_idx, indicator):
         hover_label_col = district_join_key
 
     fig = go.Figure()
+    topology_objects = {}
     if not overlay.empty:
         zvals = overlay[col].to_numpy(dtype=float)
         if cfg["diverging"]:
@@ -2708,8 +3006,8 @@ def _build_drought_map_cached(slider_idx, indicator):
         if cb_tickvals is not None:
             colorbar_map.update(dict(tickmode='array', tickvals=cb_tickvals, ticktext=cb_ticktext))
 
+        topology_objects[len(fig.data)] = "districts"
         fig.add_trace(go.Choroplethmapbox(
-            geojson=resilience_base_geojson,
             featureidkey=district_featureidkey,
             locations=overlay[district_join_key],
             z=overlay[col],
@@ -2749,10 +3047,10 @@ def _build_drought_map_cached(slider_idx, indicator):
     # Shown in grey with a 'coming soon' tooltip to satisfy Vietnamese law
     # requiring both island groups to be displayed on maps of Vietnam.
     try:
-        with open(_islands_path) as _f:
-            _islands_geojson = json.load(_f)
+        _islands_geojson = _get_islands_geojson(lod)
         _island_ids = [feat["properties"]["shapeID"] for feat in _islands_geojson["features"]]
         _island_names = {feat["properties"]["shapeID"]: feat["properties"]["shapeName"] for feat in _islands_geojson["features"]}
+        topology_objects[len(fig.data)] = "islands"
         fig.add_trace(go.Choroplethmapbox(
             geojson=_islands_geojson,
             featureidkey="properties.shapeID",
@@ -2769,7 +3067,8 @@ def _build_drought_map_cached(slider_idx, indicator):
         print(f"Island overlay skipped: {_e}")
 
     fig.update_layout(**_map_layout)
-    return fig.to_json(), quarter, cards_payload, slider_style
+    topology = _get_drought_topology(lod) if topology_objects else None
+    return figure_payload(fig, topology, topology_objects), quarter, cards_payload, slider_style
 
 
 @app.callback(
@@ -2782,7 +3081,7 @@ def _build_drought_map_cached(slider_idx, indicator):
     Input("climate-indicator-select", "value"),
 )
 def update_drought_map(slider_idx, indicator):
-    fig_json, quarter, cards_payload, slider_style = _build_drought_map_cached(int(slider_idx or 0), indicator or "")
+    map_payload, quarter, cards_payload, slider_style = _build_drought_map_cached(int(slider_idx or 0), indicator or "")
     cfg = district_indicator_cfg.get(indicator or "")
 
     cards = [
@@ -2803,11 +3102,15 @@ def update_drought_map(slider_idx, indicator):
     ]
 
     return (
-        dcc.Graph(
-            figure=_figure_from_json(fig_json),
-            config={"displayModeBar": False, "scrollZoom": True},
-            style={"height": "100%", "width": "100%"},
-        ),
+        [
+            dcc.Store(id="drought-map-topology", data=map_payload),
+            dcc.Store(id="drought-map-rendered", data={"lod": lod_for_zoom(DROUGHT_MAP_ZOOM)}),
+            dcc.Graph(
+                id="drought-map",
+                config={"displayModeBar": False, "scrollZoom": True},
+                style={"height": "100%", "width": "100%"},
+            ),
+        ],
         quarter,
         dbc.Row(cards),
         slider_style,
@@ -2861,20 +3164,22 @@ def update_resilience_view_layout(view_selection, spatial_data):
     )
 
 
-@lru_cache(maxsize=32)
-def _build_lulc_map_cached(indicator):
+@cached_builder(_LULC_DEPS, maxsize=32, persist=True)
+def _build_lulc_map_cached(indicator, lod=lod_for_zoom(LULC_MAP_ZOOM)):
     lulc_ctx = _get_lulc_context()
     lulc_stats_gdf = lulc_ctx["gdf"]
     lulc_map_center = lulc_ctx["map_center"]
 
     map_layout = dict(
-        mapbox=dict(style="white-bg", layers=[_ESRI_TILE], center=lulc_map_center, zoom=9),
+        mapbox=dict(style="white-bg", layers=[_ESRI_TILE], center=lulc_map_center, zoom=LULC_MAP_ZOOM),
         margin=dict(l=0, r=0, t=0, b=0),
         showlegend=False,
+        # Re-sent finer geometry keeps the user's pan and zoom
+        uirevision="lulc-map",
     )
 
     if lulc_stats_gdf is None or not indicator or indicator not in lulc_stats_gdf.columns:
-        return go.Figure().update_layout(**map_layout).to_json()
+        return figure_payload(go.Figure().update_layout(**map_layout), None, {})
 
     plot_gdf = lulc_stats_gdf.copy()
     plot_gdf["__rid"] = plot_gdf["__rid"].astype(str)
@@ -2896,6 +3201,7 @@ def _build_lulc_map_cached(indicator):
         lulc_colorscale = "Viridis"
 
     fig = go.Figure()
+    topology = None
 
     if not overlay.empty:
         zvals = overlay["__value"].to_numpy(dtype=float)
@@ -2914,11 +3220,10 @@ def _build_lulc_map_cached(indicator):
             hover_val_fmt = "%{z:.3f}"
             colorbar_tickformat = ".2f"
 
-        minx, miny, maxx, maxy = overlay.total_bounds
         fig.update_layout(
             mapbox=dict(
-                center={"lat": float((miny + maxy) / 2.0), "lon": float((minx + maxx) / 2.0)},
-                zoom=9,
+                center=geometry_meta.view(lulc_ctx["meta"], overlay.index)["center"],
+                zoom=LULC_MAP_ZOOM,
                 style="white-bg",
                 layers=[_ESRI_TILE],
             )
@@ -2935,11 +3240,12 @@ def _build_lulc_map_cached(indicator):
         else:
             hover_text = overlay[label_col].astype(str)
 
-        overlay_for_map = overlay.copy()
+        overlay_for_map = simplify_gdf(overlay, lod)
         overlay_for_map["_fid"] = overlay_for_map.index.astype(str)
+        # Only the feature ids are needed in the browser (featureidkey="id").
+        topology = encode_topology({"lulc": feature_collection(overlay_for_map, properties=[])}, properties=[])
 
         fig.add_trace(go.Choroplethmapbox(
-            geojson=json.loads(overlay_for_map.to_json()),
             featureidkey="id",
             locations=overlay_for_map["_fid"],
             z=overlay["__value"],
@@ -2965,7 +3271,7 @@ def _build_lulc_map_cached(indicator):
         ))
 
     fig.update_layout(**map_layout)
-    return fig.to_json()
+    return figure_payload(fig, topology, {0: "lulc"} if topology else {})
 
 
 @app.callback(
@@ -2973,16 +3279,113 @@ def _build_lulc_map_cached(indicator):
     Input("lulc-indicator-select", "value"),
 )
 def update_lulc_map(indicator):
-    return dcc.Graph(
-        figure=_figure_from_json(_build_lulc_map_cached(indicator or "")),
-        config={"displayModeBar": False, "scrollZoom": True},
-        style={"height": "100%", "width": "100%"},
+    return [
+        dcc.Store(id="lulc-map-topology", data=_build_lulc_map_cached(indicator or "")),
+        dcc.Store(id="lulc-map-rendered", data={"lod": lod_for_zoom(LULC_MAP_ZOOM)}),
+        dcc.Graph(
+            id="lulc-map",
+            config={"displayModeBar": False, "scrollZoom": True},
+            style={"height": "100%", "width": "100%"},
+        ),
+    ]
+
+
+# The drought and LULC maps ship their boundaries as TopoJSON too.
+for _graph_id in ("drought-map", "lulc-map"):
+    app.clientside_callback(
+        ClientsideFunction(namespace="topojson", function_name="figure"),
+        Output(_graph_id, "figure"),
+        Input(f"{_graph_id}-topology", "data"),
     )
 
+
+# Zooming in past the LOD a drought / LULC map was sent at re-sends its
+# figure with finer boundaries; the topology cache in the browser keeps the
+# colour-only changes cheap.
+@app.callback(
+    Output("drought-map-topology", "data"),
+    Output("drought-map-rendered", "data"),
+    Input("drought-map", "relayoutData"),
+    State("drought-map-rendered", "data"),
+    State("drought-date-slider", "value"),
+    State("climate-indicator-select", "value"),
+    prevent_initial_call=True,
+)
+def refine_drought_map(relayout_data, rendered, slider_idx, indicator):
+    refine, lod = _refined_lod(relayout_data, rendered)
+    if not refine:
+        return dash.no_update, dash.no_update
+    return _build_drought_map_cached(int(slider_idx or 0), indicator or "", lod)[0], {"lod": lod}
+
+
+@app.callback(
+    Output("lulc-map-topology", "data"),
+    Output("lulc-map-rendered", "data"),
+    Input("lulc-map", "relayoutData"),
+    State("lulc-map-rendered", "data"),
+    State("lulc-indicator-select", "value"),
+    prevent_initial_call=True,
+)
+def refine_lulc_map(relayout_data, rendered, indicator):
+    refine, lod = _refined_lod(relayout_data, rendered)
+    if not refine:
+        return dash.no_update, dash.no_update
+    return _build_lulc_map_cached(indicator or "", lod), {"lod": lod}
+
+def warm_caches():
+    """Load every dataset and fill the module-level lru caches.
+
+    Used by the gunicorn preload mode (gunicorn.conf.py) so the master process
+    does this once and workers share the result copy-on-write.
+    """
+    registry.preload()
+    for builder in (_get_resilience_context, _get_lulc_context):
+        try:
+            builder()
+        except Exception as exc:
+            print(f"[WARN] Could not warm {builder.__name__}: {exc}")
+    # Level-of-detail pyramids for the polygon layers (see geometry_lod.py)
+    for builder, args in (
+        (_get_mpi_geojson_lod, ("addis",)),
+        (_get_food_env_features, ("addis",)),
+        (_get_food_env_features, ("hanoi",)),
+        (_get_resilience_geojson_lod, ()),
+        (_get_islands_geojson, ()),
+        (_get_drought_topology, ()),
+    ):
+        try:
+            for level in LOD_ZOOMS:
+                builder(*args, level)
+        except Exception as exc:
+            print(f"[WARN] Could not warm {builder.__name__}{args}: {exc}")
+    for city in ("addis", "hanoi"):
+        try:
+            outlet_store.load_outlets(city)
+        except Exception as exc:
+            print(f"[WARN] Could not warm the {city} outlet store: {exc}")
+    # Projected, indexed sources for the vector tile endpoint
+    for city in ("addis", "hanoi"):
+        try:
+            vector_tiles.warm_sources(city)
+            outlet_clusters.warm(city)
+        except Exception as exc:
+            print(f"[WARN] Could not warm vector tile sources for {city}: {exc}")
+        # Coverage rasters behind the access metrics and the map's access note
+        try:
+            _get_food_env_layer(city)
+            coverage_raster.access_share(city, ())
+        except Exception as exc:
+            print(f"[WARN] Could not warm coverage rasters for {city}: {exc}")
+
+
 # Expose the Flask server for production deployment
 server = app.server
+startup_trace.finish("register callbacks")
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8051))
     debug = os.environ.get('PORT') is None
+    # With debug on, only the reloader's child process serves requests.
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_watcher()
     app.run(debug=debug, host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,99 @@
+// Bar-click highlight and recolouring for the MPI maps, run in the browser.
+// The server sends the map as a figure_payload (decoded by
+// dash_clientside.topojson.figure): per variable for Addis, once per level for
+// Hanoi (its districts, or the communes of the district drilled into),
+// whose variable changes only send the colour values (recolour). A bar
+// click then only outlines the clicked district/commune and recentres on
+// its centroid, taken from the centroids store (shipped with the layout for
+// Addis, with each level for Hanoi; {names, lat, lon, zoom} in the map's
+// feature order, see geometry_meta.py).
+// The map zooms to fit the feature, but no closer than MPI_FOCUS_ZOOM, the
+// zoom the server's geometry detail is chosen for.
+(function () {
+  var MPI_FOCUS_ZOOM = 10;
+  var OPACITY = 0.7, SELECTED_OPACITY = 1;
+  var LINE_WIDTH = 0.8, SELECTED_LINE_WIDTH = 2;
+
+  function fill(length, value) {
+    var values = new Array(length);
+    for (var i = 0; i < length; i++) {
+      values[i] = value;
+    }
+    return values;
+  }
+
+  // Colour values of one variable (map-hanoi-values): z as a typed array,
+  // the colour range and the hover text.
+  function withValues(figure, values) {
+    if (!values || !figure.data.length) {
+      return figure;
+    }
+    var trace = Object.assign({}, figure.data[0], {z: values.z, hovertemplate: values.hovertemplate});
+    var layout = figure.layout || {};
+    return {
+      data: [trace].concat(figure.data.slice(1)),
+      layout: Object.assign({}, layout, {
+        coloraxis: Object.assign({}, layout.coloraxis, {cmin: values.cmin, cmax: values.cmax})
+      })
+    };
+  }
+
+  function withHighlight(figure, clickData, centroids) {
+    if (!centroids || !figure.data.length) {
+      return figure;
+    }
+    var point = clickData && clickData.points && clickData.points[0];
+    var index = point ? centroids.names.indexOf(String(point.y)) : -1;
+    if (index < 0 || centroids.lat[index] === null) {
+      return figure;
+    }
+
+    var trace = figure.data[0];
+    var marker = trace.marker || {};
+    var opacity = fill(centroids.names.length, OPACITY);
+    var width = fill(centroids.names.length, LINE_WIDTH);
+    opacity[index] = SELECTED_OPACITY;
+    width[index] = SELECTED_LINE_WIDTH;
+    var highlighted = Object.assign({}, trace, {
+      marker: Object.assign({}, marker, {
+        opacity: opacity,
+        line: Object.assign({}, marker.line, {width: width})
+      })
+    });
+
+    var zoom = (centroids.zoom && centroids.zoom[index]) || MPI_FOCUS_ZOOM;
+    var layout = figure.layout || {};
+    return {
+      data: [highlighted].concat(figure.data.slice(1)),
+      layout: Object.assign({}, layout, {
+        mapbox: Object.assign({}, layout.mapbox, {
+          center: {lat: centroids.lat[index], lon: centroids.lon[index]},
+          zoom: Math.min(zoom, MPI_FOCUS_ZOOM)
+        })
+      })
+    };
+  }
+
+  var mpi = {
+    highlight: function (payload, clickData, centroids) {
+      return mpi.recolour(payload, null, clickData, centroids);
+    },
+
+    // The geometry payload only changes on page load; variable changes
+    // arrive as values and reuse its decoded (cached) topology.
+    recolour: function (payload, values, clickData, centroids) {
+      var figure = window.dash_clientside.topojson.figure(payload);
+      if (figure === window.dash_clientside.no_update) {
+        return figure;
+      }
+      return withHighlight(withValues(figure, values), clickData, centroids);
+    }
+  };
+
+  if (typeof window !== "undefined") {
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {mpi: mpi});
+  }
+  if (typeof module !== "undefined") {
+    module.exports = mpi;
+  }
+})();
@@ -0,0 +1,103 @@
+// Rebuilds choropleth GeoJSON from the quantized TopoJSON that
+// topojson_codec.figure_payload() sends, then hands the figure to Plotly.
+// Decoded topologies are kept by key, so re-rendering the same boundaries
+// (e.g. a bar click that only recentres the map) skips the decode.
+(function () {
+  var cache = new Map();
+  var CACHE_SIZE = 16;
+
+  function decodeArcs(topology) {
+    var scale = topology.transform.scale;
+    var translate = topology.transform.translate;
+    return topology.arcs.map(function (arc) {
+      var x = 0, y = 0;
+      return arc.map(function (delta) {
+        x += delta[0];
+        y += delta[1];
+        return [x * scale[0] + translate[0], y * scale[1] + translate[1]];
+      });
+    });
+  }
+
+  function decodeObject(topology, arcs, name) {
+    function path(refs) {
+      var coords = [];
+      refs.forEach(function (ref) {
+        var points = ref >= 0 ? arcs[ref] : arcs[~ref].slice().reverse();
+        for (var i = coords.length ? 1 : 0; i < points.length; i++) {
+          coords.push(points[i]);
+        }
+      });
+      return coords;
+    }
+
+    function geometry(entry) {
+      switch (entry.type) {
+        case "Polygon":
+          return {type: "Polygon", coordinates: entry.arcs.map(path)};
+        case "MultiPolygon":
+          return {type: "MultiPolygon", coordinates: entry.arcs.map(function (p) { return p.map(path); })};
+        case "LineString":
+          return {type: "LineString", coordinates: path(entry.arcs)};
+        case "MultiLineString":
+          return {type: "MultiLineString", coordinates: entry.arcs.map(path)};
+        default:
+          return null;
+      }
+    }
+
+    return {
+      type: "FeatureCollection",
+      features: topology.objects[name].geometries.map(function (entry) {
+        var feature = {type: "Feature", properties: entry.properties || {}, geometry: geometry(entry)};
+        if (entry.id !== undefined) {
+          feature.id = entry.id;
+        }
+        return feature;
+      })
+    };
+  }
+
+  function decode(topology) {
+    var hit = topology.key && cache.get(topology.key);
+    if (hit) {
+      return hit;
+    }
+    var arcs = decodeArcs(topology);
+    var layers = {};
+    Object.keys(topology.objects).forEach(function (name) {
+      layers[name] = decodeObject(topology, arcs, name);
+    });
+    if (topology.key) {
+      cache.set(topology.key, layers);
+      if (cache.size > CACHE_SIZE) {
+        cache.delete(cache.keys().next().value);
+      }
+    }
+    return layers;
+  }
+
+  var topojson = {
+    decode: decode,
+
+    figure: function (payload) {
+      if (!payload || !payload.figure) {
+        return window.dash_clientside.no_update;
+      }
+      var layers = payload.topology ? decode(payload.topology) : {};
+      var objects = payload.objects || {};
+      var data = payload.figure.data.map(function (trace, index) {
+        var name = objects[String(index)];
+        return name && layers[name] ? Object.assign({}, trace, {geojson: layers[name]}) : trace;
+      });
+      return {data: data, layout: payload.figure.layout};
+    }
+  };
+
+  if (typeof window !== "undefined") {
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {topojson: topojson});
+  }
+  if (typeof module !== "undefined") {
+    module.exports = topojson;
+  }
+})();
@@ -0,0 +1,45 @@
+// Hands the affordability maps to Plotly with their vector tile sources
+// made absolute. The server sends root-relative tile URLs (under the app's
+// requests_pathname_prefix, see vector_tiles.tile_url) because only the
+// browser knows the origin it reached the app at, and mapbox-gl fetches
+// tiles in a web worker that cannot resolve relative URLs.
+(function () {
+  function absolute(url) {
+    if (typeof url !== "string" || url.charAt(0) !== "/" || url.charAt(1) === "/") {
+      return url;
+    }
+    return window.location.origin + url;
+  }
+
+  function withLayers(mapbox) {
+    if (!mapbox || !mapbox.layers) {
+      return mapbox;
+    }
+    var layers = mapbox.layers.map(function (layer) {
+      if (layer.sourcetype !== "vector" || !Array.isArray(layer.source)) {
+        return layer;
+      }
+      return Object.assign({}, layer, {source: layer.source.map(absolute)});
+    });
+    return Object.assign({}, mapbox, {layers: layers});
+  }
+
+  var vectorTiles = {
+    absolute: absolute,
+
+    figure: function (figure) {
+      if (!figure) {
+        return window.dash_clientside.no_update;
+      }
+      var layout = figure.layout || {};
+      return {data: figure.data, layout: Object.assign({}, layout, {mapbox: withLayers(layout.mapbox)})};
+    }
+  };
+
+  if (typeof window !== "undefined") {
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {vector_tiles: vectorTiles});
+  }
+  if (typeof module !== "undefined") {
+    module.exports = vectorTiles;
+  }
+})();
@@ -0,0 +1,673 @@
+"""
+Micro-benchmarks for the EcoFoodSystems Dashboard data paths
+
+    python benchmarks.py                  # run every benchmark
+    python benchmarks.py vector_io        # run one
+    python benchmarks.py --repeat 10      # more repetitions (median is reported)
+"""
+
+import gzip
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import geopandas as gpd
+
+from data_registry import (
+    data_root, addis_mpi_dir, hanoi_mpi_dir, hanoi_sustainability_dir,
+    food_env_path_hanoi, outlets_path,
+)
+
+
+BENCHMARKS = {}
+
+
+def benchmark(fn):
+    BENCHMARKS[fn.__name__] = fn
+    return fn
+
+
+def time_ms(fn, repeat):
+    """Median wall time of fn() over repeat runs, in ms (None if fn raises)."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception:
+            return None
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def print_table(title, header, rows):
+    print(f"\n{title}")
+    widths = [max(len(str(c)) for c in column) for column in zip(header, *rows)]
+    for row in [header, *rows]:
+        print("  ".join(str(c).rjust(w) if i else str(c).ljust(w) for i, (c, w) in enumerate(zip(row, widths))))
+
+
+def _ms(value):
+    return "error" if value is None else f"{value:.1f}"
+
+
+@benchmark
+def vector_io(repeat):
+    """gpd.read_file + to_crs vs the data_io Arrow path, column projection and GeoParquet."""
+    from data_io import _read_geoparquet, _read_vector_source, write_vector_sidecar
+
+    outlet_files = sorted(f for f in os.listdir(outlets_path) if f.endswith(".geojson"))
+    paths = [
+        os.path.join(addis_mpi_dir, "addis_districts_MPI.geojson"),
+        os.path.join(hanoi_mpi_dir, "hanoi_communes.geojson"),
+        food_env_path_hanoi,
+        os.path.join(outlets_path, outlet_files[0]),
+        os.path.join(hanoi_mpi_dir, "Hanoi_MPI_neadmin_indicators_010426.shp"),
+        os.path.join(hanoi_sustainability_dir, "hanoi_sustainability_indicators.shp"),
+    ]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in paths:
+            sidecar_source = os.path.join(tmp, os.path.basename(path))
+            write_vector_sidecar(_read_vector_source(path), sidecar_source)
+            sidecar = os.path.splitext(sidecar_source)[0] + ".parquet"
+            rows.append((
+                os.path.relpath(path, data_root),
+                _ms(time_ms(lambda: gpd.read_file(path).to_crs("EPSG:4326"), repeat)),
+                _ms(time_ms(lambda: _read_vector_source(path), repeat)),
+                _ms(time_ms(lambda: _read_vector_source(path, columns=()), repeat)),
+                _ms(time_ms(lambda: _read_geoparquet(sidecar), repeat)),
+            ))
+    print_table(
+        "Vector reads (median ms)",
+        ("file", "read_file+to_crs", "arrow", "arrow geometry-only", "geoparquet"),
+        rows,
+    )
+
+
+_NODE_DECODE = """
+const fs = require("fs");
+const topojson = require(process.argv[2]);
+const geojsonText = fs.readFileSync(process.argv[3], "utf8");
+const topologyText = fs.readFileSync(process.argv[4], "utf8");
+const repeat = Number(process.argv[5]);
+function median(fn) {
+  const timings = [];
+  for (let i = 0; i < repeat; i++) {
+    const start = process.hrtime.bigint();
+    fn();
+    timings.push(Number(process.hrtime.bigint() - start) / 1e6);
+  }
+  timings.sort((a, b) => a - b);
+  return timings[Math.floor(timings.length / 2)];
+}
+const geojson = median(() => JSON.parse(geojsonText));
+const topology = median(() => {
+  const parsed = JSON.parse(topologyText);
+  delete parsed.key;  // bypass the decoder's cache
+  topojson.decode(parsed);
+});
+console.log(JSON.stringify([geojson, topology]));
+"""
+
+
+def _node_decode_ms(geojson, topology, repeat):
+    """Browser-side cost under node: JSON.parse of the GeoJSON vs parse + decode of the topology."""
+    node = shutil.which("node")
+    if node is None:
+        return None, None
+    decoder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "topojson_decode.js")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, name) for name in ("decode.js", "layer.geojson", "layer.topojson")]
+        for path, content in zip(paths, (_NODE_DECODE, json.dumps(geojson), json.dumps(topology))):
+            with open(path, "w") as fh:
+                fh.write(content)
+        result = subprocess.run([node, paths[0], decoder, paths[1], paths[2], str(repeat)], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None, None
+    return tuple(json.loads(result.stdout))
+
+
+def _kb(payload):
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return f"{len(raw) / 1024:.0f}", f"{len(gzip.compress(raw)) / 1024:.0f}"
+
+
+@benchmark
+def topojson(repeat):
+    """GeoJSON vs quantized TopoJSON payloads for the shared-border boundary sets."""
+    import app
+    from geometry_lod import lod_for_zoom
+    from topojson_codec import encode_topology
+
+    def resilience(level):
+        if level is None:
+            return app.feature_collection(app._get_resilience_context()["districts_unique"])
+        return app._get_resilience_geojson_lod(level)
+
+    layers = [
+        ("geojson_hanoi (full)", lambda: app.registry.get("hanoi", "mpi_geojson")),
+        ("geojson_hanoi (zoom 8.4)", lambda: app._get_mpi_geojson_lod("hanoi", lod_for_zoom(8.4))),
+        ("resilience_base_geojson (full)", lambda: resilience(None)),
+        ("resilience_base_geojson (zoom 5)", lambda: resilience(lod_for_zoom(5))),
+        ("vnm_islands (full)", lambda: app._get_islands_geojson()),
+    ]
+    rows = []
+    for label, load in layers:
+        try:
+            geojson = load()
+        except Exception as exc:
+            rows.append((label, f"error: {exc.__class__.__name__}", "", "", "", "", ""))
+            continue
+        topology = encode_topology({"layer": geojson})
+        geojson_kb, geojson_gz = _kb(geojson)
+        topo_kb, topo_gz = _kb(topology)
+        parse_ms, decode_ms = _node_decode_ms(geojson, topology, repeat)
+        rows.append((
+            label,
+            f"{geojson_kb} ({geojson_gz})",
+            f"{topo_kb} ({topo_gz})",
+            len(topology["arcs"]),
+            _ms(time_ms(lambda: encode_topology({"layer": geojson}), repeat)),
+            _ms(parse_ms),
+            _ms(decode_ms),
+        ))
+    print_table(
+        "Boundary payloads: KB (gzip KB), median ms",
+        ("layer", "geojson", "topojson", "arcs", "encode", "geojson parse (node)", "topojson parse+decode (node)"),
+        rows,
+    )
+
+
+def _viewport_tiles(center_lon, center_lat, zoom, width=1200, height=800):
+    """z/x/y of every 512 px tile a width x height map centred on a point needs."""
+    import math
+
+    scale = 2 ** zoom
+    cx = (center_lon + 180) / 360 * scale
+    cy = (1 - math.asinh(math.tan(math.radians(center_lat))) / math.pi) / 2 * scale
+    half_w, half_h = width / 2 / 512, height / 2 / 512
+    return [
+        (zoom, x, y)
+        for x in range(int(cx - half_w), int(cx + half_w) + 1)
+        for y in range(int(cy - half_h), int(cy + half_h) + 1)
+    ]
+
+
+@benchmark
+def tiles(repeat):
+    """Outlet and isochrone overlays as figure traces vs the vector tiles one viewport needs."""
+    import plotly.io as pio
+
+    import app
+    import vector_tiles
+
+    files = app.registry.get("hanoi", "outlet_files")
+    outlets, isochrones = app._selected_outlets_and_isochrones(
+        ["SELECT_ALL"], files, app.registry.get("hanoi", "isochrone_files")
+    )
+    categories = tuple(sorted(os.path.splitext(f)[0] for f in outlets))
+    traces = app._affordability_overlay_traces(
+        outlets, isochrones, app.isochrones_path_hanoi, 11, "hanoi"
+    )
+    figure_kb = len(pio.to_json({"data": traces}, validate=False)) / 1024
+    layer_count = len(app._affordability_tile_overlays("hanoi", outlets, isochrones)[1])
+    vector_tiles.warm_sources("hanoi")
+
+    def viewport(zoom):
+        total = 0
+        for z, x, y in _viewport_tiles(105.85, 21.0, zoom):
+            total += len(vector_tiles.get_tile("hanoi", "isochrones", categories, z, x, y))
+            for category in categories:
+                total += len(vector_tiles.get_tile("hanoi", "outlets", (category,), z, x, y))
+        return total
+
+    rows = []
+    for zoom in (9, 11, 13, 15):
+        vector_tiles.get_tile.cache_clear()
+        start = time.perf_counter()
+        size = viewport(zoom)
+        cold = (time.perf_counter() - start) * 1000
+        rows.append((
+            zoom,
+            len(_viewport_tiles(105.85, 21.0, zoom)) * (len(categories) + 1),
+            f"{figure_kb:.1f}",
+            f"{size / 1024:.1f}",
+            _ms(cold),
+            _ms(time_ms(lambda: viewport(zoom), repeat)),
+        ))
+    print_table(
+        f"Hanoi SELECT_ALL overlays ({layer_count} mapbox layers in tile mode), 1200x800 viewport: KB, ms",
+        ("zoom", "tiles", "figure traces", "tiles", "cut (cold)", "served (cached)"),
+        rows,
+    )
+
+
+@benchmark
+def isochrone_union(repeat):
+    """Cold SELECT_ALL isochrone union: every outlet polygon vs the pre-dissolved store."""
+    import shapely
+    from shapely.ops import unary_union
+
+    import isochrone_store
+    from data_io import read_vector
+    from data_registry import isochrones_path_hanoi
+
+    filenames = sorted(f for f in os.listdir(isochrones_path_hanoi) if f.endswith(isochrone_store.ISOCHRONE_SUFFIX))
+
+    def per_outlet():
+        geoms = []
+        for filename in filenames:
+            gdf = read_vector(os.path.join(isochrones_path_hanoi, filename), columns=())
+            geoms.extend(geom for geom in gdf.geometry if geom is not None and not geom.is_empty)
+        return unary_union(geoms)
+
+    def dissolved():
+        isochrone_store._load_store.cache_clear()
+        isochrone_store.dissolved_category.cache_clear()
+        return isochrone_store.union_categories(isochrones_path_hanoi, filenames)
+
+    has_store = any(os.path.exists(p) for p in isochrone_store.store_dependencies(isochrones_path_hanoi))
+    rows = [
+        ("unary_union of every outlet isochrone", _ms(time_ms(per_outlet, repeat)), shapely.get_num_coordinates(per_outlet())),
+        (
+            "union of pre-dissolved categories" + ("" if has_store else " (no store: dissolved on demand)"),
+            _ms(time_ms(dissolved, repeat)),
+            shapely.get_num_coordinates(dissolved()),
+        ),
+    ]
+    print_table(
+        f"Hanoi SELECT_ALL isochrone union, {len(filenames)} categories, caches cleared (median ms)",
+        ("method", "ms", "vertices"),
+        rows,
+    )
+
+
+@benchmark
+def coverage(repeat):
+    """% residents within 30 min of a selection: vector union + overlay vs packed coverage rasters."""
+    import coverage_raster
+    import isochrone_store
+    from data_registry import isochrones_path_hanoi, registry
+
+    areas = registry.get("hanoi", "food_env")
+    utm = areas.estimate_utm_crs()
+    projected = areas.to_crs(utm)
+    population = areas["dan_so"].astype(float).to_numpy()
+    files = registry.get("hanoi", "isochrone_files")
+    coverage_raster.access_share("hanoi", ())
+
+    def vector(selection):
+        union = isochrone_store.union_categories(isochrones_path_hanoi, selection)
+        union = gpd.GeoSeries([union], crs="EPSG:4326").to_crs(utm).iloc[0]
+        share = projected.geometry.intersection(union).area / projected.geometry.area
+        return 100 * (share.to_numpy() * population).sum() / population.sum()
+
+    rows = []
+    for label, selection in (
+        ("healthy", [f for f in files if coverage_raster.category_of(f) in coverage_raster.OUTLET_GROUPS["healthy"]]),
+        ("SELECT_ALL", files),
+    ):
+        rows.append((
+            f"{label} ({len(selection)} categories)",
+            f"{vector(selection):.2f}",
+            f"{coverage_raster.access_share('hanoi', selection)[1]:.2f}",
+            _ms(time_ms(lambda: vector(selection), repeat)),
+            f"{time_ms(lambda: coverage_raster.access_share('hanoi', selection), repeat * 20):.3f}",
+        ))
+    print_table(
+        f"Hanoi population within 30 min, {coverage_raster.GRID_METRES} m grid (% and median ms)",
+        ("selection", "vector %", "raster %", "vector ms", "raster ms"),
+        rows,
+    )
+
+
+@benchmark
+def clusters(repeat):
+    """Hanoi SELECT_ALL outlets: points vs precomputed per-zoom clusters."""
+    import outlet_clusters
+    from data_registry import registry
+
+    categories = [os.path.splitext(f)[0] for f in registry.get("hanoi", "outlet_files")]
+    outlet_clusters.category_clusters.cache_clear()
+    precompute = time_ms(lambda: outlet_clusters.warm("hanoi"), 1)
+    rows = []
+    for zoom in (8, 10, 11, 12, 13):
+        found = outlet_clusters.clusters("hanoi", categories, zoom)
+        rows.append((
+            zoom,
+            int(found["count"].sum()),
+            len(found["count"]),
+            _ms(time_ms(lambda: outlet_clusters.clusters("hanoi", categories, zoom), repeat)),
+        ))
+    print_table(
+        f"Outlet clusters, {outlet_clusters.CLUSTER_CELL_PX} px cells "
+        f"(precompute all zooms: {_ms(precompute)} ms)",
+        ("zoom", "outlets", "clusters", "merge ms"),
+        rows,
+    )
+
+
+@benchmark
+def outlet_store(repeat):
+    """Hanoi SELECT_ALL outlets: one trace per outlet file vs one trace over the columnar store."""
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    import app
+    import outlet_store as store_module
+    from data_registry import outlets_path_hanoi
+    from figure_optimizer import optimize_figure
+
+    files = app.registry.get("hanoi", "outlet_files")
+    outlets, _ = app._selected_outlets_and_isochrones(["SELECT_ALL"], files, [])
+    palette = app._outlet_palette(len(outlets))
+
+    def per_file():
+        traces = []
+        for i, filename in enumerate(outlets):
+            gdf = app._read_geojson_cached(os.path.join(outlets_path_hanoi, filename), ())
+            traces.append(go.Scattermapbox(
+                lat=gdf.geometry.y, lon=gdf.geometry.x, mode="markers",
+                marker=dict(size=6, color=palette[i], opacity=0.8),
+                name=app._outlet_legend_name(filename), hoverinfo="skip",
+            ))
+        return traces
+
+    def single():
+        return app._affordability_overlay_traces(outlets, [], app.isochrones_path_hanoi, None, "hanoi")
+
+    store_module.load_outlets("hanoi")
+    rows = []
+    for label, build in (("trace per outlet file", per_file), ("one trace over the store", single)):
+        traces = build()
+        rows.append((
+            label,
+            len(traces),
+            f"{len(pio.to_json({'data': traces}, validate=False)) / 1024:.1f}",
+            f"{len(json.dumps(optimize_figure(json.loads(pio.to_json({'data': traces, 'layout': {}}, validate=False))))) / 1024:.1f}",
+            _ms(time_ms(build, repeat)),
+        ))
+    print_table(
+        f"Hanoi SELECT_ALL outlets ({len(outlets)} categories, {int(store_module.select('hanoi', outlets).sum())} points)",
+        ("method", "traces", "KB", "KB (optimized)", "build ms"),
+        rows,
+    )
+
+
+@benchmark
+def geojson(repeat):
+    """GeoDataFrame -> GeoJSON: to_json + json.loads vs the vectorized encoder (geojson_encoder.py)."""
+    import app
+    from geojson_encoder import feature_collection, feature_collection_bytes
+    from geometry_lod import lod_for_zoom, simplify_gdf
+
+    layers = [
+        ("addis MPI", lambda: app.registry.get("addis", "mpi")),
+        ("hanoi MPI", lambda: app.registry.get("hanoi", "mpi")),
+        ("hanoi MPI (zoom 10)", lambda: simplify_gdf(app.registry.get("hanoi", "mpi"), lod_for_zoom(10))),
+        ("hanoi food environment", lambda: app.registry.get("hanoi", "food_env")),
+        ("resilience districts", lambda: app._get_resilience_context()["districts_unique"]),
+    ]
+    rows = []
+    for label, load in layers:
+        try:
+            gdf = load()
+        except Exception as exc:
+            rows.append((label, f"error: {exc.__class__.__name__}", "", "", "", "", ""))
+            continue
+        rows.append((
+            label,
+            len(gdf),
+            "yes" if feature_collection(gdf) == json.loads(gdf.to_json()) else "NO",
+            _ms(time_ms(lambda: json.loads(gdf.to_json()), repeat)),
+            _ms(time_ms(lambda: feature_collection(gdf), repeat)),
+            _ms(time_ms(lambda: gdf.to_json(), repeat)),
+            _ms(time_ms(lambda: feature_collection_bytes(gdf), repeat)),
+        ))
+    print_table(
+        "GeoJSON encoding (median ms)",
+        ("layer", "features", "identical", "json.loads(to_json)", "feature_collection", "to_json", "bytes"),
+        rows,
+    )
+
+
+@benchmark
+def geometry_meta(repeat):
+    """Map centre per callback: lon/lat centroids each call vs the projected metadata table."""
+    import warnings
+
+    import numpy as np
+
+    import geometry_meta as meta
+    from data_registry import registry
+
+    rows = []
+    for city in ("addis", "hanoi"):
+        mpi = registry.get(city, "mpi")
+        table = registry.get(city, "mpi_meta")
+
+        def per_call():
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                return {"lat": mpi.geometry.centroid.y.mean(), "lon": mpi.geometry.centroid.x.mean()}
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            degree_centroids = mpi.geometry.centroid
+        shift = gpd.GeoSeries(degree_centroids, crs="EPSG:4326").to_crs(mpi.estimate_utm_crs()).distance(
+            gpd.GeoSeries(gpd.points_from_xy(table["lon"], table["lat"]), index=mpi.index, crs="EPSG:4326")
+            .to_crs(mpi.estimate_utm_crs())
+        )
+        rows.append((
+            city,
+            len(table),
+            _ms(time_ms(lambda: meta.metadata_table(mpi), repeat)),
+            f"{time_ms(per_call, repeat * 20):.2f}",
+            f"{time_ms(lambda: meta.view(registry.get(city, 'mpi_meta')), repeat * 20):.2f}",
+            f"{np.nanmax(shift.to_numpy()):.1f}",
+        ))
+    print_table(
+        "MPI boundary metadata (median ms; centroid shift in m)",
+        ("city", "features", "build table", "centroids per call", "table lookup", "max degree-centroid error m"),
+        rows,
+    )
+
+
+@benchmark
+def mpi_variable(repeat):
+    """Hanoi MPI variable change: the full map payload vs the float32 colour values alone."""
+    import app
+
+    def full():
+        return app._get_mpi_map_payload_hanoi.__wrapped__(None, app._mpi_lod_hanoi(None))
+
+    rows = []
+    for label, build in (
+        ("full figure + topology", full),
+        ("colour values (float32)", lambda: app._mpi_values_payload("hanoi", app.mpi_vars[1])),
+    ):
+        payload = json.dumps(build(), default=lambda value: value.tolist()).encode()
+        rows.append((
+            label,
+            f"{len(payload) / 1024:.1f}",
+            f"{len(gzip.compress(payload)) / 1024:.1f}",
+            _ms(time_ms(build, repeat)),
+            f"{len(payload) * 8 / 1e6 * 1000:.0f}",
+        ))
+    print_table(
+        "Hanoi MPI variable change (median ms; transfer at 1 Mbit/s, uncompressed)",
+        ("payload", "KB", "gzip KB", "server ms", "ms @1Mbit/s"),
+        rows,
+    )
+
+
+@benchmark
+def mpi_ranking(repeat):
+    """Hanoi MPI bar chart: every commune re-sorted per view vs one page of a precomputed ranking."""
+    import numpy as np
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+    import mpi_ranking as ranking_module
+    from data_registry import registry
+
+    names = list(registry.get("hanoi", "mpi")["Name"].astype(str))
+    values = registry.get("hanoi", "mpi_values")
+    variable = next(iter(values))
+    rows = []
+    # Tile the communes to see how both approaches scale with the count.
+    for copies in (1, 10, 100):
+        df = pd.DataFrame({
+            "Name": [f"{n} {c}" for c in range(copies) for n in names],
+            variable: np.tile(values[variable], copies),
+        })
+
+        def full():
+            ordered = df.sort_values(by=variable, ascending=False)
+            return px.bar(ordered, x=variable, y="Name", orientation="h").to_json()
+
+        ranking = ranking_module.build_ranking(df["Name"], {variable: df[variable].to_numpy()})
+
+        def page():
+            features, ranks, _ = ranking_module.window(ranking, variable, "top", len(df) // 2)
+            return go.Figure(go.Bar(
+                x=df[variable].to_numpy()[features], y=[ranking["names"][i] for i in features],
+                customdata=ranks, orientation="h",
+            )).to_json()
+
+        rows.append((
+            len(df),
+            f"{len(full()) / 1024:.1f}", _ms(time_ms(full, repeat)),
+            f"{len(page()) / 1024:.1f}", _ms(time_ms(page, repeat)),
+            _ms(time_ms(lambda: ranking_module.build_ranking(df["Name"], {variable: df[variable].to_numpy()}), repeat)),
+        ))
+    print_table(
+        f"Hanoi MPI bar chart (median ms; page of {ranking_module.PAGE_SIZE}; ranking built once per variable at load)",
+        ("communes", "full KB", "full ms", "page KB", "page ms", "rank ms"),
+        rows,
+    )
+
+
+@benchmark
+def mpi_districts(repeat):
+    """Hanoi MPI map: all communes at once vs the district view and one district's communes."""
+    import numpy as np
+    import app
+    import mpi_districts as districts_module
+    from data_registry import registry
+    from topojson_codec import encode_topology
+
+    def kb(payload):
+        return f"{len(json.dumps(payload, default=lambda value: value.tolist())) / 1024:.1f}"
+
+    def all_communes():
+        # The commune map the page used to open on
+        geojson = app._get_mpi_geojson_lod.__wrapped__("hanoi", app.lod_for_zoom(app.MPI_FOCUS_ZOOM))
+        return encode_topology({"mpi": geojson}, properties=["ma_xa"])
+
+    names = registry.get("hanoi", "mpi_districts")["Dist_Name"].tolist()
+    drill = [kb(app._get_mpi_map_payload_hanoi.__wrapped__(name, app._mpi_lod_hanoi(name))) for name in names]
+    sizes = sorted(float(size) for size in drill)
+    rows = [
+        ("all communes (topology only)", kb(all_communes()), _ms(time_ms(all_communes, repeat))),
+        ("districts", kb(app._get_mpi_map_payload_hanoi.__wrapped__(None, app._mpi_lod_hanoi(None))),
+         _ms(time_ms(lambda: app._get_mpi_map_payload_hanoi.__wrapped__(None, app._mpi_lod_hanoi(None)), repeat))),
+        ("one district's communes (median)", f"{sizes[len(sizes) // 2]:.1f}",
+         _ms(time_ms(lambda: app._get_mpi_map_payload_hanoi.__wrapped__(names[0], app._mpi_lod_hanoi(names[0])), repeat))),
+        ("one district's communes (largest)", f"{sizes[-1]:.1f}", "-"),
+    ]
+    print_table("Hanoi MPI map payloads (median ms)", ("view", "KB", "build ms"), rows)
+
+    mpi = registry.get("hanoi", "mpi")
+    districts = registry.get("hanoi", "mpi_districts")
+    assigned = registry.get("hanoi", "mpi_commune_district")
+    weights = np.ones(len(mpi))
+    print_table(
+        "Hanoi commune -> district precomputation, once at load (median ms)",
+        ("step", "ms"),
+        [
+            ("assign_districts", _ms(time_ms(lambda: districts_module.assign_districts(mpi, districts), repeat))),
+            ("rollup (all variables)", _ms(time_ms(
+                lambda: districts_module.rollup(registry.get("hanoi", "mpi_values"), assigned, weights, len(districts)),
+                repeat,
+            ))),
+        ],
+    )
+
+
+_NODE_HIGHLIGHT = """
+global.window = {dash_clientside: {no_update: {}}};
+require(process.argv[2] + "/topojson_decode.js");
+require(process.argv[2] + "/mpi_highlight.js");
+const fs = require("fs");
+const payload = JSON.parse(fs.readFileSync(process.argv[3], "utf8"));
+const centroids = JSON.parse(fs.readFileSync(process.argv[4], "utf8"));
+const repeat = Number(process.argv[5]);
+const timings = [];
+for (let i = 0; i < repeat; i++) {
+  const name = centroids.names[i % centroids.names.length];
+  const start = process.hrtime.bigint();
+  window.dash_clientside.mpi.highlight(payload, {points: [{y: name}]}, centroids);
+  timings.push(Number(process.hrtime.bigint() - start) / 1e6);
+}
+timings.sort((a, b) => a - b);
+console.log(JSON.stringify(timings[Math.floor(timings.length / 2)]));
+"""
+
+
+@benchmark
+def mpi_highlight(repeat):
+    """MPI bar click: the server map rebuild a click used to trigger vs the clientside highlight."""
+    import app
+
+    node = shutil.which("node")
+    assets = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+    rows = []
+    for city, build in (("addis", lambda variable: app.update_map(variable)[0]),
+                       ("hanoi", lambda _: app._get_mpi_map_payload_hanoi.__wrapped__(None, app._mpi_lod_hanoi(None)))):
+        variable = app.mpi_vars[0]
+        payload = json.dumps(build(variable), default=lambda value: value.tolist())
+        server_ms = time_ms(lambda: build(variable), repeat)
+        client_ms = None
+        if node is not None:
+            with tempfile.TemporaryDirectory() as tmp:
+                paths = [os.path.join(tmp, name) for name in ("highlight.js", "payload.json", "centroids.json")]
+                # Hanoi opens on its districts (see app._mpi_level_hanoi)
+                centroids = app.registry.get(city, "mpi_centroids") if city == "addis" else app._mpi_level_controls_hanoi(None)[0]
+                contents = (_NODE_HIGHLIGHT, payload, json.dumps(centroids))
+                for path, content in zip(paths, contents):
+                    with open(path, "w") as fh:
+                        fh.write(content)
+                result = subprocess.run(
+                    [node, paths[0], assets, paths[1], paths[2], str(repeat * 20)], capture_output=True, text=True
+                )
+            if result.returncode == 0:
+                client_ms = json.loads(result.stdout)
+        rows.append((city, f"{len(payload) / 1024:.0f}", _ms(server_ms), "-" if client_ms is None else f"{client_ms:.3f}"))
+    print_table(
+        "MPI bar click (median): server rebuild + payload it used to cost vs clientside highlight (node)",
+        ("city", "payload KB", "server ms", "clientside ms"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repeat = 5
+    if "--repeat" in args:
+        index = args.index("--repeat")
+        repeat = int(args[index + 1])
+        del args[index:index + 2]
+    names = args or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"unknown benchmark {name!r}; choose from {', '.join(BENCHMARKS)}")
+            sys.exit(2)
+        BENCHMARKS[name](repeat)
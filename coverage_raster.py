@@ -0,0 +1,254 @@
+"""
+Isochrone coverage rasters for the EcoFoodSystems Dashboard
+
+Answers "what share of residents live within 30 minutes of the selected
+outlet types?" for any selection, per commune/district and city-wide.
+
+Each city gets a fixed GRID_METRES (default 50 m) grid in its local UTM zone,
+covering the food-environment areas. Only cells inside an area are kept,
+ordered by area and padded so every area starts on a byte boundary. For each
+outlet category the cells inside its dissolved 30-minute isochrone (see
+isochrone_store.py) are stored as a packed bit row. A selection is then:
+
+    np.bitwise_or.reduce(rows)          union of the selected categories
+    popcount, summed per area           covered cells per area
+    x residents per cell                covered residents per area
+
+The repo has no gridded population, so each area's population (pop_sum in
+Addis, dan_so in Hanoi) is spread evenly over its cells.
+
+Rasters are cached in DATA_CACHE_DIR (derived/<isochrone folder>_coverage.npz,
+written with an atomic rename) together with a digest of every file they
+were built from, and rebuilt when that digest changes; without
+DATA_CACHE_DIR they are built in memory on first use. Build them ahead of
+a deploy with:
+
+    DATA_CACHE_DIR=... python coverage_raster.py build
+"""
+
+import os
+import sys
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from data_manifest import cached_builder, dependency_digest, derived_path, write_atomic
+from data_registry import (
+    registry, isochrones_path, isochrones_path_hanoi,
+    food_env_path, food_env_path_hanoi, food_env_values_path_hanoi,
+)
+from isochrone_store import ISOCHRONE_SUFFIX, dissolved_category, store_dependencies
+
+
+GRID_METRES = int(os.environ.get("COVERAGE_GRID_METRES", "50"))
+
+_ISOCHRONE_DIRS = {"addis": isochrones_path, "hanoi": isochrones_path_hanoi}
+_AREA_DEPS = {
+    "addis": [food_env_path],
+    "hanoi": [food_env_path_hanoi, food_env_values_path_hanoi],
+}
+_POPULATION_COLUMNS = ("pop_sum", "dan_so")
+
+# Outlet categories behind the Count_healthy / Count_UnhealthyOutlets /
+# Count_MixOutlets columns of the food-environment layers.
+OUTLET_GROUPS = {
+    "healthy": (
+        "amenity_drinking_water", "amenity_marketplace", "shop_butcher", "shop_dairy",
+        "shop_farm", "shop_greengrocer", "shop_health_food", "shop_seafood",
+    ),
+    "unhealthy": (
+        "amenity_cafe", "amenity_fast_food", "amenity_ice_cream", "amenity_vending_machine",
+        "shop_bakery", "shop_beverages", "shop_confectionery", "shop_convenience",
+        "shop_kiosk", "shop_pastry",
+    ),
+    "mixed": ("amenity_pub", "amenity_restaurant", "shop_deli", "shop_supermarket"),
+}
+
+# Set bits per byte value, for popcounts on NumPy < 2.0.
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def coverage_path(city):
+    """Path of a city's cached raster, or None without DATA_CACHE_DIR."""
+    return derived_path(os.path.basename(os.path.normpath(_ISOCHRONE_DIRS[city])) + "_coverage.npz")
+
+
+def _isochrone_files(city):
+    folder = _ISOCHRONE_DIRS[city]
+    if not os.path.isdir(folder):
+        return []
+    return sorted(f for f in os.listdir(folder) if f.endswith(ISOCHRONE_SUFFIX))
+
+
+def sources(city):
+    """Files a city's coverage raster is built from."""
+    folder = _ISOCHRONE_DIRS[city]
+    return (
+        _AREA_DEPS[city]
+        + [os.path.join(folder, f) for f in _isochrone_files(city)]
+        + store_dependencies(folder)
+    )
+
+
+def category_of(filename):
+    """Category of an outlet or isochrone file name, without the city suffix."""
+    stem = os.path.basename(filename).replace(ISOCHRONE_SUFFIX, "").replace(".geojson", "")
+    return stem.rsplit("_", 1)[0]
+
+
+def _window_cells(geom, origin, width, height):
+    """Flat grid indices of the cell centres inside geom (a prepared geometry in grid CRS)."""
+    minx, miny, maxx, maxy = geom.bounds
+    x0, top = origin
+    col0 = max(int((minx - x0) // GRID_METRES), 0)
+    col1 = min(int((maxx - x0) // GRID_METRES) + 1, width)
+    row0 = max(int((top - maxy) // GRID_METRES), 0)
+    row1 = min(int((top - miny) // GRID_METRES) + 1, height)
+    if col0 >= col1 or row0 >= row1:
+        return np.empty(0, dtype=np.int64)
+    cols = np.arange(col0, col1)
+    rows = np.arange(row0, row1)
+    xs = x0 + (cols + 0.5) * GRID_METRES
+    ys = top - (rows + 0.5) * GRID_METRES
+    inside = shapely.contains_xy(geom, xs[None, :], ys[:, None])
+    r, c = np.nonzero(inside)
+    return (rows[r] * width + cols[c]).astype(np.int64)
+
+
+def build_grid(city):
+    """Coverage grid of a city as a dict of arrays (see the module docstring)."""
+    areas = registry.get(city, "food_env")
+    if areas is None:
+        raise FileNotFoundError(f"No food-environment layer for {city}")
+    population_column = next((c for c in _POPULATION_COLUMNS if c in areas.columns), None)
+    if population_column is None:
+        raise KeyError(f"No population column in the {city} food-environment layer")
+
+    crs = areas.estimate_utm_crs()
+    projected = areas.to_crs(crs).geometry.values
+    minx, miny, maxx, maxy = shapely.total_bounds(projected)
+    width = int(np.ceil((maxx - minx) / GRID_METRES))
+    height = int(np.ceil((maxy - miny) / GRID_METRES))
+    origin = (minx, maxy)
+
+    # Cells of each area, padded with -1 to whole bytes.
+    cell_index, area_cells, claimed = [], [], np.zeros(width * height, dtype=bool)
+    for geom in projected:
+        cells = np.empty(0, dtype=np.int64)
+        if geom is not None and not geom.is_empty:
+            shapely.prepare(geom)
+            cells = _window_cells(geom, origin, width, height)
+            # A centre on a shared border belongs to the first area only.
+            cells = cells[~claimed[cells]]
+            claimed[cells] = True
+        area_cells.append(len(cells))
+        cell_index.append(np.concatenate([cells, np.full(-len(cells) % 8, -1, dtype=np.int64)]))
+    area_bytes = np.array([len(c) // 8 for c in cell_index], dtype=np.int64)
+    cell_index = np.concatenate(cell_index) if cell_index else np.empty(0, dtype=np.int64)
+    valid = cell_index >= 0
+    cell_x = np.where(valid, minx + (cell_index % width + 0.5) * GRID_METRES, np.nan)
+    cell_y = np.where(valid, maxy - (cell_index // width + 0.5) * GRID_METRES, np.nan)
+
+    folder = _ISOCHRONE_DIRS[city]
+    categories, rows = [], []
+    for filename in _isochrone_files(city):
+        geom = dissolved_category(folder, filename)
+        covered = np.zeros(len(cell_index), dtype=bool)
+        if geom is not None and not geom.is_empty:
+            geom = gpd.GeoSeries([geom], crs="EPSG:4326").to_crs(crs).iloc[0]
+            shapely.prepare(geom)
+            covered[valid] = shapely.contains_xy(geom, cell_x[valid], cell_y[valid])
+        categories.append(category_of(filename))
+        rows.append(np.packbits(covered))
+
+    population = areas[population_column].astype(float).fillna(0).to_numpy()
+    cells = np.asarray(area_cells, dtype=float)
+    return {
+        "categories": np.asarray(categories),
+        "coverage": np.vstack(rows) if rows else np.zeros((0, int(area_bytes.sum())), dtype=np.uint8),
+        "area_starts": np.concatenate([[0], np.cumsum(area_bytes)[:-1]]).astype(np.int64),
+        "area_cells": cells.astype(np.int64),
+        "area_population": population,
+        "cell_population": np.divide(population, cells, out=np.zeros_like(population), where=cells > 0),
+        "cell_index": cell_index,
+        "grid": np.array([minx, maxy, GRID_METRES, width, height], dtype=float),
+        "crs": np.asarray(crs.to_string()),
+    }
+
+
+@cached_builder(sources, maxsize=2)
+def _load(city):
+    """Coverage grid of a city from its .npz, rebuilt and stored when its sources changed."""
+    digest = dependency_digest(sources(city))
+    path = coverage_path(city)
+    grid = None
+    if path is not None and os.path.exists(path):
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                if str(stored["digest"]) == digest and int(stored["grid"][2]) == GRID_METRES:
+                    grid = {key: stored[key] for key in stored.files}
+        except Exception as exc:
+            print(f"[WARN] Could not read coverage raster {path}: {exc}")
+    if grid is None:
+        grid = build_grid(city)
+        grid["digest"] = np.asarray(digest)
+        if path is not None:
+            try:
+                write_atomic(path, lambda tmp_path: np.savez_compressed(tmp_path, **grid))
+            except OSError as exc:
+                print(f"[WARN] Could not store coverage raster {path}: {exc}")
+    return dict(grid, rows={c: i for i, c in enumerate(grid["categories"].tolist())})
+
+
+def _popcount(packed):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(packed)
+    return _POPCOUNT[packed]
+
+
+def covered_population(city, categories):
+    """(covered residents per area, residents per area) for outlet categories of a city.
+
+    categories are category names (see category_of) or outlet/isochrone file names.
+    """
+    grid = _load(city)
+    rows = [grid["rows"].get(category_of(c) if c.endswith(".geojson") else c) for c in categories]
+    rows = [r for r in rows if r is not None]
+    population = grid["area_population"]
+    if not rows:
+        return np.zeros_like(population), population
+    union = np.bitwise_or.reduce(grid["coverage"][rows], axis=0)
+    running = np.concatenate([[0], np.cumsum(_popcount(union), dtype=np.int64)])
+    starts = grid["area_starts"]
+    ends = np.append(starts[1:], len(union))
+    return (running[ends] - running[starts]) * grid["cell_population"], population
+
+
+def access_share(city, categories):
+    """(% of residents per area, % city-wide) within 30 minutes of any of the categories."""
+    covered, population = covered_population(city, categories)
+    by_area = np.divide(100 * covered, population, out=np.full(len(population), np.nan), where=population > 0)
+    total = population.sum()
+    return by_area, (100 * covered.sum() / total if total else float("nan"))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print("usage: DATA_CACHE_DIR=... python coverage_raster.py build")
+        sys.exit(2)
+    if coverage_path("addis") is None:
+        print("[WARN] Set DATA_CACHE_DIR to the directory the rasters should be built in")
+        sys.exit(2)
+
+    for city in _ISOCHRONE_DIRS:
+        try:
+            grid = _load(city)
+        except Exception as exc:
+            print(f"[WARN] Could not build the {city} coverage raster: {exc}")
+            continue
+        width, height = int(grid["grid"][3]), int(grid["grid"][4])
+        print(
+            f"{city}: {len(grid['categories'])} categories on a {width}x{height} grid "
+            f"({int(grid['area_cells'].sum())} cells in areas) -> {coverage_path(city)}"
+        )
@@ -0,0 +1,336 @@
+"""
+Columnar sidecar loading for the EcoFoodSystems Dashboard
+
+Every CSV / GeoJSON / shapefile under assets/data may have a Parquet sidecar
+next to it with the same stem (e.g. hanoi_communes.geojson ->
+hanoi_communes.parquet), following the emdat_*.parquet pattern. Loaders read
+the sidecar when it exists and is at least as new as its source, and fall back
+to parsing the source otherwise. Vector sidecars are GeoParquet and already in
+EPSG:4326, so cold starts skip both GeoJSON parsing and to_crs.
+
+Build or refresh all sidecars with:
+
+    python data_io.py build
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+import pandas as pd
+import geopandas as gpd
+
+from startup_trace import add_span
+
+
+TARGET_CRS = "EPSG:4326"
+SIDECAR_EXT = ".parquet"
+_READ_OPTIONS_KEY = b"efs_read_options"
+
+# DATA_SIDECARS=off ignores sidecars entirely; DATA_SIDECARS=write also writes
+# a sidecar whenever a source file had to be parsed.
+_SIDECAR_MODE = os.environ.get("DATA_SIDECARS", "read").strip().lower()
+
+
+def sidecar_path(path):
+    return os.path.splitext(path)[0] + SIDECAR_EXT
+
+
+# Files a shapefile is read from besides the .shp (attributes, index,
+# projection, encoding).
+SHAPEFILE_PARTS = (".dbf", ".shx", ".prj", ".cpg")
+
+
+def source_files(path):
+    """path, plus the component files next to it when it is a shapefile."""
+    stem, ext = os.path.splitext(path)
+    if ext.lower() != ".shp":
+        return [path]
+    return [path] + [stem + part for part in SHAPEFILE_PARTS if os.path.exists(stem + part)]
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _fresh_sidecar(path):
+    if _SIDECAR_MODE == "off":
+        return None
+    sidecar = sidecar_path(path)
+    sidecar_mtime = _mtime(sidecar)
+    if sidecar_mtime is None:
+        return None
+    # A shapefile edit may only touch its .dbf (attributes), .prj, ...
+    source_mtimes = [m for m in map(_mtime, source_files(path)) if m is not None]
+    if source_mtimes and sidecar_mtime < max(source_mtimes):
+        return None
+    return sidecar
+
+
+# Per-file read timings: (path, format, seconds, thread name). Reads run
+# concurrently during a parallel preload, hence the lock.
+_read_log = []
+_read_log_lock = threading.Lock()
+
+
+# Files read on this thread while a registry loader runs (see track_reads).
+_tracking = threading.local()
+
+
+@contextmanager
+def track_reads():
+    """Collect the paths passed to read_table/read_vector/note_dependency in this block."""
+    stack = _tracking.__dict__.setdefault("stack", [])
+    paths = set()
+    stack.append(paths)
+    try:
+        yield paths
+    finally:
+        stack.pop()
+
+
+def note_dependency(path):
+    path = os.path.abspath(path)
+    for paths in getattr(_tracking, "stack", ()):
+        paths.add(path)
+
+
+def _log_read(path, fmt, start):
+    add_span(f"read {os.path.basename(path)}", start, path=path, format=fmt)
+    with _read_log_lock:
+        _read_log.append((path, fmt, time.perf_counter() - start, threading.current_thread().name))
+
+
+def read_log():
+    with _read_log_lock:
+        return list(_read_log)
+
+
+def read_report(root=None):
+    """Per-file timing table of every read so far, slowest first."""
+    lines = [f"{'read (ms)':>10} {'format':<8} {'thread':<12} file"]
+    for path, fmt, seconds, thread in sorted(read_log(), key=lambda row: -row[2]):
+        name = os.path.relpath(path, root) if root else path
+        lines.append(f"{seconds * 1000:>10.1f} {fmt:<8} {thread:<12} {name}")
+    return "\n".join(lines)
+
+
+def _read_options_signature(read_csv_kwargs):
+    return json.dumps(read_csv_kwargs or {}, sort_keys=True, default=str)
+
+
+# -------------------------- Tables ------------------------- #
+
+def _read_table_sidecar(sidecar, signature):
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(sidecar)
+    metadata = table.schema.metadata or {}
+    stored = metadata.get(_READ_OPTIONS_KEY, b"{}").decode()
+    if stored != signature:
+        # Sidecar was written with different parse options (dtype, na handling, ...)
+        return None
+    return table.to_pandas()
+
+
+def write_table_sidecar(df, path, read_csv_kwargs=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_READ_OPTIONS_KEY] = _read_options_signature(read_csv_kwargs).encode()
+    pq.write_table(table.replace_schema_metadata(metadata), sidecar_path(path))
+
+
+def read_table(path, **read_csv_kwargs):
+    """pd.read_csv(path, **kwargs), served from a fresh Parquet sidecar when available."""
+    note_dependency(path)
+    start = time.perf_counter()
+    sidecar = _fresh_sidecar(path)
+    if sidecar is not None:
+        try:
+            df = _read_table_sidecar(sidecar, _read_options_signature(read_csv_kwargs))
+            if df is not None:
+                _log_read(path, "parquet", start)
+                return df
+        except Exception as exc:
+            print(f"[WARN] Could not read parquet sidecar {sidecar}: {exc}")
+
+    df = pd.read_csv(path, **read_csv_kwargs)
+    _log_read(path, "csv", start)
+    if _SIDECAR_MODE == "write":
+        try:
+            write_table_sidecar(df, path, read_csv_kwargs)
+        except Exception as exc:
+            print(f"[WARN] Could not write parquet sidecar for {path}: {exc}")
+    return df
+
+
+# -------------------------- Vectors ------------------------- #
+
+def write_vector_sidecar(gdf, path):
+    # The bbox covering column lets read_parquet(bbox=...) skip row groups.
+    gdf.to_parquet(sidecar_path(path), index=False, write_covering_bbox=True)
+
+
+@lru_cache(maxsize=1)
+def _target_crs():
+    from pyproj import CRS
+
+    return CRS.from_user_input(TARGET_CRS)
+
+
+def _read_geoparquet(sidecar, columns=None, bbox=None):
+    """Read a sidecar written by write_vector_sidecar.
+
+    Sidecars are always EPSG:4326, so the full read skips gpd.read_parquet's
+    per-call PROJJSON parsing (~30 ms) and reuses one CRS object.
+    """
+    parquet_columns = None if columns is None else [*columns, "geometry"]
+    if bbox is not None:
+        return gpd.read_parquet(sidecar, columns=parquet_columns, bbox=bbox)
+
+    import pyarrow.parquet as pq
+
+    df = pq.read_table(sidecar, columns=parquet_columns).to_pandas()
+    df = df.drop(columns=["bbox"], errors="ignore")
+    geometry = gpd.array.from_wkb(df.pop("geometry").values, crs=_target_crs())
+    return gpd.GeoDataFrame(df, geometry=geometry)
+
+
+def _bbox_in_crs(bbox, crs):
+    """Transform an EPSG:4326 (minx, miny, maxx, maxy) bbox into crs."""
+    if bbox is None or crs is None:
+        return bbox
+    from pyproj import CRS, Transformer
+
+    if CRS.from_user_input(crs).equals(CRS.from_user_input(TARGET_CRS)):
+        return bbox
+    transformer = Transformer.from_crs(TARGET_CRS, crs, always_xy=True)
+    return transformer.transform_bounds(*bbox)
+
+
+def _read_vector_source(path, columns=None, bbox=None):
+    """Parse a GeoJSON/shapefile through pyogrio's Arrow path and bring it into EPSG:4326."""
+    import pyogrio
+
+    kwargs = {"columns": list(columns) if columns is not None else None}
+    if bbox is not None:
+        kwargs["bbox"] = _bbox_in_crs(bbox, pyogrio.read_info(path)["crs"])
+    try:
+        gdf = pyogrio.read_dataframe(path, use_arrow=True, **kwargs)
+    except ImportError:
+        # pyarrow missing: same read through the slower feature-by-feature path.
+        gdf = pyogrio.read_dataframe(path, **kwargs)
+
+    if gdf.crs is None:
+        gdf = gdf.set_crs(TARGET_CRS)
+    elif not gdf.crs.equals(TARGET_CRS):
+        gdf = gdf.to_crs(TARGET_CRS)
+    return gdf
+
+
+def read_vector(path, columns=None, bbox=None):
+    """gpd.read_file(path) in EPSG:4326, served from a fresh GeoParquet sidecar when available.
+
+    columns limits the attribute columns read (geometry is always included;
+    pass () for geometry only). bbox is (minx, miny, maxx, maxy) in EPSG:4326
+    and keeps only features intersecting it.
+    """
+    for part in source_files(path):
+        note_dependency(part)
+    start = time.perf_counter()
+    sidecar = _fresh_sidecar(path)
+    if sidecar is not None:
+        try:
+            gdf = _read_geoparquet(sidecar, columns=columns, bbox=bbox)
+            _log_read(path, "parquet", start)
+            return gdf
+        except Exception as exc:
+            print(f"[WARN] Could not read geoparquet sidecar {sidecar}: {exc}")
+
+    gdf = _read_vector_source(path, columns=columns, bbox=bbox)
+    _log_read(path, os.path.splitext(path)[1].lstrip(".").lower(), start)
+
+    # Only a full read can stand in for the source file.
+    if _SIDECAR_MODE == "write" and columns is None and bbox is None:
+        try:
+            write_vector_sidecar(gdf, path)
+        except Exception as exc:
+            print(f"[WARN] Could not write geoparquet sidecar for {path}: {exc}")
+    return gdf
+
+
+# -------------------------- Build ------------------------- #
+
+_VECTOR_EXTS = {".geojson", ".json", ".shp"}
+_TABLE_EXTS = {".csv"}
+_SKIP_DIRS = {"legacy", "legacy_geojson_backups", "_geojson_legacy_backups_20260401"}
+
+
+def iter_source_files(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in _SKIP_DIRS)
+        for filename in sorted(filenames):
+            ext = os.path.splitext(filename)[1].lower()
+            if ext in _VECTOR_EXTS or ext in _TABLE_EXTS:
+                yield os.path.join(dirpath, filename)
+
+
+def build_sidecars(root, force=False):
+    """Write a sidecar for every source under root; returns (path, status) rows."""
+    global _SIDECAR_MODE
+
+    results = []
+    claimed = {}
+    for path in iter_source_files(root):
+        sidecar = sidecar_path(path)
+        if sidecar in claimed:
+            results.append((path, f"skipped: sidecar already used by {os.path.basename(claimed[sidecar])}"))
+            continue
+        claimed[sidecar] = path
+
+        if not force and _fresh_sidecar(path) is not None:
+            results.append((path, "fresh"))
+            continue
+        try:
+            if os.path.splitext(path)[1].lower() in _VECTOR_EXTS:
+                write_vector_sidecar(_read_vector_source(path), path)
+            else:
+                write_table_sidecar(pd.read_csv(path), path)
+            results.append((path, "written"))
+        except Exception as exc:
+            results.append((path, f"failed: {exc}"))
+
+    # Loaders that parse with non-default options (dtype, keep_default_na, ...)
+    # rewrite their own sidecars on this pass.
+    previous_mode = _SIDECAR_MODE
+    _SIDECAR_MODE = "write"
+    try:
+        from data_registry import registry
+        registry.clear()
+        registry.preload()
+    finally:
+        _SIDECAR_MODE = previous_mode
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print("usage: python data_io.py build [--force]")
+        sys.exit(2)
+
+    # Import by name so the registry loaders see the same module-level sidecar mode.
+    import data_io
+    from data_registry import data_root
+
+    for path, status in data_io.build_sidecars(data_root, force="--force" in sys.argv[2:]):
+        print(f"{status:<10} {os.path.relpath(path, data_root)}")
@@ -0,0 +1,342 @@
+"""
+Content-hash data manifest for the EcoFoodSystems Dashboard
+
+DATA_CACHE_DIR/manifest.json lists every source file under assets/data with
+its sha256, size and schema; without DATA_CACHE_DIR every file is hashed on
+first use. It is kept out of assets/data, which Dash serves publicly. Cached builders declare the files they depend on
+with @cached_builder, and their cache key includes those files' hashes, so a
+cached result can never outlive the data it was built from. For files the
+registry has loaded, the key uses the hash recorded when the dataset was
+read rather than the file now on disk, so a result built between a file
+change and the end of registry.reload() is keyed by the data it was
+actually built from. That also makes the cached results safe to persist
+across restarts and share between workers (set DATA_CACHE_DIR).
+
+Rebuild the manifest after changing data with:
+
+    DATA_CACHE_DIR=... python data_manifest.py build
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from collections import OrderedDict, namedtuple
+from functools import lru_cache, wraps
+
+from data_io import iter_source_files, read_table, SIDECAR_EXT
+from data_registry import data_root, registry
+
+
+MISSING = "missing"
+
+_CACHE_DIR = os.environ.get("DATA_CACHE_DIR", "").strip()
+MANIFEST_PATH = os.path.join(_CACHE_DIR, "manifest.json") if _CACHE_DIR else None
+_VECTOR_EXTS = {".geojson", ".json", ".shp"}
+
+
+def manifest_key(path):
+    """Manifest entries are keyed by path relative to assets/data, with forward slashes."""
+    path = os.path.abspath(path)
+    return os.path.relpath(path, data_root).replace(os.sep, "/")
+
+
+# -------------------------- Hashing ------------------------- #
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _file_schema(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in _VECTOR_EXTS:
+        import pyogrio
+
+        info = pyogrio.read_info(path)
+        return {
+            "columns": dict(zip(info["fields"].tolist(), [str(d) for d in info["dtypes"]])),
+            "geometry_type": info["geometry_type"],
+            "crs": info["crs"],
+            "rows": int(info["features"]),
+        }
+    if ext == ".csv":
+        df = read_table(path)
+        return {"columns": {c: str(t) for c, t in df.dtypes.items()}, "rows": len(df)}
+    if ext == SIDECAR_EXT:
+        import pyarrow.parquet as pq
+
+        metadata = pq.read_metadata(path)
+        schema = metadata.schema.to_arrow_schema()
+        return {"columns": {f.name: str(f.type) for f in schema}, "rows": metadata.num_rows}
+    return {}
+
+
+@lru_cache(maxsize=1)
+def load_manifest():
+    if MANIFEST_PATH is None or not os.path.exists(MANIFEST_PATH):
+        return {}
+    try:
+        with open(MANIFEST_PATH) as fh:
+            return json.load(fh).get("files", {})
+    except Exception as exc:
+        print(f"[WARN] Could not read data manifest: {exc}")
+        return {}
+
+
+_hash_memo = {}
+_hash_lock = threading.Lock()
+
+
+def _listing_hash(path):
+    """Directories (e.g. outlet folders) hash their file names and stamps."""
+    digest = hashlib.sha256()
+    for entry in sorted(os.scandir(path), key=lambda e: e.name):
+        if entry.is_file() and not entry.name.endswith(SIDECAR_EXT):
+            stat = entry.stat()
+            digest.update(f"{entry.name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def file_hash(path):
+    """sha256 of path, taken from the manifest when its size and mtime still match."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return MISSING
+    if os.path.isdir(path):
+        return _listing_hash(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    with _hash_lock:
+        memo = _hash_memo.get(path)
+    if memo is not None and memo[0] == stamp:
+        return memo[1]
+
+    entry = load_manifest().get(manifest_key(path))
+    if entry is not None and (entry.get("mtime_ns"), entry.get("size")) == stamp:
+        sha = entry["sha256"]
+    else:
+        sha = _sha256(path)
+    with _hash_lock:
+        _hash_memo[path] = (stamp, sha)
+    return sha
+
+
+def dependency_digest(paths, hash_of=file_hash):
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(f"{manifest_key(path)}={hash_of(path)}\n".encode())
+    return digest.hexdigest()
+
+
+def loaded_hash(path):
+    """Hash of path as the registry generation in use read it; the file on disk if no dataset read it."""
+    return registry.recorded_hash(path) or file_hash(path)
+
+
+# -------------------------- Cached builders ------------------------- #
+
+def _persisted_path(name, key):
+    return os.path.join(_CACHE_DIR, name, hashlib.sha256(repr(key).encode()).hexdigest() + ".pkl")
+
+
+def _load_persisted(path):
+    try:
+        with open(path, "rb") as fh:
+            return True, pickle.load(fh)
+    except FileNotFoundError:
+        return False, None
+    except Exception as exc:
+        print(f"[WARN] Could not read cached result {path}: {exc}")
+        return False, None
+
+
+def write_atomic(path, write):
+    """Create path by calling write(temporary path) and renaming the result into place.
+
+    The rename is atomic, so concurrent workers never read a partial file.
+    The temporary file keeps path's extension (np.savez appends ".npz").
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp" + os.path.splitext(path)[1])
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def derived_path(filename):
+    """Where a derived data file (built from assets/data) lives: DATA_CACHE_DIR, or None when unset.
+
+    Derived files are kept out of assets/data, which Dash serves publicly and
+    may be read-only.
+    """
+    if not _CACHE_DIR:
+        return None
+    return os.path.join(_CACHE_DIR, "derived", filename)
+
+
+def _store_persisted(path, value):
+    def write(tmp_path):
+        with open(tmp_path, "wb") as fh:
+            pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+    try:
+        write_atomic(path, write)
+    except Exception as exc:
+        print(f"[WARN] Could not persist cached result {path}: {exc}")
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+# Every cached builder, so invalidate_stale() can drop entries built from old files.
+_builders = []
+
+
+def cached_builder(depends_on, maxsize=32, persist=False):
+    """LRU cache whose key also includes the content hashes of the files it depends on (see loaded_hash).
+
+    depends_on is a list of data file paths, or a callable taking the builder's
+    arguments and returning one. With persist=True and DATA_CACHE_DIR set,
+    results are also pickled to disk, keyed by arguments and dependency hashes.
+    Arguments are bound to fn's signature with defaults filled in, so f(a),
+    f(a, None) and f(a, b=None) share one entry.
+    """
+    def decorator(fn):
+        cache = OrderedDict()
+        lock = threading.Lock()
+        counters = {"hits": 0, "misses": 0}
+        signature = inspect.signature(fn)
+
+        def bind(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return bound.args, tuple(sorted(bound.kwargs.items()))
+
+        def paths_for(call):
+            args, kwargs = call
+            paths = depends_on(*args, **dict(kwargs)) if callable(depends_on) else depends_on
+            return [os.path.abspath(p) for p in paths]
+
+        def dependencies(*args, **kwargs):
+            return paths_for(bind(*args, **kwargs))
+
+        def build(call, deps_digest):
+            args, kwargs = call
+            if not (persist and _CACHE_DIR):
+                return fn(*args, **dict(kwargs))
+            path = _persisted_path(fn.__name__, (call, deps_digest))
+            found, value = _load_persisted(path)
+            if not found:
+                value = fn(*args, **dict(kwargs))
+                _store_persisted(path, value)
+            return value
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            call = bind(*args, **kwargs)
+            paths = paths_for(call)
+            key = (call, dependency_digest(paths, loaded_hash))
+            with lock:
+                if key in cache:
+                    cache.move_to_end(key)
+                    counters["hits"] += 1
+                    return cache[key][0]
+                counters["misses"] += 1
+
+            value = build(*key)
+            with lock:
+                cache[key] = (value, tuple(paths))
+                cache.move_to_end(key)
+                while len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return value
+
+        def invalidate_stale():
+            with lock:
+                entries = [(key, deps) for key, (_, deps) in cache.items()]
+            stale = [key for key, deps in entries if dependency_digest(deps, loaded_hash) != key[1]]
+            with lock:
+                for key in stale:
+                    cache.pop(key, None)
+            return len(stale)
+
+        def cache_clear():
+            with lock:
+                cache.clear()
+                counters.update(hits=0, misses=0)
+
+        def cache_info():
+            with lock:
+                return CacheInfo(counters["hits"], counters["misses"], maxsize, len(cache))
+
+        wrapper.dependencies = dependencies
+        wrapper.invalidate_stale = invalidate_stale
+        wrapper.cache_clear = cache_clear
+        wrapper.cache_info = cache_info
+        _builders.append(wrapper)
+        return wrapper
+    return decorator
+
+
+def invalidate_stale():
+    """Drop cached builder results whose files changed; returns {builder: dropped}."""
+    dropped = {}
+    for builder in _builders:
+        count = builder.invalidate_stale()
+        if count:
+            dropped[builder.__name__] = count
+    return dropped
+
+
+# -------------------------- Build ------------------------- #
+
+def build_manifest(root=data_root):
+    if MANIFEST_PATH is None:
+        raise RuntimeError("Set DATA_CACHE_DIR to build the data manifest")
+    files = {}
+    for path in iter_source_files(root):
+        stat = os.stat(path)
+        entry = {
+            "sha256": _sha256(path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+        try:
+            entry["schema"] = _file_schema(path)
+        except Exception as exc:
+            entry["schema"] = {}
+            print(f"[WARN] Could not read schema of {manifest_key(path)}: {exc}")
+        files[manifest_key(path)] = entry
+
+    def write(tmp_path):
+        with open(tmp_path, "w") as fh:
+            json.dump({"version": 1, "files": files}, fh, indent=1, sort_keys=True)
+
+    write_atomic(MANIFEST_PATH, write)
+    load_manifest.cache_clear()
+    with _hash_lock:
+        _hash_memo.clear()
+    return files
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print("usage: DATA_CACHE_DIR=... python data_manifest.py build")
+        sys.exit(2)
+    if MANIFEST_PATH is None:
+        print("DATA_CACHE_DIR is not set; the manifest is written there.")
+        sys.exit(2)
+    files = build_manifest()
+    print(f"Wrote {len(files)} entries to {MANIFEST_PATH}")
@@ -0,0 +1,811 @@
+"""
+Lazy dataset registry for the EcoFoodSystems Dashboard
+
+Datasets are keyed by (city, domain) and only read from assets/data the first
+time a callback or layout asks for them, so a worker serving one city never
+pays for the other city's files.
+"""
+
+import csv
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+from data_io import SIDECAR_EXT, note_dependency, read_table, read_vector
+from geojson_encoder import feature_collection
+from geometry_meta import centroid_payload, metadata_table
+from mpi_districts import assign_districts, rollup
+from mpi_ranking import build_ranking
+from startup_trace import span, traced
+
+
+# -------------------------- Data Paths ------------------------- #
+
+homepath = os.path.dirname(os.path.abspath(__file__))
+data_root = os.path.join(homepath, "assets", "data")
+
+addis_root = os.path.join(data_root, "addis")
+addis_mpi_dir = os.path.join(addis_root, "mpi")
+addis_stakeholders_dir = os.path.join(addis_root, "stakeholders")
+addis_food_env_dir = os.path.join(addis_root, "food_environment")
+addis_policy_dir = os.path.join(addis_root, "policy")
+addis_environment_dir = os.path.join(addis_root, "environment")
+
+hanoi_root = os.path.join(data_root, "hanoi")
+hanoi_mpi_dir = os.path.join(hanoi_root, "mpi")
+hanoi_stakeholders_dir = os.path.join(hanoi_root, "stakeholders")
+hanoi_policy_dir = os.path.join(hanoi_root, "policy")
+hanoi_supply_dir = os.path.join(hanoi_root, "supply_chain")
+hanoi_affordability_dir = os.path.join(hanoi_root, "affordability")
+hanoi_nutrition_dir = os.path.join(hanoi_root, "nutrition")
+hanoi_food_env_dir = os.path.join(hanoi_root, "food_environment")
+hanoi_resilience_dir = os.path.join(hanoi_root, "resilience")
+hanoi_sustainability_dir = os.path.join(hanoi_root, "sustainability")
+hanoi_climate_dir = os.path.join(hanoi_resilience_dir, "precomputed_hanoi_climate_vars")
+atlas_csv_path = os.path.join(homepath, "EcoFoodSystems_indicator_architecture - 260326 - Hanoi_rewritten_descriptions_final.csv")
+
+outlets_path = os.path.join(addis_food_env_dir, "jsons_addis_foodoutlets")
+isochrones_path = os.path.join(addis_food_env_dir, "isochrones_addis")
+food_env_path = os.path.join(addis_food_env_dir, "addis_diet_env_mapping.geojson")
+
+outlets_path_hanoi = os.path.join(hanoi_food_env_dir, "jsons_hanoi_foodoutlets")
+isochrones_path_hanoi = os.path.join(hanoi_food_env_dir, "isochrones_hanoi")
+food_env_path_hanoi = os.path.join(hanoi_food_env_dir, "hanoi_diet_env_mapping.geojson")
+food_env_values_path_hanoi = os.path.join(hanoi_food_env_dir, "hanoi_diet_env_mapping_values.csv")
+
+
+# -------------------------- Registry ------------------------- #
+
+def _estimate_nbytes(obj):
+    """Rough deep memory footprint of a loaded dataset."""
+    if obj is None:
+        return 0
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True)
+        nbytes = int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+        if isinstance(obj, gpd.GeoDataFrame) and obj.geometry.name in obj.columns:
+            # memory_usage only counts geometry pointers; add the coordinate buffers.
+            nbytes += int(shapely.get_num_coordinates(np.asarray(obj.geometry.values)).sum()) * 16
+        return nbytes
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(_estimate_nbytes(k) + _estimate_nbytes(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(_estimate_nbytes(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+class _Generation:
+    """One immutable-by-convention snapshot of loaded datasets."""
+
+    def __init__(self, number, entries=None):
+        self.number = number
+        self.entries = dict(entries or {})
+        # Content hash of every file the entries were read from.
+        self.file_hashes = {}
+        for entry in self.entries.values():
+            self.file_hashes.update(entry.get("files", {}))
+
+
+class DatasetRegistry:
+    """Datasets keyed by (city, domain), loaded on first access.
+
+    Loaded entries live in a generation. reload() builds the next generation
+    in the background and swaps it in atomically; requests pinned to the old
+    generation (see pin()) keep reading it until they finish.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._schemas = {}
+        self._generation = _Generation(0)
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._local = threading.local()
+
+    def register(self, city, domain, loader, schema=None):
+        key = (city, domain)
+        with self._lock:
+            self._loaders[key] = loader
+            self._schemas[key] = schema
+            self._key_locks.setdefault(key, threading.Lock())
+            self._generation.entries.pop(key, None)
+
+    def loader(self, city, domain, schema=None):
+        """Decorator form of register()."""
+        def decorator(fn):
+            self.register(city, domain, fn, schema=schema)
+            return fn
+        return decorator
+
+    def keys(self, city=None):
+        return [key for key in self._loaders if city is None or key[0] == city]
+
+    # -- Generations --
+
+    @property
+    def generation(self):
+        return self._generation.number
+
+    def _current(self):
+        return getattr(self._local, "pinned", None) or self._generation
+
+    def pin(self):
+        """Pin this thread (e.g. one request) to the current generation."""
+        self._local.pinned = self._generation
+        return self._local.pinned.number
+
+    def unpin(self):
+        self._local.pinned = None
+
+    def recorded_hash(self, path):
+        """Hash of path as this thread's generation read it, or None if no loaded entry read it."""
+        return self._current().file_hashes.get(os.path.abspath(path))
+
+    def is_loaded(self, city, domain):
+        return (city, domain) in self._current().entries
+
+    def get(self, city, domain):
+        key = (city, domain)
+        generation = self._current()
+        loading = getattr(self._local, "loading", None)
+        if loading:
+            # A loader built on another dataset, e.g. mpi_geojson on mpi.
+            loading[-1].add(key)
+
+        entry = generation.entries.get(key)
+        if entry is not None:
+            return entry["value"]
+
+        if key not in self._loaders:
+            raise KeyError(f"No dataset registered for {key}")
+
+        with self._key_locks[key]:
+            entry = generation.entries.get(key)
+            if entry is None:
+                entry = self._load(key)
+                generation.file_hashes.update(entry["files"])
+                generation.entries[key] = entry
+        return entry["value"]
+
+    def _load(self, key):
+        from data_io import track_reads
+        from data_manifest import file_hash
+
+        stack = self._local.__dict__.setdefault("loading", [])
+        stack.append(set())
+        try:
+            start = time.perf_counter()
+            with span(f"load {key[0]}:{key[1]}"), track_reads() as paths:
+                value = self.load_raw(key)
+                if self._schemas.get(key) is not None:
+                    with span(f"apply schema {key[0]}:{key[1]}"):
+                        value = apply_schema(value, self._schemas[key])
+            load_seconds = time.perf_counter() - start
+        finally:
+            depends_on = stack.pop()
+        return {
+            "value": value,
+            "load_seconds": load_seconds,
+            "nbytes": _estimate_nbytes(value),
+            "files": {path: file_hash(path) for path in sorted(paths)},
+            "depends_on": depends_on,
+        }
+
+    def load_raw(self, key):
+        """Run a loader without caching the result or applying its schema."""
+        return self._loaders[key]()
+
+    def schema(self, city, domain):
+        return self._schemas.get((city, domain))
+
+    def stale_keys(self):
+        """Loaded keys whose files changed since they were read, plus their dependants.
+
+        Returns (keys, changed_paths).
+        """
+        from data_manifest import file_hash
+
+        entries = self._generation.entries
+        changed = set()
+        stale = set()
+        for key, entry in entries.items():
+            for path, digest in entry.get("files", {}).items():
+                if file_hash(path) != digest:
+                    changed.add(path)
+                    stale.add(key)
+
+        grew = True
+        while grew:
+            grew = False
+            for key, entry in entries.items():
+                if key not in stale and entry.get("depends_on", set()) & stale:
+                    stale.add(key)
+                    grew = True
+        return stale, changed
+
+    def reload(self, max_workers=None):
+        """Rebuild the datasets whose files changed into a new generation, then swap it in.
+
+        Unchanged entries are carried over by reference; only one reload runs
+        at a time. Returns a summary dict.
+        """
+        with self._reload_lock:
+            start = time.perf_counter()
+            previous = self._generation
+            stale, changed = self.stale_keys()
+            summary = {
+                "generation": previous.number,
+                "reloaded": sorted(f"{city}:{domain}" for city, domain in stale),
+                "changed_files": sorted(changed),
+                "seconds": 0.0,
+            }
+            if not stale:
+                return summary
+
+            following = _Generation(
+                previous.number + 1,
+                {key: entry for key, entry in previous.entries.items() if key not in stale},
+            )
+            self.preload(sorted(stale), max_workers=max_workers, generation=following)
+            with self._lock:
+                self._generation = following
+            summary["generation"] = following.number
+            summary["seconds"] = time.perf_counter() - start
+            return summary
+
+    def resolve_keys(self, selection=None):
+        """Expand a mix of city names and (city, domain) tuples into registered keys."""
+        if selection is None:
+            return self.keys()
+        keys = []
+        for item in selection:
+            if isinstance(item, str):
+                keys.extend(k for k in self.keys(item) if k not in keys)
+            elif tuple(item) in self._loaders and tuple(item) not in keys:
+                keys.append(tuple(item))
+        return keys
+
+    def preload(self, selection=None, max_workers=None, generation=None):
+        """Load the selected datasets in a bounded thread pool; returns wall seconds.
+
+        Loaders are independent (pyogrio/pandas/pyarrow release the GIL while
+        reading), and derived entries such as mpi_geojson simply wait on the
+        per-key lock of the dataset they are built from.
+        """
+        keys = self.resolve_keys(selection)
+        generation = generation or self._generation
+        if max_workers is None:
+            max_workers = int(os.environ.get("PRELOAD_WORKERS", "0") or 0) or min(8, len(keys))
+        start = time.perf_counter()
+        if max_workers <= 1 or len(keys) <= 1:
+            for key in keys:
+                self._preload_one(key, generation)
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="preload") as pool:
+                futures = [pool.submit(self._preload_one, key, generation) for key in keys]
+                for future in as_completed(futures):
+                    future.result()
+        return time.perf_counter() - start
+
+    def _preload_one(self, key, generation):
+        previous = getattr(self._local, "pinned", None)
+        self._local.pinned = generation
+        try:
+            self.get(*key)
+        except Exception as exc:
+            print(f"[WARN] Could not preload {key[0]}:{key[1]}: {exc}")
+        finally:
+            self._local.pinned = previous
+
+    def clear(self, city=None, domain=None):
+        with self._lock:
+            self._generation = _Generation(
+                self._generation.number + 1,
+                {
+                    key: entry for key, entry in self._generation.entries.items()
+                    if not ((city is None or key[0] == city) and (domain is None or key[1] == domain))
+                },
+            )
+
+    def stats(self):
+        entries = self._current().entries
+        rows = []
+        for key in sorted(self._loaders):
+            entry = entries.get(key)
+            rows.append({
+                "city": key[0],
+                "domain": key[1],
+                "loaded": entry is not None,
+                "load_seconds": entry["load_seconds"] if entry else None,
+                "nbytes": entry["nbytes"] if entry else None,
+            })
+        return rows
+
+    def report(self):
+        lines = [f"{'city':<8} {'domain':<18} {'load (ms)':>10} {'memory (KB)':>12}"]
+        for row in self.stats():
+            if row["loaded"]:
+                lines.append(
+                    f"{row['city']:<8} {row['domain']:<18} "
+                    f"{row['load_seconds'] * 1000:>10.1f} {row['nbytes'] / 1024:>12.1f}"
+                )
+            else:
+                lines.append(f"{row['city']:<8} {row['domain']:<18} {'-':>10} {'-':>12}")
+        return "\n".join(lines)
+
+
+def memory_report(selection=None):
+    """Deep memory per dataset as loaded raw vs with its dtype schema applied."""
+    lines = [f"{'city':<8} {'domain':<26} {'before (KB)':>12} {'after (KB)':>11} {'saved':>7}"]
+    total_before = total_after = 0
+    for key in registry.resolve_keys(selection):
+        schema = registry.schema(*key)
+        try:
+            raw = registry.load_raw(key)
+        except Exception as exc:
+            lines.append(f"{key[0]:<8} {key[1]:<26} failed: {exc}")
+            continue
+        before = _estimate_nbytes(raw)
+        after = _estimate_nbytes(apply_schema(raw, schema)) if schema is not None else before
+        total_before += before
+        total_after += after
+        saved = f"{(1 - after / before) * 100:.0f}%" if before else "-"
+        lines.append(f"{key[0]:<8} {key[1]:<26} {before / 1024:>12.1f} {after / 1024:>11.1f} {saved:>7}")
+    saved = f"{(1 - total_after / total_before) * 100:.0f}%" if total_before else "-"
+    lines.append(f"{'total':<35} {total_before / 1024:>12.1f} {total_after / 1024:>11.1f} {saved:>7}")
+    return "\n".join(lines)
+
+
+def parse_preload_spec(spec):
+    """Parse PRELOAD_DATASETS, e.g. "all", "hanoi" or "hanoi:mpi,addis:stakeholders"."""
+    spec = (spec or "").strip()
+    if not spec:
+        return []
+    if spec.lower() == "all":
+        return None
+    selection = []
+    for token in spec.split(","):
+        token = token.strip()
+        if not token:
+            continue
+        if ":" in token:
+            city, domain = token.split(":", 1)
+            selection.append((city.strip(), domain.strip()))
+        else:
+            selection.append(token)
+    return selection
+
+
+registry = DatasetRegistry()
+
+
+# -------------------------- Dtype Schemas ------------------------- #
+
+# Per-dataset dtype schema, applied by the registry after the loader runs:
+#   "category": repeated labels (sectors, scales, regions, Cat/Reg, ...)
+#   "string":   free text, stored as string[pyarrow]
+#   "float32":  measures only ever shown rounded (hover formats, KPI f-strings)
+# ALL_OTHER in "string" means every remaining text column; in "float32" every
+# remaining float64 column. Columns missing from the data are skipped.
+ALL_OTHER = "*"
+
+
+def _text_columns(df):
+    return [c for c in df.columns if pd.api.types.is_object_dtype(df[c]) or pd.api.types.is_string_dtype(df[c])]
+
+
+def apply_schema(df, schema):
+    if not isinstance(df, pd.DataFrame):
+        return df
+    df = df.copy()
+    geometry = df.geometry.name if isinstance(df, gpd.GeoDataFrame) else None
+    categories = [c for c in schema.get("category", []) if c in df.columns]
+    claimed = set(categories) | {geometry}
+
+    strings = schema.get("string", [])
+    if strings == ALL_OTHER:
+        strings = [c for c in _text_columns(df) if c not in claimed]
+    strings = [c for c in strings if c in df.columns and c not in claimed]
+    claimed |= set(strings)
+
+    floats = schema.get("float32", [])
+    if floats == ALL_OTHER:
+        floats = [c for c in df.columns if c not in claimed and df[c].dtype == np.float64]
+    floats = [c for c in floats if c in df.columns and c not in claimed]
+
+    for col in categories:
+        df[col] = df[col].astype("category")
+    for col in strings:
+        df[col] = df[col].astype(pd.StringDtype("pyarrow"))
+    for col in floats:
+        df[col] = df[col].astype(np.float32)
+    return df
+
+
+# -------------------------- Shared Loading Helpers ------------------------- #
+
+def _markdown_link(x):
+    return f'[Link Available]({x})' if x and str(x).startswith('http') else '--'
+
+
+def _coerce_numeric_columns(gdf, skip_cols):
+    # Detect numeric columns in the GeoJSON and coerce to numeric where possible
+    for _col in gdf.columns:
+        if _col in skip_cols:
+            continue
+        coerced = pd.to_numeric(gdf[_col], errors='coerce')
+        if coerced.notna().any():
+            gdf[_col] = coerced
+    return gdf
+
+
+def _list_dir(path):
+    # Parquet sidecars sit next to their sources (see data_io.py); only list the sources.
+    note_dependency(path)
+    if not os.path.exists(path):
+        return []
+    return sorted(f for f in os.listdir(path) if not f.endswith(SIDECAR_EXT))
+
+
+def _load_food_env_layer(geojson_path, values_csv_path=None, join_key_candidates=None):
+    if not os.path.exists(geojson_path):
+        return None
+
+    gdf = read_vector(geojson_path)
+
+    if values_csv_path and os.path.exists(values_csv_path):
+        try:
+            candidate_keys = list(join_key_candidates or [])
+            dtype_map = {col: "string" for col in candidate_keys}
+            df_values = read_table(values_csv_path, dtype=dtype_map, keep_default_na=False)
+            join_key = next(
+                (col for col in candidate_keys if col in gdf.columns and col in df_values.columns),
+                None,
+            )
+            if join_key:
+                gdf[join_key] = gdf[join_key].astype("string").str.strip()
+                df_values[join_key] = df_values[join_key].astype("string").str.strip()
+
+                df_values = df_values[df_values[join_key].notna() & (df_values[join_key] != "")].copy()
+                df_values = df_values.drop_duplicates(subset=[join_key])
+
+                gdf = gdf.merge(df_values, on=join_key, how="left")
+                gdf = gpd.GeoDataFrame(gdf, geometry="geometry", crs="EPSG:4326")
+            else:
+                print(f"[WARN] No common join key found for food environment layer: {geojson_path}")
+        except Exception as exc:
+            print(f"[WARN] Could not merge food environment values from CSV: {exc}")
+
+    return gdf
+
+
+@traced("parse indicator atlas CSV")
+def _load_indicator_atlas_records(csv_path):
+    note_dependency(csv_path)
+    if not os.path.exists(csv_path):
+        return []
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        rows = list(csv.reader(f))
+    if len(rows) < 2:
+        return []
+
+    # Find the real header row dynamically (some files include a title/metadata row first).
+    header_idx = None
+    for idx, row in enumerate(rows):
+        normalized = [str(c).strip() for c in row]
+        if 'Domain / Sub-theme' in normalized and 'Indicator name' in normalized:
+            header_idx = idx
+            break
+
+    if header_idx is None:
+        return []
+
+    header = [str(c).strip() for c in rows[header_idx]]
+    records = []
+    for row in rows[header_idx + 1:]:
+        if not any((c or '').strip() for c in row):
+            continue
+        if len(row) < len(header):
+            row = row + [''] * (len(header) - len(row))
+        rec = dict(zip(header, row[:len(header)]))
+        indicator_name = (rec.get('Indicator name') or '').strip()
+        if not indicator_name:
+            continue
+        records.append(rec)
+    return records
+
+
+# -------------------------- Addis Ababa Datasets ------------------------- #
+
+@registry.loader("addis", "mpi", schema={"string": ["Dist_Name", "Sub City"], "float32": ALL_OTHER})
+def _load_addis_mpi():
+    MPI = read_vector(os.path.join(addis_mpi_dir, "addis_districts_MPI.geojson"))
+    MPI['Multidimensional Poverty Index'] = MPI['Multidimensional Poverty Index'].astype(float)
+    MPI['Dist_Name'] = MPI['Dist_Name'].astype(str)
+    return _coerce_numeric_columns(MPI, ['geometry', 'Dist_Name'])
+
+
+@registry.loader("addis", "mpi_geojson")
+def _load_addis_mpi_geojson():
+    mpi = registry.get("addis", "mpi")
+    with span("serialise addis MPI to GeoJSON"):
+        return feature_collection(mpi)
+
+
+# Centroids, boxes, areas and zooms of the MPI boundaries (geometry_meta.py),
+# in the map's feature order; mpi_centroids is the part the browser needs.
+@registry.loader("addis", "mpi_meta")
+def _load_addis_mpi_meta():
+    return metadata_table(registry.get("addis", "mpi"), "Dist_Name")
+
+
+@registry.loader("addis", "mpi_centroids")
+def _load_addis_mpi_centroids():
+    return centroid_payload(registry.get("addis", "mpi_meta"))
+
+
+@registry.loader("addis", "stakeholders", schema={
+    "category": ["Primary sector ", "Area of Activity", "Scale of Activity"],
+    "string": ALL_OTHER,
+})
+def _load_addis_stakeholders():
+    df_sh = read_table(os.path.join(addis_stakeholders_dir, "addis_stakeholders_cleaned.csv")).dropna(how='any')
+    df_sh.rename(columns={'Area of Activity (Food Systems Value Chain)': 'Area of Activity'}, inplace=True)
+
+    # Format Website column as clickable markdown links
+    if 'Website' in df_sh.columns:
+        df_sh['Website'] = df_sh['Website'].apply(_markdown_link)
+    return df_sh
+
+
+@registry.loader("addis", "outlet_files")
+def _load_addis_outlet_files():
+    return _list_dir(outlets_path)
+
+
+@registry.loader("addis", "isochrone_files")
+def _load_addis_isochrone_files():
+    return _list_dir(isochrones_path)
+
+
+@registry.loader("addis", "food_env", schema={"float32": ALL_OTHER})
+def _load_addis_food_env():
+    return read_vector(food_env_path)
+
+
+@registry.loader("addis", "policies", schema={
+    "category": [
+        "Main sector/ministry", "Document type", "Region", "pdf available",
+        "Is the document Binding? 1=Binding 2=Non-Binding", "SDG Agonist/ SDG Antagonist ",
+    ],
+    "string": ALL_OTHER,
+})
+def _load_addis_policies():
+    df_policies_addis = read_table(os.path.join(addis_policy_dir, 'addis_policy_database.csv')).drop('Unnamed: 0', axis=1)
+    # Ensure link columns render as markdown links in the DataTable
+    for col in ['Document Link', 'Available website']:
+        if col in df_policies_addis.columns:
+            df_policies_addis[col] = df_policies_addis[col].apply(_markdown_link)
+    return df_policies_addis
+
+
+def get_sdg_numbers(row):
+    sdg_cols = ['SDG_1', 'SDG_2', 'SDG_3', 'SDG_4', 'SDG_5']
+    sdg_numbers = []
+    for col in sdg_cols:
+        if pd.notna(row[col]) and str(row[col]).strip():
+            # Extract just the number (e.g., "1.3.1" -> "1", "2.1" -> "2")
+            sdg_num = str(row[col]).split('.')[0]
+            if sdg_num.isdigit() and sdg_num not in sdg_numbers:
+                sdg_numbers.append(sdg_num)
+    return ', '.join(sdg_numbers) if sdg_numbers else '--'
+
+
+# The SDG indicator database is the Addis file; the Hanoi sustainability page mirrors it.
+@registry.loader("addis", "sdg_indicators", schema={
+    "category": ["Dimensions", "Components", "SDG_1", "SDG_2", "SDG_3", "SDG_4", "SDG_5"],
+    "string": ALL_OTHER,
+})
+def _load_sdg_indicators():
+    df_indicators = read_table(os.path.join(addis_policy_dir, 'addis_policy_database_expanded_sdg.csv'))
+    df_indicators['SDG Numbers'] = df_indicators.apply(get_sdg_numbers, axis=1)
+    return df_indicators
+
+
+@registry.loader("addis", "lca", schema={"category": ["Food Group"], "string": ["Item Cd"], "float32": ALL_OTHER})
+def _load_addis_lca():
+    return read_table(os.path.join(addis_environment_dir, 'addis_lca_pivot.csv'))
+
+
+# -------------------------- Hanoi Datasets ------------------------- #
+
+@registry.loader("hanoi", "mpi", schema={"string": ["Name", "ma_xa"], "float32": ALL_OTHER})
+def _load_hanoi_mpi():
+    # Hanoi MPI Data (commune level)
+    MPI_hanoi = read_vector(os.path.join(hanoi_mpi_dir, "hanoi_communes.geojson"))
+    MPI_hanoi['Name'] = MPI_hanoi['Name'].astype(str)
+    MPI_hanoi['ma_xa'] = MPI_hanoi['ma_xa'].astype(str)
+
+    # Load long-format MPI CSV and pivot to wide, then merge into GeoDataFrame
+    df_mpi_hanoi = read_table(os.path.join(hanoi_mpi_dir, "hanoi_communes_MPI_long.csv"))
+    with span("pivot hanoi MPI long -> wide"):
+        df_mpi_wide = df_mpi_hanoi.pivot_table(index='Name', columns='Variable', values='Value').reset_index()
+        df_mpi_wide.columns.name = None
+        MPI_hanoi = MPI_hanoi.merge(df_mpi_wide, on='Name', how='left')
+
+    # Detect numeric MPI columns (all columns added from the pivot)
+    return _coerce_numeric_columns(MPI_hanoi, ['geometry', 'Name', 'ma_xa'])
+
+
+@registry.loader("hanoi", "mpi_geojson")
+def _load_hanoi_mpi_geojson():
+    mpi = registry.get("hanoi", "mpi")
+    with span("serialise hanoi MPI to GeoJSON"):
+        return feature_collection(mpi)
+
+
+@registry.loader("hanoi", "mpi_meta")
+def _load_hanoi_mpi_meta():
+    return metadata_table(registry.get("hanoi", "mpi"), "Name")
+
+
+@registry.loader("hanoi", "mpi_centroids")
+def _load_hanoi_mpi_centroids():
+    return centroid_payload(registry.get("hanoi", "mpi_meta"))
+
+
+# Every MPI variable as a float32 array in the map's feature order, so a
+# variable change only ships its colour values.
+@registry.loader("hanoi", "mpi_values")
+def _load_hanoi_mpi_values():
+    mpi = registry.get("hanoi", "mpi")
+    return {
+        column: mpi[column].to_numpy(dtype=np.float32, na_value=np.nan)
+        for column in mpi.columns
+        if column not in ("geometry", "Name", "ma_xa") and pd.api.types.is_numeric_dtype(mpi[column])
+    }
+
+
+# Every MPI variable's communes from highest to lowest, for the paged bar chart.
+@registry.loader("hanoi", "mpi_ranking")
+def _load_hanoi_mpi_ranking():
+    return build_ranking(registry.get("hanoi", "mpi")["Name"], registry.get("hanoi", "mpi_values"))
+
+
+# District level of the Hanoi MPI map (see mpi_districts.py): the district
+# boundaries, the district each commune belongs to (a row position in
+# mpi_districts, in the order of mpi) and the population-weighted district
+# values of every commune variable.
+@registry.loader("hanoi", "mpi_districts", schema={"string": ["Dist_Name"]})
+def _load_hanoi_mpi_districts():
+    # Read every column: GDAL matches column names case-insensitively, and
+    # the file also has a "Dist_name" (spelt differently).
+    gdf = read_vector(os.path.join(hanoi_mpi_dir, "hanoi_districts_MPI.geojson"))[["Dist_Name", "geometry"]]
+    gdf['Dist_Name'] = gdf['Dist_Name'].astype(str)
+    return gdf.reset_index(drop=True)
+
+
+@registry.loader("hanoi", "mpi_district_meta")
+def _load_hanoi_mpi_district_meta():
+    return metadata_table(registry.get("hanoi", "mpi_districts"), "Dist_Name")
+
+
+@registry.loader("hanoi", "mpi_commune_district")
+def _load_hanoi_mpi_commune_district():
+    return assign_districts(registry.get("hanoi", "mpi"), registry.get("hanoi", "mpi_districts"))
+
+
+@registry.loader("hanoi", "mpi_district_values")
+def _load_hanoi_mpi_district_values():
+    mpi = registry.get("hanoi", "mpi")
+    # Commune populations (dan_so) from the indicators shapefile
+    population = registry.get("hanoi", "mpi_neadmin").set_index("ma_xa")["dan_so"]
+    weights = population[~population.index.duplicated()].reindex(mpi["ma_xa"]).to_numpy(dtype=float)
+    return rollup(
+        registry.get("hanoi", "mpi_values"),
+        registry.get("hanoi", "mpi_commune_district"),
+        weights,
+        len(registry.get("hanoi", "mpi_districts")),
+    )
+
+
+@registry.loader("hanoi", "mpi_neadmin")
+def _load_hanoi_mpi_neadmin():
+    # Commune MPI indicators shapefile; its DBF truncates some UTF-8 strings,
+    # which the Arrow read path in read_vector tolerates.
+    gdf = read_vector(os.path.join(hanoi_mpi_dir, "Hanoi_MPI_neadmin_indicators_010426.shp"))
+    gdf['Name'] = gdf['Name'].astype(str)
+    gdf['ma_xa'] = gdf['ma_xa'].astype(str)
+    return _coerce_numeric_columns(gdf, ['geometry', 'Name', 'ma_xa', 'ten_xa', 'sap_nhap', 'tru_so', 'loai'])
+
+
+@registry.loader("hanoi", "sustainability_indicators")
+def _load_hanoi_sustainability_indicators():
+    # Stored in EPSG:4756 (VN-2000); read_vector reprojects to EPSG:4326.
+    gdf = read_vector(os.path.join(hanoi_sustainability_dir, "hanoi_sustainability_indicators.shp"))
+    gdf['Name'] = gdf['Name'].astype(str)
+    gdf['ma_xa'] = gdf['ma_xa'].astype(str)
+    return gdf
+
+
+@registry.loader("hanoi", "stakeholders", schema={
+    "category": ["Stakeholder catagorization ", "Area of Activity in the food system"],
+    "string": ALL_OTHER,
+})
+def _load_hanoi_stakeholders():
+    df_sh_hanoi = read_table(os.path.join(hanoi_stakeholders_dir, "hanoi_stakeholders.csv")).dropna(how='any')
+    if 'Website' in df_sh_hanoi.columns:
+        df_sh_hanoi['Website'] = df_sh_hanoi['Website'].apply(_markdown_link)
+    return df_sh_hanoi
+
+
+@registry.loader("hanoi", "policies", schema={
+    "category": ["Type of text", "Primary subjects", "Domain", "Language of document", "Country/Territory", "Repealed"],
+    "string": ALL_OTHER,
+})
+def _load_hanoi_policies():
+    df_policies_hanoi = read_table(os.path.join(hanoi_policy_dir, 'hanoi_policy_database_cleaned.csv'))
+    if 'Document Link' in df_policies_hanoi.columns:
+        df_policies_hanoi['Document Link'] = df_policies_hanoi['Document Link'].apply(_markdown_link)
+        df_policies_hanoi['Available website'] = df_policies_hanoi['Available website'].apply(_markdown_link)
+    return df_policies_hanoi
+
+
+@registry.loader("hanoi", "outlet_files")
+def _load_hanoi_outlet_files():
+    return _list_dir(outlets_path_hanoi)
+
+
+@registry.loader("hanoi", "isochrone_files")
+def _load_hanoi_isochrone_files():
+    return _list_dir(isochrones_path_hanoi)
+
+
+@registry.loader("hanoi", "food_env", schema={"float32": ALL_OTHER})
+def _load_hanoi_food_env():
+    # Hanoi food-environment choropleth (minified base geometry + values CSV when available)
+    try:
+        return _load_food_env_layer(
+            food_env_path_hanoi,
+            food_env_values_path_hanoi,
+            join_key_candidates=["ma_xa", "shapeID", "Dist_Name", "Dist_name"],
+        )
+    except Exception as e:
+        print(f"Error loading Hanoi food environment layer: {e}")
+        return None
+
+
+# Supply flows are Hanoi data; the Addis supply tab reuses the same Sankey.
+@registry.loader("hanoi", "sankey", schema={"category": ["province"]})
+def _load_hanoi_sankey():
+    return read_table(os.path.join(hanoi_supply_dir, 'hanoi_supply.csv'))
+
+
+@registry.loader("hanoi", "affordability", schema={"category": ["Cat", "Reg"]})
+def _load_hanoi_affordability():
+    return read_table(os.path.join(hanoi_affordability_dir, 'hanoi_affordability_cleaned.csv'))
+
+
+@registry.loader("hanoi", "nutrition", schema={"category": ["Cat", "Reg"]})
+def _load_hanoi_nutrition():
+    return read_table(os.path.join(hanoi_nutrition_dir, 'hanoi_health_nutrition_cleaned.csv'))
+
+
+@registry.loader("hanoi", "atlas")
+def _load_hanoi_atlas():
+    return _load_indicator_atlas_records(atlas_csv_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "memory":
+        print("usage: python data_registry.py memory [city | city:domain ...]")
+        sys.exit(2)
+    print(memory_report(parse_preload_spec(",".join(sys.argv[2:])) or None))
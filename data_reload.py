@@ -0,0 +1,134 @@
+"""
+Live dataset reload for the EcoFoodSystems Dashboard
+
+After a CSV / GeoJSON under assets/data changes, reload_datasets() rebuilds
+only the registry entries that read the changed files (and entries derived
+from them) into a new generation, swaps it in atomically, and drops the
+cached-builder results that were built from the old files. Requests already
+running stay pinned to the generation they started with.
+
+Triggers:
+    POST /admin/reload        start a background reload
+    GET  /admin/reload        status of the last reload
+    DATA_WATCH_INTERVAL_S=N   poll for changed files every N seconds
+
+The admin route is only registered when ADMIN_RELOAD_TOKEN is set, and
+every call must send that token in an X-Admin-Token header (on top of the
+app's viewer login), so dashboard viewers cannot trigger reloads.
+
+With several gunicorn workers the admin route only reaches one of them; use
+the watcher, which runs in every worker. start_watcher() is called per
+serving process (gunicorn.conf.py:post_worker_init, app.py's __main__), not
+at import, so a preloading master never forks with the watcher thread
+holding a lock.
+"""
+
+import hmac
+import os
+import threading
+import time
+
+from data_registry import registry
+
+
+_status = {"running": False, "last": None, "error": None}
+_status_lock = threading.Lock()
+_watcher = {"pid": None}
+
+
+def reload_datasets():
+    """Rebuild changed datasets into a new generation and invalidate dependent caches."""
+    from data_manifest import invalidate_stale
+
+    summary = registry.reload()
+    summary["invalidated"] = invalidate_stale()
+    if summary["reloaded"]:
+        print(
+            f"Reloaded {', '.join(summary['reloaded'])} into generation "
+            f"{summary['generation']} in {summary['seconds']:.2f} s"
+        )
+    return summary
+
+
+def _run_reload():
+    try:
+        summary = reload_datasets()
+        with _status_lock:
+            _status.update(running=False, last=summary, error=None)
+    except Exception as exc:
+        print(f"[WARN] Dataset reload failed: {exc}")
+        with _status_lock:
+            _status.update(running=False, error=str(exc))
+
+
+def start_reload():
+    """Start a background reload unless one is already running; returns False if it was."""
+    with _status_lock:
+        if _status["running"]:
+            return False
+        _status["running"] = True
+    threading.Thread(target=_run_reload, name="dataset-reload", daemon=True).start()
+    return True
+
+
+def reload_status():
+    with _status_lock:
+        return dict(_status, generation=registry.generation)
+
+
+def register_admin_routes(server, token=None):
+    """Add /admin/reload, guarded by token (ADMIN_RELOAD_TOKEN); not added without one."""
+    from flask import abort, jsonify, request
+
+    if token is None:
+        token = os.environ.get("ADMIN_RELOAD_TOKEN", "").strip()
+    if not token:
+        return False
+
+    @server.route("/admin/reload", methods=["GET", "POST"])
+    def admin_reload():
+        sent = request.headers.get("X-Admin-Token", "")
+        if not hmac.compare_digest(sent.encode(), token.encode()):
+            abort(403)
+        if request.method == "GET":
+            return jsonify(reload_status())
+        started = start_reload()
+        return jsonify(dict(reload_status(), started=started)), 202 if started else 409
+
+    return True
+
+
+def pin_requests_to_generation(server):
+    """Keep each request on the dataset generation that was current when it started."""
+
+    @server.before_request
+    def _pin_generation():
+        registry.pin()
+
+    @server.teardown_request
+    def _unpin_generation(exc=None):
+        registry.unpin()
+
+
+def _watch(interval):
+    # Builders re-key on content hashes by themselves, so only registry
+    # entries need watching; a reload then also sweeps stale builder results.
+    while True:
+        time.sleep(interval)
+        try:
+            stale, _ = registry.stale_keys()
+            if stale:
+                start_reload()
+        except Exception as exc:
+            print(f"[WARN] Dataset watcher: {exc}")
+
+
+def start_watcher(interval=None):
+    """Poll for data changes every interval seconds (DATA_WATCH_INTERVAL_S); once per process."""
+    if interval is None:
+        interval = float(os.environ.get("DATA_WATCH_INTERVAL_S", "0") or 0)
+    if interval <= 0 or _watcher["pid"] == os.getpid():
+        return False
+    _watcher["pid"] = os.getpid()
+    threading.Thread(target=_watch, args=(interval,), name="dataset-watcher", daemon=True).start()
+    return True
@@ -0,0 +1,256 @@
+"""
+Figure payload optimizer for the EcoFoodSystems Dashboard
+
+Every callback response that carries a Plotly figure (a dcc.Graph figure, a
+figure inside returned children, or a topojson_codec payload) is rewritten
+before it leaves the server:
+
+- numeric data arrays become base64 typed arrays ({"dtype", "bdata"}),
+  which plotly.js decodes natively (2.28+; Dash 3+ serves the copy bundled
+  with the plotly package, 5.19+ in requirements.txt);
+- lat/lon and GeoJSON coordinates are rounded to FIGURE_COORD_DECIMALS
+  (default 5, about 1 m), and sent as float32 where that stays within the
+  rounding;
+- trace and layout attributes equal to the figure template's own value
+  are dropped, since plotly.js falls back to the template anyway.
+
+FIGURE_PAYLOAD_LOG=1 logs the bytes before and after per callback (off by
+default). FIGURE_OPTIMIZE=0 turns the whole stage off.
+"""
+
+import base64
+import json
+import logging
+import os
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+ENABLED = os.environ.get("FIGURE_OPTIMIZE", "1").strip().lower() not in ("0", "false", "no", "off")
+LOG = os.environ.get("FIGURE_PAYLOAD_LOG", "0").strip().lower() in ("1", "true", "yes", "on")
+COORD_DECIMALS = int(os.environ.get("FIGURE_COORD_DECIMALS", "5"))
+
+logger = logging.getLogger(__name__)
+
+# Shorter arrays are not worth the base64 framing.
+TYPED_ARRAY_MIN_LENGTH = 8
+
+_COORDINATE_ATTRS = {"lat", "lon"}
+_KEEP_ATTRS = {"type"}
+_SHORT_DTYPES = {
+    "int8": "i1", "uint8": "u1", "int16": "i2", "uint16": "u2",
+    "int32": "i4", "uint32": "u4", "float32": "f4", "float64": "f8",
+}
+_INT_DTYPES = (np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32)
+
+
+def _loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+@lru_cache(maxsize=None)
+def _is_data_array(parent_path, prop):
+    """Whether plotly accepts a data array for parent_path.prop (e.g. "scattermapbox.marker", "size")."""
+    from plotly.validator_cache import ValidatorCache
+
+    try:
+        return bool(getattr(ValidatorCache.get_validator(parent_path, prop), "array_ok", False))
+    except Exception:
+        return False
+
+
+def _numeric_array(values):
+    if isinstance(values, np.ndarray):
+        arr = values
+    else:
+        try:
+            arr = np.asarray(values)
+        except (ValueError, TypeError):
+            return None
+    if arr.dtype == object and arr.ndim == 1:
+        # Gaps (None) in an otherwise numeric list become NaN, which plotly skips.
+        if not all(v is None or (isinstance(v, (int, float)) and not isinstance(v, bool)) for v in arr):
+            return None
+        arr = np.array([np.nan if v is None else v for v in arr], dtype=float)
+    if arr.dtype.kind not in "iuf" or arr.ndim not in (1, 2):
+        return None
+    return arr
+
+
+def encode_array(values, coordinate=False, decimals=COORD_DECIMALS):
+    """plotly.js typed-array spec for a numeric 1-D/2-D array, or None to leave it as is."""
+    arr = _numeric_array(values)
+    if arr is None or arr.size == 0:
+        return None
+
+    if arr.dtype.kind == "f":
+        if coordinate:
+            arr = np.round(arr, decimals)
+        finite = np.isfinite(arr)
+        if finite.all() and np.array_equal(arr, np.trunc(arr)) and np.abs(arr).max() < 2 ** 31:
+            arr = arr.astype(np.int64)
+        else:
+            as_f32 = arr.astype(np.float32)
+            tolerance = 0.5 * 10 ** -decimals if coordinate else 0.0
+            error = np.abs(as_f32.astype(np.float64) - arr)
+            arr = as_f32 if np.all((error <= tolerance) | ~finite) else arr.astype(np.float64)
+
+    if arr.dtype.kind in "iu":
+        low, high = arr.min(), arr.max()
+        for dtype in _INT_DTYPES:
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                arr = arr.astype(dtype)
+                break
+        else:
+            return None
+
+    arr = np.ascontiguousarray(arr, dtype=arr.dtype.newbyteorder("<"))
+    spec = {"dtype": _SHORT_DTYPES[arr.dtype.name], "bdata": base64.b64encode(arr.tobytes()).decode("ascii")}
+    if arr.ndim > 1:
+        spec["shape"] = str(arr.shape)[1:-1]
+    return spec
+
+
+def _round_coordinates(coords, decimals):
+    if not coords:
+        return coords
+    if isinstance(coords[0], (int, float)):
+        return [round(c, decimals) for c in coords]
+    if coords[0] and isinstance(coords[0][0], (int, float)):
+        # A ring or line: round it in one go.
+        return np.round(np.asarray(coords, dtype=float), decimals).tolist()
+    return [_round_coordinates(c, decimals) for c in coords]
+
+
+def _round_geojson(geojson, decimals):
+    if not isinstance(geojson, dict):
+        return
+    for feature in geojson.get("features") or []:
+        geometry = feature.get("geometry") or {}
+        if geometry.get("coordinates"):
+            geometry["coordinates"] = _round_coordinates(geometry["coordinates"], decimals)
+
+
+def _optimize_node(node, parent_path, template):
+    """Strip template-equal attributes and encode data arrays in one trace/layout dict, in place."""
+    for key, value in list(node.items()):
+        if key not in _KEEP_ATTRS and isinstance(template, dict) and key in template and template[key] == value:
+            del node[key]
+            continue
+        if key == "geojson":
+            _round_geojson(value, COORD_DECIMALS)
+        elif isinstance(value, dict):
+            _optimize_node(value, f"{parent_path}.{key}", template.get(key) if isinstance(template, dict) else None)
+            if not value:
+                del node[key]
+        elif (
+            isinstance(value, list)
+            and len(value) >= TYPED_ARRAY_MIN_LENGTH
+            and parent_path != "layout"
+            and _is_data_array(parent_path, key)
+        ):
+            spec = encode_array(value, coordinate=key in _COORDINATE_ATTRS)
+            # Short decimals can already be cheaper as JSON text than as base64.
+            if spec is not None and len(spec["bdata"]) < len(_dumps(value)):
+                node[key] = spec
+
+
+def optimize_figure(figure):
+    """Optimize a figure dict ({"data": [...], "layout": {...}}) in place and return it."""
+    layout = figure.get("layout") or {}
+    template = layout.get("template") or {}
+    template_data = template.get("data") or {}
+    seen = {}
+    for trace in figure.get("data") or []:
+        if not isinstance(trace, dict):
+            continue
+        trace_type = trace.get("type", "scatter")
+        # Templates cycle through their traces of each type.
+        candidates = template_data.get(trace_type) or [None]
+        index = seen.get(trace_type, 0)
+        seen[trace_type] = index + 1
+        _optimize_node(trace, trace_type, candidates[index % len(candidates)])
+
+    template_layout = template.get("layout") or {}
+    for key, value in list(layout.items()):
+        if key == "template":
+            continue
+        if key in template_layout and template_layout[key] == value:
+            del layout[key]
+        elif isinstance(value, dict):
+            _optimize_node(value, f"layout.{key}", template_layout.get(key))
+    return figure
+
+
+def _is_figure(value):
+    return isinstance(value, dict) and isinstance(value.get("data"), list) and isinstance(value.get("layout"), dict)
+
+
+def optimize_value(value):
+    """Optimize every figure found in a callback output value; returns how many were touched."""
+    if _is_figure(value):
+        optimize_figure(value)
+        return 1
+    count = 0
+    if isinstance(value, dict):
+        # Patches carry fragments without a trace type; topologies hold no figure.
+        if "__dash_patch_update" in value or value.get("type") == "Topology":
+            return 0
+        for item in value.values():
+            count += optimize_value(item)
+    elif isinstance(value, list):
+        for item in value:
+            count += optimize_value(item)
+    return count
+
+
+def register_figure_optimizer(server):
+    """Rewrite figure-carrying callback responses on the way out."""
+    if not ENABLED:
+        return
+    from flask import request
+
+    if LOG and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("[figure] %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+    @server.after_request
+    def _optimize_figures(response):
+        if (
+            not request.path.endswith("/_dash-update-component")
+            or response.status_code != 200
+            or response.direct_passthrough
+            or response.headers.get("Content-Encoding")
+            or not response.is_json
+        ):
+            return response
+        try:
+            data = response.get_data()
+            payload = _loads(data)
+            outputs = payload.get("response") or {}
+            if not optimize_value(outputs):
+                return response
+            optimized = _dumps(payload)
+        except Exception as exc:
+            print(f"[WARN] Figure optimizer skipped a response: {exc}")
+            return response
+        response.set_data(optimized)
+        logger.info(
+            "%s: %.1f KB -> %.1f KB", ", ".join(outputs), len(data) / 1024, len(optimized) / 1024
+        )
+        return response
@@ -0,0 +1,64 @@
+"""
+Fast GeoJSON encoding for the EcoFoodSystems Dashboard
+
+GeoDataFrame.to_json() builds a Python dict per geometry
+(__geo_interface__), serialises the whole collection with json and the
+callers parse it straight back with json.loads. feature_collection_bytes()
+instead writes every geometry at once with shapely.to_geojson (GEOS) and
+joins the encoded features as bytes, so only the properties go through
+Python objects. feature_collection() parses that once with orjson.
+
+The output matches GeoDataFrame.to_json(): FeatureCollection features carry
+the index as a string "id", the chosen columns as "properties" (NaN as
+null) and the geometry. Results are shared through the callers' caches
+(cached_builder), so treat the returned dicts as read-only.
+
+    python benchmarks.py geojson
+"""
+
+import json
+
+import numpy as np
+import shapely
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(value):
+    """Compact JSON bytes of value (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(value, default=str)
+    return json.dumps(value, separators=(",", ":"), default=str).encode()
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _property_rows(gdf, properties):
+    if properties is None:
+        properties = [c for c in gdf.columns if c != gdf.geometry.name]
+    if not properties:
+        return [b"{}"] * len(gdf)
+    columns = [gdf[c].to_numpy(dtype=object, na_value=None).tolist() for c in properties]
+    return [dumps(dict(zip(properties, values))) for values in zip(*columns)]
+
+
+def feature_collection_bytes(gdf, properties=None):
+    """UTF-8 GeoJSON FeatureCollection of gdf; properties lists the columns to keep (default all)."""
+    geometries = shapely.to_geojson(np.asarray(gdf.geometry.values, dtype=object))
+    ids = [dumps(str(i)) for i in gdf.index]
+    features = b",".join(
+        b'{"id":' + fid + b',"type":"Feature","properties":' + props
+        + b',"geometry":' + (geometry.encode() if geometry is not None else b"null") + b"}"
+        for fid, props, geometry in zip(ids, _property_rows(gdf, properties), geometries)
+    )
+    return b'{"type":"FeatureCollection","features":[' + features + b"]}"
+
+
+def feature_collection(gdf, properties=None):
+    """GeoJSON FeatureCollection dict of gdf (see feature_collection_bytes)."""
+    return loads(feature_collection_bytes(gdf, properties))
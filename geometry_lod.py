@@ -0,0 +1,146 @@
+"""
+Zoom-aware level-of-detail geometry for the EcoFoodSystems Dashboard
+
+Every polygon layer is precomputed at a few simplification levels, one per
+map zoom in LOD_ZOOMS. Level L is simplified to half a screen pixel at zoom
+L, so it is visually lossless at any zoom <= L. Map builders look up the
+zoom they are about to render (relayoutData, or their default view) with
+lod_for_zoom() and send the coarsest level that still looks identical;
+above the finest level they send the full geometry. The maps take
+relayoutData as an Input and remember the level they rendered, so a zoom
+past it sends finer geometry (is_finer()); zooming out keeps what is there,
+which stays lossless.
+
+Polygon coverages (communes, districts) are simplified with
+shapely.coverage_simplify, so shared borders stay shared and no gaps or
+slivers open between neighbours. Anything else falls back to per-geometry
+simplify(preserve_topology=True).
+"""
+
+import math
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from shapely.geometry import mapping, shape
+
+
+LOD_ZOOMS = (5, 6, 7, 8, 9, 10, 11, 12)
+
+# Plotly's mapbox maps use 512 px tiles.
+TILE_SIZE = 512
+PIXEL_TOLERANCE = 0.5
+
+# Web Mercator sphere, and the width of the world in its metres.
+EARTH_RADIUS = 6378137.0
+WORLD_METRES = 2 * math.pi * EARTH_RADIUS
+
+
+def tolerance_for_zoom(zoom, latitude=0.0):
+    """PIXEL_TOLERANCE screen pixels at zoom, in degrees, at the given latitude."""
+    degrees_per_pixel = 360.0 / (TILE_SIZE * 2 ** zoom)
+    return PIXEL_TOLERANCE * degrees_per_pixel * math.cos(math.radians(latitude))
+
+
+def to_mercator(lon, lat):
+    """EPSG:3857 x/y of lon/lat arrays (latitudes clamped to the Mercator limit)."""
+    lat = np.clip(lat, -85.05112878, 85.05112878)
+    x = np.radians(lon) * EARTH_RADIUS
+    y = np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) * EARTH_RADIUS
+    return x, y
+
+
+def from_mercator(x, y):
+    """lon/lat of EPSG:3857 x/y arrays."""
+    lon = np.degrees(np.asarray(x) / EARTH_RADIUS)
+    lat = np.degrees(2 * np.arctan(np.exp(np.asarray(y) / EARTH_RADIUS)) - np.pi / 2)
+    return lon, lat
+
+
+def lod_for_zoom(zoom):
+    """Coarsest level that is visually lossless at zoom, or None for full detail."""
+    if zoom is None:
+        return None
+    for level in LOD_ZOOMS:
+        if zoom <= level:
+            return level
+    return None
+
+
+def is_finer(level, than):
+    """Whether LOD level is more detailed than level than (None, full detail, is the finest)."""
+    if level == than:
+        return False
+    return level is None or (than is not None and level > than)
+
+
+def zoom_from_relayout(relayout_data, default):
+    """Current map zoom from a mapbox relayoutData dict, else default."""
+    if relayout_data and "mapbox.zoom" in relayout_data:
+        try:
+            return float(relayout_data["mapbox.zoom"])
+        except (TypeError, ValueError):
+            pass
+    return default
+
+
+def _is_polygon_coverage(geoms):
+    if not hasattr(shapely, "coverage_simplify"):
+        return False
+    types = shapely.get_type_id(geoms)
+    # 3 = Polygon, 6 = MultiPolygon
+    if not np.isin(types, (3, 6)).all():
+        return False
+    return len(geoms) == 1 or bool(shapely.coverage_is_valid(geoms))
+
+
+def simplify_geometries(geometries, level, coverage=None):
+    """Simplify a GeoSeries for pyramid level (a zoom); level None returns it unchanged.
+
+    coverage says whether the polygons form a valid coverage; None checks.
+    """
+    if level is None or len(geometries) == 0:
+        return geometries
+    geoms = np.asarray(geometries.values, dtype=object)
+    present = ~(shapely.is_missing(geoms) | shapely.is_empty(geoms))
+    if not present.any():
+        return geometries
+
+    # Tightest tolerance over the layer: degrees of longitude shrink towards the poles.
+    miny, maxy = geometries[present].total_bounds[[1, 3]]
+    tolerance = tolerance_for_zoom(level, max(abs(miny), abs(maxy)))
+
+    simplified = geoms.copy()
+    if coverage is None:
+        coverage = _is_polygon_coverage(geoms[present])
+    if coverage:
+        simplified[present] = shapely.coverage_simplify(geoms[present], tolerance)
+    else:
+        simplified[present] = shapely.simplify(geoms[present], tolerance, preserve_topology=True)
+    return gpd.GeoSeries(simplified, index=geometries.index, crs=geometries.crs)
+
+
+def simplify_gdf(gdf, level):
+    """Copy of gdf with its geometry simplified for level (gdf itself for None)."""
+    if level is None:
+        return gdf
+    out = gdf.copy()
+    out[out.geometry.name] = simplify_geometries(gdf.geometry, level)
+    return out
+
+
+def simplify_geojson(geojson, level):
+    """Simplify a GeoJSON FeatureCollection dict for level, keeping ids and properties."""
+    if level is None or not geojson or not geojson.get("features"):
+        return geojson
+    features = geojson["features"]
+    geometries = gpd.GeoSeries(
+        [shape(f["geometry"]) if f.get("geometry") else None for f in features], crs="EPSG:4326"
+    )
+    simplified = simplify_geometries(geometries, level)
+    out = dict(geojson)
+    out["features"] = [
+        dict(feature, geometry=mapping(geom) if geom is not None else None)
+        for feature, geom in zip(features, simplified)
+    ]
+    return out
@@ -0,0 +1,88 @@
+"""
+Boundary metadata for the EcoFoodSystems Dashboard
+
+Map callbacks need a few facts about each boundary (district, commune):
+where to centre on it, its extent and how far to zoom in. metadata_table()
+works them out once per boundary set, from the local UTM projection rather
+than from raw lon/lat degrees:
+
+    name            label column (e.g. Dist_Name, Name), if given
+    lat, lon        centroid of the projected polygon, back in EPSG:4326
+    minx .. maxy    bounding box in EPSG:4326
+    area_km2        projected area
+    zoom            zoom at which the box fills a VIEWPORT-sized map
+
+view() gives the centre and zoom that fit any subset of the rows, and
+centroid_payload() the JSON the browser-side bar-click highlight reads
+(assets/mpi_highlight.js).
+"""
+
+import numpy as np
+import pandas as pd
+
+from geometry_lod import TILE_SIZE, WORLD_METRES, to_mercator
+
+
+# Map size, in px, a suggested zoom fits a box into.
+VIEWPORT = (800, 600)
+MAX_ZOOM = 18
+
+_COLUMNS = ["name", "lat", "lon", "minx", "miny", "maxx", "maxy", "area_km2", "zoom"]
+
+
+def fit_zoom(minx, miny, maxx, maxy, viewport=VIEWPORT):
+    """Largest zoom (to 0.1) at which lon/lat boxes fit in viewport; NumPy arrays or floats."""
+    x0, y0 = to_mercator(np.asarray(minx, dtype=float), np.asarray(miny, dtype=float))
+    x1, y1 = to_mercator(np.asarray(maxx, dtype=float), np.asarray(maxy, dtype=float))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        zoom = np.log2(np.minimum(
+            viewport[0] * WORLD_METRES / (TILE_SIZE * np.abs(x1 - x0)),
+            viewport[1] * WORLD_METRES / (TILE_SIZE * np.abs(y1 - y0)),
+        ))
+    return np.floor(np.clip(np.nan_to_num(zoom, nan=MAX_ZOOM, posinf=MAX_ZOOM), 0, MAX_ZOOM) * 10) / 10
+
+
+def metadata_table(gdf, name_column=None):
+    """Metadata of every boundary in gdf, indexed like gdf (see the module docstring)."""
+    table = pd.DataFrame(index=gdf.index, columns=_COLUMNS, dtype=float)
+    table["name"] = gdf[name_column].astype(str) if name_column else gdf.index.astype(str)
+    geoms = gdf.to_crs("EPSG:4326").geometry
+    present = geoms.notna() & ~geoms.is_empty
+    if not present.any():
+        return table
+
+    geoms = geoms[present]
+    projected = geoms.to_crs(geoms.estimate_utm_crs())
+    centroids = projected.centroid.to_crs("EPSG:4326")
+    bounds = geoms.bounds
+    table.loc[present, "lat"] = centroids.y.to_numpy()
+    table.loc[present, "lon"] = centroids.x.to_numpy()
+    table.loc[present, ["minx", "miny", "maxx", "maxy"]] = bounds[["minx", "miny", "maxx", "maxy"]].to_numpy()
+    table.loc[present, "area_km2"] = projected.area.to_numpy() / 1e6
+    table.loc[present, "zoom"] = fit_zoom(bounds["minx"], bounds["miny"], bounds["maxx"], bounds["maxy"])
+    return table
+
+
+def view(table, rows=None, viewport=VIEWPORT):
+    """{"center": {lat, lon}, "zoom"} fitting the boxes of rows (index labels; default all), or None."""
+    if rows is not None:
+        table = table.loc[rows]
+    boxes = table[["minx", "miny", "maxx", "maxy"]].to_numpy(dtype=float)
+    if not np.isfinite(boxes[:, 0]).any():
+        return None
+    minx, miny = np.nanmin(boxes[:, :2], axis=0)
+    maxx, maxy = np.nanmax(boxes[:, 2:], axis=0)
+    return {
+        "center": {"lat": float((miny + maxy) / 2.0), "lon": float((minx + maxx) / 2.0)},
+        "zoom": float(fit_zoom(minx, miny, maxx, maxy, viewport)),
+    }
+
+
+def centroid_payload(table):
+    """{names, lat, lon, zoom} lists, in row order, for the browser."""
+    return {
+        "names": table["name"].tolist(),
+        "lat": [None if np.isnan(v) else round(float(v), 6) for v in table["lat"]],
+        "lon": [None if np.isnan(v) else round(float(v), 6) for v in table["lon"]],
+        "zoom": [None if np.isnan(v) else float(v) for v in table["zoom"]],
+    }
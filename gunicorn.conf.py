@@ -0,0 +1,87 @@
+"""
+Gunicorn settings for the EcoFoodSystems Dashboard
+
+    gunicorn app:server
+
+With APP_PRELOAD=1 (the default) the master process imports app.py, loads
+every dataset and warms the lru caches once (app.warm_caches), then calls
+gc.freeze() before forking. Workers share those pages copy-on-write instead
+of each re-reading and re-caching hundreds of MB. Set APP_PRELOAD=0 to fall
+back to per-worker imports.
+
+Each worker logs its RSS right after fork and again after init, so the two
+modes can be compared from the logs.
+"""
+
+import gc
+import os
+import time
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8051')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+preload_app = os.environ.get("APP_PRELOAD", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _memory_kb():
+    """VmRSS plus the shared/private split of the current process, in kB (Linux only)."""
+    memory = {}
+    for path, fields in (
+        ("/proc/self/status", ("VmRSS", "RssAnon", "RssFile")),
+        ("/proc/self/smaps_rollup", ("Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")),
+    ):
+        try:
+            with open(path) as fh:
+                for line in fh:
+                    name, _, value = line.partition(":")
+                    if name in fields:
+                        memory[name] = int(value.split()[0])
+        except OSError:
+            pass
+    return memory
+
+
+def _format_memory(memory):
+    if not memory:
+        return "RSS unavailable"
+    shared = memory.get("Shared_Clean", 0) + memory.get("Shared_Dirty", 0)
+    private = memory.get("Private_Clean", 0) + memory.get("Private_Dirty", 0)
+    return (
+        f"RSS {memory.get('VmRSS', 0) / 1024:.1f} MB "
+        f"(shared {shared / 1024:.1f} MB, private {private / 1024:.1f} MB)"
+    )
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    import app
+    import startup_trace
+
+    start = time.perf_counter()
+    app.warm_caches()
+    # Move everything allocated so far into the permanent generation so the
+    # collector never touches (and so never copies) these pages in a worker.
+    gc.freeze()
+    startup_trace.finish("warm caches")
+    server.log.info(
+        "Preloaded datasets and caches in %.2f s, froze %d objects; master %s",
+        time.perf_counter() - start, gc.get_freeze_count(), _format_memory(_memory_kb()),
+    )
+
+
+def post_fork(server, worker):
+    worker.log.info("Worker %s after fork: %s", worker.pid, _format_memory(_memory_kb()))
+
+
+def post_worker_init(worker):
+    # Threads do not survive fork, so each worker starts its own data watcher.
+    from data_reload import start_watcher
+
+    start_watcher()
+    worker.log.info("Worker %s after init: %s", worker.pid, _format_memory(_memory_kb()))
+
+
+def worker_exit(server, worker):
+    worker.log.info("Worker %s at exit: %s", worker.pid, _format_memory(_memory_kb()))
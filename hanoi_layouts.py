@@ -15,6 +15,8 @@ import json
 from config import brand_colors, header_style, kpi_card_style_2, card_style
 from shared_components import sidebar_hanoi as sidebar, city_selector
 from dashboard_components import create_nutrition_kpi_card, create_nutrition_kpi_card_hanoi
+from data_io import read_table
+from data_registry import registry
 
 
 def _red_graph_loading(children, loading_id=None):
@@ -40,8 +42,7 @@ def _red_graph_loading(children, loading_id=None):
 
 def hanoi_stakeholders_tab_layout():
     """Hà Nội stakeholders tab layout"""
-    import app as main
-    df_sh_hanoi = main.df_sh_hanoi
+    df_sh_hanoi = registry.get("hanoi", "stakeholders")
     
     return html.Div([
         city_selector(selected_city='hanoi', visible=False),  # Hidden but present for callback
@@ -344,6 +345,16 @@ def hanoi_supply_tab_layout():
     })
 
 
+_PAGE_BUTTON_STYLE = {
+    "padding": "4px 12px",
+    "backgroundColor": brand_colors['Red'],
+    "color": "white",
+    "border": "none",
+    "borderRadius": "5px",
+    "cursor": "pointer",
+}
+
+
 def hanoi_poverty_tab_layout():
     """Hà Nội poverty tab layout"""
     import app as main
@@ -390,6 +401,28 @@ def hanoi_poverty_tab_layout():
                             persistence_type='session',
                             style={"margin-bottom": "12px"}
                         ),
+                        # The bar chart shows one page of the communes ranked by the
+                        # variable (mpi_ranking.py): from the highest or lowest
+                        # value, or around a searched commune.
+                        html.Div([
+                            dcc.RadioItems(
+                                id='bar-rank-direction-hanoi',
+                                options=[{'label': 'Highest', 'value': 'top'}, {'label': 'Lowest', 'value': 'bottom'}],
+                                value='top',
+                                inline=True,
+                                inputStyle={"marginRight": "4px"},
+                                labelStyle={"marginRight": "12px"},
+                            ),
+                            dcc.Input(
+                                id='bar-search-hanoi',
+                                type='search',
+                                placeholder='Find a commune',
+                                debounce=True,
+                                style={"flex": "1 1 140px", "minWidth": 0, "padding": "4px 8px",
+                                       "border": "1px solid #ccc", "borderRadius": "5px"}
+                            ),
+                        ], style={"display": "flex", "alignItems": "center", "gap": "8px",
+                                  "flexWrap": "wrap", "margin": "0 8px 4px"}),
                         _red_graph_loading(
                             dcc.Graph(
                                 id='bar-plot-hanoi',
@@ -406,7 +439,14 @@ def hanoi_poverty_tab_layout():
                                 }
                             ),
                             loading_id="loading-bar-plot-hanoi",
-                        )
+                        ),
+                        html.Div([
+                            html.Button("‹ Previous", id='bar-page-prev-hanoi', n_clicks=0, style=_PAGE_BUTTON_STYLE),
+                            html.Span(id='bar-page-label-hanoi', style={"fontSize": "0.9em", "color": brand_colors['Brown']}),
+                            html.Button("Next ›", id='bar-page-next-hanoi', n_clicks=0, style=_PAGE_BUTTON_STYLE),
+                            dcc.Store(id='bar-page-hanoi', data=0),
+                        ], style={"display": "flex", "justifyContent": "space-between",
+                                  "alignItems": "center", "margin": "0 8px"})
                     ], style={
                         "display": "flex",
                         "flexDirection": "column",
@@ -453,13 +493,41 @@ def hanoi_poverty_tab_layout():
         # Right panel: map
         html.Div([
             _red_graph_loading(
-                dcc.Graph(
-                    id='map-hanoi',
-                    config={"displayModeBar": False, "scrollZoom": True, "responsive": True},
-                    style={"height": "100%",
-                           "width": "100%",
-                           "padding": "0",
-                           "margin": "0"}),
+                [
+                    # Figure with the geometry of the shown level (the districts,
+                    # or the district drilled into: map-hanoi-district) as
+                    # TopoJSON (map-hanoi-rendered: the level and LOD it was
+                    # sent at), the colour values of the selected variable, and
+                    # the centroids a bar click recentres on; combined into
+                    # map-hanoi in the browser (assets/mpi_highlight.js).
+                    dcc.Store(id='map-hanoi-district', data=None),
+                    dcc.Store(id='map-hanoi-rendered'),
+                    dcc.Store(id='map-hanoi-topology'),
+                    dcc.Store(id='map-hanoi-values'),
+                    dcc.Store(id='map-hanoi-centroids'),
+                    html.Div([
+                        html.Button("‹ All districts", id='map-hanoi-back', n_clicks=0, disabled=True, style=_PAGE_BUTTON_STYLE),
+                        html.Span(id='map-hanoi-level-label', style={"fontSize": "0.9em", "color": brand_colors['Brown']}),
+                    ], style={
+                        "position": "absolute",
+                        "top": "10px",
+                        "left": "10px",
+                        "zIndex": 10,
+                        "display": "flex",
+                        "alignItems": "center",
+                        "gap": "10px",
+                        "padding": "6px 10px",
+                        "backgroundColor": "rgba(255, 255, 255, 0.85)",
+                        "borderRadius": "5px",
+                    }),
+                    dcc.Graph(
+                        id='map-hanoi',
+                        config={"displayModeBar": False, "scrollZoom": True, "responsive": True},
+                        style={"height": "100%",
+                               "width": "100%",
+                               "padding": "0",
+                               "margin": "0"}),
+                ],
                 loading_id="loading-map-hanoi",
             )
         ], style={
@@ -597,8 +665,7 @@ def hanoi_affordability_tab_layout_arch():
 
 def hanoi_health_nutrition_tab_layout():
     """Hà Nội health & nutrition tab layout"""
-    import app as main
-    df_diet_2_hanoi = main.df_diet_2_hanoi
+    df_diet_2_hanoi = registry.get("hanoi", "nutrition")
     
     labels = df_diet_2_hanoi['Cat'].unique()
     
@@ -702,11 +769,11 @@ def hanoi_health_nutrition_tab_layout():
 def hanoi_affordability_tab_layout():
     """Hanoi affordability tab layout"""
     import app as main
-    outlets_geojson_files_hanoi = main.outlets_geojson_files_hanoi
-    isochrones_geojson_files_hanoi = main.isochrones_geojson_files_hanoi
+    outlets_geojson_files_hanoi = registry.get("hanoi", "outlet_files")
+    isochrones_geojson_files_hanoi = registry.get("hanoi", "isochrone_files")
     data_labels_food_env = getattr(main, 'data_labels_food_env_hanoi', getattr(main, 'data_labels_food_env', []))
     cols_food_env = getattr(main, 'cols_food_env_hanoi', getattr(main, 'cols_food_env', []))
-    df_affordability_hanoi = main.df_affordability_hanoi
+    df_affordability_hanoi = registry.get("hanoi", "affordability")
     
     return html.Div([
         city_selector(selected_city='hanoi', visible=False),  # Hidden but present for callback
@@ -839,6 +906,9 @@ def hanoi_affordability_tab_layout():
 
                 # Right panel: map, full height
                 html.Div([
+                    dcc.Store(id='affordability-map-hanoi-rendered'),
+                    # The figure, handed to the graph by assets/vector_tiles.js
+                    dcc.Store(id='affordability-map-hanoi-figure'),
                     dcc.Loading(
                         id="loading-affordability-map-hanoi",
                         parent_style={
@@ -907,8 +977,7 @@ def hanoi_affordability_tab_layout():
 
 def hanoi_sustainability_tab_layout():
     """Hanoi sustainability tab layout - mirrors the Addis sustainability page"""
-    import app as main
-    df_indicators = main.df_indicators
+    df_indicators = registry.get("addis", "sdg_indicators")
 
     display_cols = ['Dimensions', 'Components', 'Indicators', 'SDG impact area/target', 'SDG Numbers']
     df_display = df_indicators[display_cols]
@@ -1100,8 +1169,7 @@ def hanoi_sustainability_tab_layout():
 
 def hanoi_policies_tab_layout():
     """Hanoi policies tab layout"""
-    import app as main
-    df_policies = main.df_policies_hanoi
+    df_policies = registry.get("hanoi", "policies")
     
     return html.Div([
         city_selector(selected_city='hanoi', visible=False),  # Hidden but present for callback
@@ -1246,7 +1314,7 @@ def _load_resilience_metadata_df():
         "assets", "data", "hanoi", "resilience", "resilience_indicators_ref.csv"
     )
     try:
-        ref_df = pd.read_csv(metadata_path)
+        ref_df = read_table(metadata_path)
         expected_cols = {"Indicator", "Pillar", "Component", "Unit", "Source"}
         if not expected_cols.issubset(set(ref_df.columns)):
             return pd.DataFrame(columns=["Indicator", "Pillar", "Component", "Unit", "Source"])
@@ -1329,7 +1397,7 @@ def _build_temporal_pillar_section(title, csv_filename, line_color, pillar_num,
     )
 
     try:
-        df = pd.read_csv(data_path)
+        df = read_table(data_path)
     except Exception as exc:
         return dbc.Card([
             dbc.CardBody([
@@ -1456,7 +1524,7 @@ def _load_sos_data():
         "assets", "data", "hanoi", "resilience", "Resilience_SOS.csv"
     )
     try:
-        df = pd.read_csv(sos_path)
+        df = read_table(sos_path)
         res_ann = (
             df.groupby(['Year', 'Pillar'])[['Index', 'SOS', 'Residual']]
             .mean()
@@ -0,0 +1,89 @@
+"""
+Import-time report for the EcoFoodSystems Dashboard
+
+Runs a cold `import app` in a fresh interpreter with `python -X importtime`,
+prints the slowest modules by cumulative import time and checks the total
+against a budget:
+
+    python importtime.py                 # report, exit 1 if over budget
+    python importtime.py --top 40        # show more modules
+    python importtime.py --budget 3.5    # override the budget (seconds)
+
+The default budget comes from APP_IMPORT_BUDGET_S (seconds, default 5.0).
+tests/test_import_budget.py enforces the same budget under pytest.
+"""
+
+import os
+import subprocess
+import sys
+
+
+DEFAULT_BUDGET_S = float(os.environ.get("APP_IMPORT_BUDGET_S", "5.0"))
+_WALL_MARKER = "__IMPORT_WALL_S__"
+
+
+def measure(module="app"):
+    """Return (wall_seconds, rows) for a cold import; rows are (cumulative_us, self_us, name)."""
+    code = (
+        "import time; _t = time.perf_counter(); "
+        f"import {module}; "
+        f"print('{_WALL_MARKER}', time.perf_counter() - _t)"
+    )
+    env = dict(os.environ)
+    # Measure the import itself, not an eager dataset preload.
+    env.pop("PRELOAD_DATASETS", None)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    wall = None
+    for line in proc.stdout.splitlines():
+        if line.startswith(_WALL_MARKER):
+            wall = float(line.split()[1])
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        rows.append((int(parts[1]), int(parts[0]), parts[2].strip()))
+    return wall, rows
+
+
+def report(module="app", top=25, budget=DEFAULT_BUDGET_S):
+    wall, rows = measure(module)
+    print(f"{'cumulative (ms)':>15} {'self (ms)':>10}  module")
+    for cumulative, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>15.1f} {self_us / 1000:>10.1f}  {name}")
+
+    over = wall > budget
+    status = "OVER BUDGET" if over else "ok"
+    print(f"\nimport {module}: {wall:.2f} s (budget {budget:.2f} s) {status}")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    top = 25
+    budget = DEFAULT_BUDGET_S
+    module = "app"
+    while args:
+        arg = args.pop(0)
+        if arg == "--top":
+            top = int(args.pop(0))
+        elif arg == "--budget":
+            budget = float(args.pop(0))
+        elif arg in ("-h", "--help"):
+            print(__doc__)
+            sys.exit(0)
+        else:
+            module = arg
+    sys.exit(report(module, top=top, budget=budget))
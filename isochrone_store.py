@@ -0,0 +1,133 @@
+"""
+Pre-dissolved isochrone store for the EcoFoodSystems Dashboard
+
+Each outlet category has one 30-minute isochrone file holding one polygon per
+outlet (the restaurant file alone is 2 MB). The maps only ever show the union
+of the selected categories, so the store keeps one dissolved polygon per
+category, simplified to half a pixel at the finest level-of-detail zoom (see
+geometry_lod.py). Any selection then unions at most one shape per category
+instead of every outlet's polygon.
+
+The store is a GeoParquet file per isochrone folder in DATA_CACHE_DIR
+(isochrones_hanoi -> derived/isochrones_hanoi_dissolved.parquet) with the
+sha256 of every source file it was built from. Categories whose source
+changed since the build, or that are missing from the store (or every
+category, without DATA_CACHE_DIR), are dissolved on demand. The app only
+reads the store; build or refresh it offline with:
+
+    DATA_CACHE_DIR=... python isochrone_store.py build
+"""
+
+import os
+import sys
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from data_io import read_vector
+from data_manifest import cached_builder, derived_path, file_hash, write_atomic
+from data_registry import isochrones_path, isochrones_path_hanoi
+from geometry_lod import LOD_ZOOMS, tolerance_for_zoom
+
+
+STORE_SUFFIX = "_dissolved.parquet"
+ISOCHRONE_SUFFIX = "_isochrone30min.geojson"
+ISOCHRONE_DIRS = (isochrones_path, isochrones_path_hanoi)
+
+
+def store_path(isochrones_dir):
+    """Path of the store of an isochrone folder, or None without DATA_CACHE_DIR."""
+    return derived_path(os.path.basename(os.path.normpath(isochrones_dir)) + STORE_SUFFIX)
+
+
+def store_dependencies(isochrones_dir):
+    """The store, as a cached_builder dependency list (empty without DATA_CACHE_DIR)."""
+    path = store_path(isochrones_dir)
+    return [path] if path else []
+
+
+def _dissolve(path):
+    """One simplified polygon covering every isochrone in path (None if it has none)."""
+    geoms = np.asarray(read_vector(path, columns=()).geometry.values, dtype=object)
+    geoms = geoms[~(shapely.is_missing(geoms) | shapely.is_empty(geoms))]
+    if len(geoms) == 0:
+        return None
+    union = shapely.union_all(shapely.make_valid(geoms))
+    miny, maxy = shapely.bounds(union)[[1, 3]]
+    tolerance = tolerance_for_zoom(LOD_ZOOMS[-1], max(abs(miny), abs(maxy)))
+    return shapely.make_valid(shapely.simplify(union, tolerance, preserve_topology=True))
+
+
+@cached_builder(store_dependencies, maxsize=4)
+def _load_store(isochrones_dir):
+    """{filename: (source sha256, geometry)} from the store, empty if there is none."""
+    path = store_path(isochrones_dir)
+    if path is None or not os.path.exists(path):
+        return {}
+    try:
+        store = gpd.read_parquet(path)
+    except Exception as exc:
+        print(f"[WARN] Could not read isochrone store {path}: {exc}")
+        return {}
+    return {
+        filename: (sha, geom)
+        for filename, sha, geom in zip(store["filename"], store["source_sha256"], store.geometry.values)
+    }
+
+
+@cached_builder(
+    lambda isochrones_dir, filename: [os.path.join(isochrones_dir, filename)] + store_dependencies(isochrones_dir),
+    maxsize=128,
+)
+def dissolved_category(isochrones_dir, filename):
+    """Dissolved polygon of one category's isochrone file, from the store when it is current."""
+    path = os.path.join(isochrones_dir, filename)
+    stored = _load_store(isochrones_dir).get(filename)
+    if stored is not None and stored[0] == file_hash(path):
+        return stored[1]
+    if not os.path.exists(path):
+        return None
+    return _dissolve(path)
+
+
+def union_categories(isochrones_dir, filenames):
+    """Union of the dissolved polygons of the given isochrone files (None if empty)."""
+    geoms = [dissolved_category(isochrones_dir, filename) for filename in filenames]
+    geoms = [geom for geom in geoms if geom is not None and not geom.is_empty]
+    if not geoms:
+        return None
+    return shapely.union_all(geoms)
+
+
+def build_store(isochrones_dir):
+    """Dissolve every isochrone file in isochrones_dir into its store; returns the category count."""
+    filenames = sorted(f for f in os.listdir(isochrones_dir) if f.endswith(ISOCHRONE_SUFFIX))
+    rows = {"filename": [], "source_sha256": [], "geometry": []}
+    for filename in filenames:
+        path = os.path.join(isochrones_dir, filename)
+        geom = _dissolve(path)
+        if geom is None:
+            continue
+        rows["filename"].append(filename)
+        rows["source_sha256"].append(file_hash(path))
+        rows["geometry"].append(geom)
+    store = gpd.GeoDataFrame(rows, crs="EPSG:4326")
+    write_atomic(store_path(isochrones_dir), lambda path: store.to_parquet(path, index=False))
+    return len(rows["filename"])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print("usage: DATA_CACHE_DIR=... python isochrone_store.py build")
+        sys.exit(2)
+    if store_path(ISOCHRONE_DIRS[0]) is None:
+        print("[WARN] Set DATA_CACHE_DIR to the directory the stores should be built in")
+        sys.exit(2)
+
+    for folder in ISOCHRONE_DIRS:
+        if not os.path.isdir(folder):
+            print(f"[WARN] No isochrone folder at {folder}")
+            continue
+        count = build_store(folder)
+        print(f"{count:>3} categories -> {store_path(folder)}")
@@ -0,0 +1,59 @@
+"""
+District rollups of the Hanoi MPI for the EcoFoodSystems Dashboard
+
+The Hanoi MPI map opens on the 30 districts (hanoi_districts_MPI.geojson)
+and drills into one district's communes on click. Both levels are worked
+out once, at load (see the "mpi_district*" registry entries):
+
+    assign_districts()  the district holding most of each commune's area
+    rollup()            population-weighted district means of every
+                        commune variable
+
+so the two levels share one scale, and a drill-down only needs the rows of
+the communes in the clicked district (commune_rows()).
+"""
+
+import numpy as np
+import shapely
+
+
+def assign_districts(communes, districts):
+    """Row position in districts of the district covering most of each commune (-1 for none), as int32."""
+    crs = communes.estimate_utm_crs()
+    commune_geoms = communes.geometry.to_crs(crs).to_numpy()
+    district_geoms = districts.geometry.to_crs(crs).to_numpy()
+    left, right = shapely.STRtree(district_geoms).query(commune_geoms, predicate="intersects")
+    areas = shapely.area(shapely.intersection(commune_geoms[left], district_geoms[right]))
+
+    assigned = np.full(len(commune_geoms), -1, dtype=np.int32)
+    # Sorted by commune, then overlap: the last pair of each commune is its largest.
+    order = np.lexsort((areas, left))
+    order = order[areas[order] > 0]
+    last = np.r_[left[order][1:] != left[order][:-1], True] if len(order) else np.zeros(0, dtype=bool)
+    assigned[left[order][last]] = right[order][last]
+    return assigned
+
+
+def rollup(values, districts, weights, count):
+    """Weighted mean per district of each {variable: commune values}, as float32.
+
+    districts is assign_districts() output, weights the commune populations;
+    communes with a missing value or weight are left out, and districts left
+    without any weight are NaN.
+    """
+    districts = np.asarray(districts)
+    weights = np.asarray(weights, dtype=float)
+    rolled = {}
+    for variable, column in values.items():
+        column = np.asarray(column, dtype=float)
+        keep = (districts >= 0) & np.isfinite(column) & np.isfinite(weights)
+        total = np.bincount(districts[keep], weights=weights[keep], minlength=count)
+        weighted = np.bincount(districts[keep], weights=weights[keep] * column[keep], minlength=count)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rolled[variable] = np.where(total > 0, weighted / total, np.nan).astype(np.float32)
+    return rolled
+
+
+def commune_rows(assigned, district):
+    """Row positions of the communes assigned to a district (a row position in districts)."""
+    return np.flatnonzero(np.asarray(assigned) == district)
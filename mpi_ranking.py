@@ -0,0 +1,85 @@
+"""
+Ranked MPI bar views for the EcoFoodSystems Dashboard
+
+Hanoi has too many communes for one readable bar chart, so the MPI bar
+chart shows a window of PAGE_SIZE communes from a ranking: the top or the
+bottom of the list, paged, or the window around a searched commune.
+
+build_ranking() sorts every MPI variable once (at load, see the
+"mpi_ranking" registry entries); a view is then a slice of a precomputed
+order, so the bar figure has the same size whatever the commune count.
+Search ignores case and Vietnamese diacritics ("ba dinh" finds "Ba Đình").
+"""
+
+import unicodedata
+
+import numpy as np
+
+
+PAGE_SIZE = 20
+DIRECTIONS = ("top", "bottom")
+
+
+def search_key(text):
+    """Lower-case text without diacritics, for matching searches."""
+    text = str(text).replace("Đ", "D").replace("đ", "d")
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+
+def build_ranking(names, values):
+    """Ranking of features with names, for {variable: values}.
+
+    Returns {"names", "keys" (search keys), "orders": {variable: feature
+    indices from highest to lowest value, missing values left out}}.
+    """
+    orders = {}
+    for variable, column in values.items():
+        column = np.asarray(column, dtype=float)
+        present = np.flatnonzero(np.isfinite(column))
+        # Stable, so ties keep the feature order in both directions.
+        orders[variable] = present[np.argsort(-column[present], kind="stable")].astype(np.int32)
+    return {
+        "names": [str(n) for n in names],
+        "keys": [search_key(n) for n in names],
+        "orders": orders,
+    }
+
+
+def ranked(ranking, variable, direction):
+    """Feature indices of a variable in ranked order, from the top or bottom."""
+    order = ranking["orders"].get(variable)
+    if order is None:
+        return np.empty(0, dtype=np.int32)
+    return order[::-1] if direction == "bottom" else order
+
+
+def find(ranking, variable, direction, query):
+    """Position in the ranked list of the first commune matching query, or None."""
+    key = search_key(query or "")
+    if not key:
+        return None
+    order = ranked(ranking, variable, direction)
+    keys = ranking["keys"]
+    for exact in (True, False):
+        for position, feature in enumerate(order):
+            if (keys[feature] == key) if exact else (key in keys[feature]):
+                return position
+    return None
+
+
+def clamp_offset(ranking, variable, offset, size=PAGE_SIZE):
+    total = len(ranking["orders"].get(variable, ()))
+    return int(min(max(offset or 0, 0), max(total - size, 0)))
+
+
+def window(ranking, variable, direction, offset, size=PAGE_SIZE):
+    """(feature indices, ranks from 1, total) of size ranked communes from offset."""
+    order = ranked(ranking, variable, direction)
+    offset = clamp_offset(ranking, variable, offset, size)
+    features = order[offset:offset + size]
+    total = len(order)
+    positions = np.arange(offset, offset + len(features))
+    # Ranks count from the highest value in either direction.
+    ranks = total - positions if direction == "bottom" else positions + 1
+    return features, ranks, total
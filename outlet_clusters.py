@@ -0,0 +1,148 @@
+"""
+Zoom-aware outlet clustering for the EcoFoodSystems Dashboard
+
+With many outlet categories selected the maps would otherwise draw tens of
+thousands of points. Up to CLUSTER_MAX_ZOOM (OUTLET_CLUSTER_MAX_ZOOM, default
+13) outlets are aggregated on a screen-aligned grid of CLUSTER_CELL_PX pixel
+cells in Web Mercator; above it individual points are shown.
+
+The grid is fixed per zoom and shared by every category, so each category's
+clusters are precomputed once per zoom (at load, see warm) as
+(cell key, count, coordinate sums), and the clusters of any selection are
+the per-cell sums of its categories: centroid, total count and a per-category
+breakdown.
+
+Clusters feed the outlet vector tiles (vector_tiles.py) and
+
+    GET /clusters/<city>/<z>?categories=a,b&bbox=minlon,minlat,maxlon,maxlat
+
+which returns them as JSON.
+"""
+
+import os
+
+import numpy as np
+
+from data_manifest import cached_builder
+from data_registry import registry
+from geometry_lod import TILE_SIZE, WORLD_METRES, from_mercator, to_mercator
+import outlet_store
+
+
+CLUSTER_MAX_ZOOM = int(os.environ.get("OUTLET_CLUSTER_MAX_ZOOM", "13"))
+CLUSTER_CELL_PX = 64
+
+
+def cell_size(zoom):
+    """Cluster cell width at zoom, in Web Mercator metres."""
+    return WORLD_METRES / (2 ** zoom * TILE_SIZE / CLUSTER_CELL_PX)
+
+
+def _cell_keys(x, y, zoom):
+    size = cell_size(zoom)
+    cells_per_side = int(round(WORLD_METRES / size))
+    col = np.floor((x + WORLD_METRES / 2) / size).astype(np.int64)
+    row = np.floor((WORLD_METRES / 2 - y) / size).astype(np.int64)
+    return row * cells_per_side + col
+
+
+@cached_builder(lambda city, category: [outlet_store.category_path(city, category)], maxsize=128)
+def category_clusters(city, category):
+    """{zoom: (cell keys, counts, x sums, y sums)} of one outlet category, for zooms 0..CLUSTER_MAX_ZOOM."""
+    points = outlet_store.category_points(city, category)
+    if points is None:
+        return None
+    x, y = to_mercator(points[0], points[1])
+    levels = {}
+    for zoom in range(CLUSTER_MAX_ZOOM + 1):
+        keys, inverse = np.unique(_cell_keys(x, y, zoom), return_inverse=True)
+        levels[zoom] = (
+            keys,
+            np.bincount(inverse, minlength=len(keys)),
+            np.bincount(inverse, weights=x, minlength=len(keys)),
+            np.bincount(inverse, weights=y, minlength=len(keys)),
+        )
+    return levels
+
+
+def clusters(city, categories, zoom, bounds=None):
+    """Merged clusters of the categories at zoom as a dict of arrays, or None above CLUSTER_MAX_ZOOM.
+
+    Keys: x, y (Web Mercator centroid), count, and breakdown, an array of
+    per-category counts (one column per entry of "categories"). bounds is an
+    optional Web Mercator (minx, miny, maxx, maxy) filter on the centroids.
+    """
+    zoom = int(zoom)
+    if zoom > CLUSTER_MAX_ZOOM:
+        return None
+    parts = []
+    found = []
+    for category in categories:
+        levels = category_clusters(city, category)
+        if levels is not None:
+            parts.append(levels[max(zoom, 0)])
+            found.append(category)
+    if not parts:
+        return {"x": np.empty(0), "y": np.empty(0), "count": np.empty(0, dtype=np.int64),
+                "breakdown": np.empty((0, 0), dtype=np.int64), "categories": []}
+
+    keys, inverse = np.unique(np.concatenate([p[0] for p in parts]), return_inverse=True)
+    counts = np.bincount(inverse, weights=np.concatenate([p[1] for p in parts]), minlength=len(keys))
+    sum_x = np.bincount(inverse, weights=np.concatenate([p[2] for p in parts]), minlength=len(keys))
+    sum_y = np.bincount(inverse, weights=np.concatenate([p[3] for p in parts]), minlength=len(keys))
+    breakdown = np.zeros((len(keys), len(parts)), dtype=np.int64)
+    offset = 0
+    for column, part in enumerate(parts):
+        breakdown[inverse[offset:offset + len(part[0])], column] = part[1]
+        offset += len(part[0])
+
+    x, y = sum_x / counts, sum_y / counts
+    if bounds is not None:
+        minx, miny, maxx, maxy = bounds
+        keep = (x >= minx) & (x <= maxx) & (y >= miny) & (y <= maxy)
+        x, y, counts, breakdown = x[keep], y[keep], counts[keep], breakdown[keep]
+    return {"x": x, "y": y, "count": counts.astype(np.int64), "breakdown": breakdown, "categories": found}
+
+
+def warm(city):
+    """Precompute every category's clusters for a city."""
+    for filename in registry.get(city, "outlet_files"):
+        category_clusters(city, os.path.splitext(filename)[0])
+
+
+def register_cluster_routes(server):
+    from flask import abort, jsonify, request
+
+    @server.route("/clusters/<city>/<int:z>")
+    def outlet_clusters(city, z):
+        if city not in outlet_store.OUTLET_DIRS or not 0 <= z <= 22:
+            abort(404)
+        categories = [c for c in request.args.get("categories", "").split(",") if c]
+        if any(os.sep in c or c.startswith(".") for c in categories):
+            abort(400)
+        bounds = None
+        if request.args.get("bbox"):
+            try:
+                minlon, minlat, maxlon, maxlat = (float(v) for v in request.args["bbox"].split(","))
+            except ValueError:
+                abort(400)
+            bounds = to_mercator(np.array([minlon, maxlon]), np.array([minlat, maxlat]))
+            bounds = (bounds[0][0], bounds[1][0], bounds[0][1], bounds[1][1])
+        result = clusters(city, categories, z, bounds)
+        if result is None:
+            return jsonify({"clustered": False, "max_zoom": CLUSTER_MAX_ZOOM, "clusters": []})
+        lon, lat = from_mercator(result["x"], result["y"])
+        names = result["categories"]
+        return jsonify({
+            "clustered": True,
+            "max_zoom": CLUSTER_MAX_ZOOM,
+            "clusters": [
+                {
+                    "lon": round(float(lo), 6),
+                    "lat": round(float(la), 6),
+                    "count": int(count),
+                    "categories": {names[i]: int(n) for i, n in enumerate(row) if n},
+                }
+                for lo, la, count, row in zip(lon, lat, result["count"], result["breakdown"])
+            ],
+        })
@@ -0,0 +1,102 @@
+"""
+Columnar outlet store for the EcoFoodSystems Dashboard
+
+Outlets ship as one GeoJSON file per category (about 30 per city). The
+store consolidates a city's outlets into one table of NumPy columns:
+
+    lon, lat       float64 coordinates
+    category       int16 code, an index into "categories"
+    source_id      the outlet's id in its source file
+
+in the order of the city's outlet_files. A selection of categories is a
+boolean mask over that table (select()), so the map draws any selection as
+one trace coloured by category code, and the tile and cluster layers read
+their points from here instead of re-reading the files.
+"""
+
+import os
+
+import numpy as np
+
+from data_io import read_vector
+from data_manifest import cached_builder
+from data_registry import registry, outlets_path, outlets_path_hanoi
+
+
+OUTLET_DIRS = {"addis": outlets_path, "hanoi": outlets_path_hanoi}
+
+
+def category_name(filename):
+    """Store category of an outlet file name (its stem)."""
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+def category_path(city, category):
+    """Source file of an outlet category (a file stem)."""
+    return os.path.join(OUTLET_DIRS[city], category + ".geojson")
+
+
+def sources(city):
+    """Files a city's outlet store is built from."""
+    folder = OUTLET_DIRS[city]
+    return [folder] + [os.path.join(folder, f) for f in registry.get(city, "outlet_files")]
+
+
+@cached_builder(sources, maxsize=2, persist=True)
+def load_outlets(city):
+    """All outlets of a city as a dict of columns (see the module docstring)."""
+    folder = OUTLET_DIRS[city]
+    categories, lon, lat, codes, source_ids = [], [], [], [], []
+    for filename in registry.get(city, "outlet_files"):
+        if not filename.endswith(".geojson"):
+            continue
+        try:
+            gdf = read_vector(os.path.join(folder, filename), columns=["id"])
+        except Exception as exc:
+            print(f"[WARN] Could not read outlet layer {filename}: {exc}")
+            continue
+        geoms = gdf.geometry
+        gdf = gdf[geoms.notna() & ~geoms.is_empty]
+        code = len(categories)
+        categories.append(category_name(filename))
+        lon.append(gdf.geometry.x.to_numpy(dtype=float))
+        lat.append(gdf.geometry.y.to_numpy(dtype=float))
+        codes.append(np.full(len(gdf), code, dtype=np.int16))
+        ids = gdf["id"].to_numpy() if "id" in gdf.columns else np.arange(len(gdf))
+        source_ids.append(np.asarray(ids, dtype=np.int64))
+
+    def column(parts, dtype):
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    return {
+        "categories": np.asarray(categories),
+        "lon": column(lon, float),
+        "lat": column(lat, float),
+        "category": column(codes, np.int16),
+        "source_id": column(source_ids, np.int64),
+    }
+
+
+def category_codes(city, categories):
+    """Store codes of categories (outlet file names or stems), skipping unknown ones."""
+    lookup = {name: code for code, name in enumerate(load_outlets(city)["categories"].tolist())}
+    codes = [lookup.get(category_name(c)) for c in categories]
+    return [code for code in codes if code is not None]
+
+
+def category_points(city, category):
+    """(lon, lat, source ids) of one category's outlets, or None for an unknown category."""
+    codes = category_codes(city, [category])
+    if not codes:
+        return None
+    store = load_outlets(city)
+    mask = store["category"] == codes[0]
+    return store["lon"][mask], store["lat"][mask], store["source_id"][mask]
+
+
+def select(city, categories):
+    """Boolean mask of the outlets in any of the categories."""
+    store = load_outlets(city)
+    wanted = np.zeros(len(store["categories"]), dtype=bool)
+    wanted[category_codes(city, categories)] = True
+    return wanted[store["category"]]
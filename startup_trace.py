@@ -0,0 +1,141 @@
+"""
+Opt-in startup tracer for the EcoFoodSystems Dashboard
+
+Set STARTUP_TRACE=1 to record a span for every import phase, dataset read,
+dataset load/transform and layout build during boot. At the end of boot
+app.py calls finish(), which writes a JSON timeline (STARTUP_TRACE_FILE,
+default startup_trace.json next to app.py) and prints a summary sorted by
+duration. With tracing off every helper here is a no-op.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+
+ENABLED = os.environ.get("STARTUP_TRACE", "").strip().lower() in ("1", "true", "yes", "on")
+TRACE_FILE = os.environ.get(
+    "STARTUP_TRACE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_trace.json"),
+)
+
+# Spans keep being recorded after boot (lazy loads, gunicorn warm-up); cap
+# them so a long-running traced worker does not grow without bound.
+MAX_SPANS = 10000
+
+_t0 = time.perf_counter()
+_spans = []
+_spans_lock = threading.Lock()
+_local = threading.local()
+_last_checkpoint = [_t0]
+
+
+def _record(name, start, end, parent=None, depth=0, children_s=0.0, **attrs):
+    span = {
+        "name": name,
+        "start_s": round(start - _t0, 6),
+        "duration_s": round(end - start, 6),
+        "self_s": round(max(end - start - children_s, 0.0), 6),
+        "thread": threading.current_thread().name,
+        "parent": parent,
+        "depth": depth,
+    }
+    if attrs:
+        span["attrs"] = attrs
+    with _spans_lock:
+        if len(_spans) < MAX_SPANS:
+            _spans.append(span)
+    return span
+
+
+@contextmanager
+def _span(name, **attrs):
+    stack = _local.__dict__.setdefault("stack", [])
+    frame = {"name": name, "children_s": 0.0}
+    parent = stack[-1]["name"] if stack else None
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        stack.pop()
+        if stack:
+            stack[-1]["children_s"] += end - start
+        _record(name, start, end, parent=parent, depth=len(stack), children_s=frame["children_s"], **attrs)
+
+
+def add_span(name, start, **attrs):
+    """Record a span that started at start (perf_counter) and ends now, nested in the current span."""
+    if not ENABLED:
+        return
+    end = time.perf_counter()
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1]["children_s"] += end - start
+    _record(name, start, end, parent=stack[-1]["name"] if stack else None, depth=len(stack or ()), **attrs)
+
+
+def span(name, **attrs):
+    """Context manager timing one load or transform."""
+    return _span(name, **attrs) if ENABLED else nullcontext()
+
+
+def traced(name=None):
+    """Decorator form of span(); defaults to the function name."""
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def checkpoint(name):
+    """Record the module-level stretch since the previous checkpoint (imports, setup, ...)."""
+    if not ENABLED:
+        return
+    now = time.perf_counter()
+    _record(name, _last_checkpoint[0], now)
+    _last_checkpoint[0] = now
+
+
+def summary(limit=40):
+    with _spans_lock:
+        spans = sorted(_spans, key=lambda s: -s["duration_s"])
+    lines = [f"{'total (ms)':>11} {'self (ms)':>10} {'start (ms)':>11}  span"]
+    for s in spans[:limit]:
+        lines.append(
+            f"{s['duration_s'] * 1000:>11.1f} {s['self_s'] * 1000:>10.1f} "
+            f"{s['start_s'] * 1000:>11.1f}  {'  ' * s['depth']}{s['name']}"
+        )
+    return "\n".join(lines)
+
+
+def finish(label="boot"):
+    """Write the JSON timeline and print the summary; safe to call more than once."""
+    if not ENABLED:
+        return
+    checkpoint(label)
+    with _spans_lock:
+        spans = sorted(_spans, key=lambda s: s["start_s"])
+    timeline = {
+        "pid": os.getpid(),
+        "total_s": round(time.perf_counter() - _t0, 6),
+        "spans": spans,
+    }
+    try:
+        with open(TRACE_FILE, "w") as fh:
+            json.dump(timeline, fh, indent=1)
+    except OSError as exc:
+        print(f"[WARN] Could not write startup trace {TRACE_FILE}: {exc}")
+    print(f"Startup trace ({timeline['total_s']:.2f} s) written to {TRACE_FILE}")
+    print(summary())
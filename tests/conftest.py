@@ -0,0 +1,6 @@
+"""Put the dashboard's top-level modules on sys.path for the tests."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,35 @@
+"""Argument handling and dependency keys of cached_builder (data_manifest.py)."""
+
+from data_manifest import cached_builder
+
+
+def test_defaults_and_keywords_share_one_entry(tmp_path):
+    source = tmp_path / "source.csv"
+    source.write_text("a\n1\n")
+    calls = []
+
+    @cached_builder(lambda city, layer=None: [str(source)])
+    def build(city, layer=None):
+        calls.append((city, layer))
+        return f"{city}/{layer}"
+
+    assert build("hanoi") == "hanoi/None"
+    assert build("hanoi", None) == "hanoi/None"
+    assert build(city="hanoi", layer=None) == "hanoi/None"
+    assert build("hanoi", layer="boundaries") == "hanoi/boundaries"
+    assert calls == [("hanoi", None), ("hanoi", "boundaries")]
+    assert build.cache_info().hits == 2
+
+
+def test_a_changed_dependency_rebuilds(tmp_path):
+    source = tmp_path / "source.csv"
+    source.write_text("a\n1\n")
+
+    @cached_builder([str(source)])
+    def build():
+        return source.read_text()
+
+    assert build() == "a\n1\n"
+    source.write_text("a\n22\n")
+    assert build() == "a\n22\n"
+    assert build.invalidate_stale() == 1
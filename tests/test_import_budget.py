@@ -0,0 +1,12 @@
+"""Cold `import app` must stay within APP_IMPORT_BUDGET_S (see importtime.py)."""
+
+import importtime
+
+
+def test_app_import_within_budget():
+    wall, rows = importtime.measure("app")
+    slowest = sorted(rows, reverse=True)[:10]
+    detail = "\n".join(f"{cumulative / 1000:8.1f} ms  {name}" for cumulative, _, name in slowest)
+    assert wall <= importtime.DEFAULT_BUDGET_S, (
+        f"import app took {wall:.2f} s, over the {importtime.DEFAULT_BUDGET_S:.2f} s budget; slowest:\n{detail}"
+    )
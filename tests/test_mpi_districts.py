@@ -0,0 +1,51 @@
+"""Commune -> district assignment and population-weighted rollups (mpi_districts.py)."""
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import box
+
+from mpi_districts import assign_districts, commune_rows, rollup
+
+
+def _frame(geoms):
+    return gpd.GeoDataFrame(geometry=geoms, crs="EPSG:4326")
+
+
+def test_assign_districts_by_largest_overlap():
+    # Two districts side by side around Hanoi, split at lon 105.8
+    districts = _frame([box(105.7, 21.0, 105.8, 21.1), box(105.8, 21.0, 105.9, 21.1)])
+    communes = _frame([
+        box(105.71, 21.01, 105.75, 21.05),  # inside the first
+        box(105.78, 21.01, 105.81, 21.05),  # straddles, mostly in the first
+        box(105.79, 21.06, 105.88, 21.09),  # straddles, mostly in the second
+        box(106.5, 21.5, 106.6, 21.6),  # outside both
+    ])
+    assigned = assign_districts(communes, districts)
+    assert assigned.dtype == np.int32
+    assert assigned.tolist() == [0, 0, 1, -1]
+    assert commune_rows(assigned, 0).tolist() == [0, 1]
+    assert commune_rows(assigned, 1).tolist() == [2]
+
+
+def test_rollup_is_population_weighted():
+    districts = [0, 0, 1, 1, -1]
+    weights = [100, 300, 50, 50, 1000]
+    rolled = rollup({"MPI": [0.2, 0.6, 0.1, 0.3, 0.9]}, districts, weights, count=3)
+    assert rolled["MPI"].dtype == np.float32
+    # (0.2 * 100 + 0.6 * 300) / 400 and (0.1 + 0.3) / 2; district 2 has no communes
+    assert np.allclose(rolled["MPI"][:2], [0.5, 0.2])
+    assert np.isnan(rolled["MPI"][2])
+
+
+def test_rollup_skips_missing_values_and_weights():
+    districts = [0, 0, 0, 1]
+    rolled = rollup(
+        {"MPI": [0.4, np.nan, 0.8, 0.5], "Assets": [1.0, 2.0, 3.0, np.nan]},
+        districts,
+        [10, 10, np.nan, 5],
+        count=2,
+    )
+    # Only the first commune has both a value and a weight in district 0
+    assert np.allclose(rolled["MPI"], [0.4, 0.5])
+    assert np.isclose(rolled["Assets"][0], 1.5)
+    assert np.isnan(rolled["Assets"][1])
@@ -0,0 +1,53 @@
+"""Ranked MPI windows and commune search (mpi_ranking.py)."""
+
+import numpy as np
+
+from mpi_ranking import build_ranking, clamp_offset, find, ranked, search_key, window
+
+
+NAMES = ["Ba Đình", "Hoàn Kiếm", "Tây Hồ", "Long Biên", "Cầu Giấy", "Đống Đa"]
+VALUES = {"MPI": [0.3, 0.1, np.nan, 0.5, 0.1, 0.2]}
+
+
+def test_search_key_folds_case_and_diacritics():
+    assert search_key("Ba Đình") == "ba dinh"
+    assert search_key("  ĐỐNG Đa ") == "dong da"
+
+
+def test_orders_skip_missing_values_and_keep_ties_stable():
+    ranking = build_ranking(NAMES, VALUES)
+    # Long Biên, Ba Đình, Đống Đa, then the tie Hoàn Kiếm / Cầu Giấy in feature order
+    assert ranking["orders"]["MPI"].tolist() == [3, 0, 5, 1, 4]
+    assert ranked(ranking, "MPI", "bottom").tolist() == [4, 1, 5, 0, 3]
+    assert len(ranked(ranking, "unknown", "top")) == 0
+
+
+def test_window_pages_and_ranks():
+    ranking = build_ranking(NAMES, VALUES)
+    features, ranks, total = window(ranking, "MPI", "top", 0, size=2)
+    assert (features.tolist(), ranks.tolist(), total) == ([3, 0], [1, 2], 5)
+    features, ranks, _ = window(ranking, "MPI", "top", 2, size=2)
+    assert (features.tolist(), ranks.tolist()) == ([5, 1], [3, 4])
+    # Ranks count from the highest value from the bottom too.
+    features, ranks, _ = window(ranking, "MPI", "bottom", 0, size=2)
+    assert (features.tolist(), ranks.tolist()) == ([4, 1], [5, 4])
+
+
+def test_offsets_are_clamped_to_a_full_page():
+    ranking = build_ranking(NAMES, VALUES)
+    assert clamp_offset(ranking, "MPI", -3, size=2) == 0
+    assert clamp_offset(ranking, "MPI", 10, size=2) == 3
+    assert clamp_offset(ranking, "MPI", None, size=2) == 0
+    assert clamp_offset(ranking, "MPI", 4, size=20) == 0
+    features, ranks, _ = window(ranking, "MPI", "top", 99, size=2)
+    assert (features.tolist(), ranks.tolist()) == ([1, 4], [4, 5])
+
+
+def test_find_prefers_exact_matches():
+    ranking = build_ranking(NAMES + ["Ba Đình Mới"], {"MPI": VALUES["MPI"] + [0.9]})
+    # "ba dinh moi" ranks first, but "ba dinh" matches Ba Đình exactly.
+    assert find(ranking, "MPI", "top", "BA DINH") == 2
+    assert find(ranking, "MPI", "top", "moi") == 0
+    assert find(ranking, "MPI", "bottom", "dong") == 2
+    assert find(ranking, "MPI", "top", "Tây Hồ") is None  # no value
+    assert find(ranking, "MPI", "top", "") is None
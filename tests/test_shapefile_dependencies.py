@@ -0,0 +1,53 @@
+"""Shapefile component files (.dbf, .shx, ...) as dependencies of reads and sidecars (data_io.py)."""
+
+import os
+
+import geopandas as gpd
+from shapely.geometry import Point
+
+import data_io
+from data_io import read_vector, source_files
+from data_registry import DatasetRegistry
+
+
+def _write_shapefile(folder, population):
+    path = os.path.join(folder, "communes.shp")
+    gpd.GeoDataFrame({"dan_so": [population]}, geometry=[Point(105.8, 21.0)], crs="EPSG:4326").to_file(path)
+    return path
+
+
+def test_source_files_lists_the_shapefile_components(tmp_path):
+    path = _write_shapefile(str(tmp_path), 100)
+    parts = {os.path.splitext(p)[1] for p in source_files(path)}
+    assert {".shp", ".dbf", ".shx", ".prj"} <= parts
+    assert source_files("communes.geojson") == ["communes.geojson"]
+
+
+def test_attribute_only_edit_makes_the_entry_stale(tmp_path):
+    path = _write_shapefile(str(tmp_path), 100)
+    registry = DatasetRegistry()
+
+    @registry.loader("test", "communes")
+    def _load():
+        return read_vector(path)
+
+    assert registry.get("test", "communes")["dan_so"].tolist() == [100]
+    shp = open(path, "rb").read()
+    _write_shapefile(str(tmp_path), 250)
+    # Same geometry: only the .dbf changed
+    assert open(path, "rb").read() == shp
+
+    stale, changed = registry.stale_keys()
+    assert ("test", "communes") in stale
+    assert os.path.abspath(os.path.join(str(tmp_path), "communes.dbf")) in changed
+
+
+def test_sidecar_goes_stale_when_only_the_dbf_changes(tmp_path):
+    path = _write_shapefile(str(tmp_path), 100)
+    data_io.write_vector_sidecar(read_vector(path), path)
+    assert data_io._fresh_sidecar(path) is not None
+
+    dbf = os.path.join(str(tmp_path), "communes.dbf")
+    later = os.path.getmtime(data_io.sidecar_path(path)) + 10
+    os.utime(dbf, (later, later))
+    assert data_io._fresh_sidecar(path) is None
@@ -0,0 +1,98 @@
+"""encode_topology() / decode_topology() round trips (topojson_codec.py)."""
+
+import numpy as np
+import pytest
+
+from topojson_codec import decode_topology, encode_topology
+
+
+def _square(x, y, size=1.0):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+
+
+def _collection(*geometries, **properties):
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "id": i, "properties": {"name": f"f{i}", **properties}, "geometry": geometry}
+            for i, geometry in enumerate(geometries)
+        ],
+    }
+
+
+def _assert_ring_close(decoded, original, tolerance):
+    decoded, original = np.asarray(decoded), np.asarray(original)
+    assert decoded.shape[1] == 2
+    assert tuple(decoded[0]) == pytest.approx(tuple(decoded[-1]))
+    # Arc cutting may start the ring at another vertex: compare vertex sets.
+    for point in original:
+        assert np.min(np.abs(decoded - point).max(axis=1)) <= tolerance
+
+
+def test_round_trip_within_half_a_grid_cell():
+    left = {"type": "Polygon", "coordinates": [_square(105.0, 21.0, 0.5)]}
+    right = {"type": "Polygon", "coordinates": [_square(105.5, 21.0, 0.5)]}
+    topology = encode_topology({"communes": _collection(left, right)}, quantization=1000)
+
+    half_cell = max(topology["transform"]["scale"]) / 2
+    decoded = decode_topology(topology, "communes")
+    assert [f["id"] for f in decoded["features"]] == [0, 1]
+    assert [f["properties"]["name"] for f in decoded["features"]] == ["f0", "f1"]
+    for feature, original in zip(decoded["features"], (left, right)):
+        assert feature["geometry"]["type"] == "Polygon"
+        _assert_ring_close(feature["geometry"]["coordinates"][0], original["coordinates"][0], half_cell + 1e-12)
+
+
+def test_shared_border_is_stored_once():
+    left = {"type": "Polygon", "coordinates": [_square(0, 0)]}
+    right = {"type": "Polygon", "coordinates": [_square(1, 0)]}
+    topology = encode_topology({"layer": _collection(left, right)})
+
+    refs = [ref for entry in topology["objects"]["layer"]["geometries"] for ring in entry["arcs"] for ref in ring]
+    shared = [ref for ref in refs if ref < 0]
+    # The second square walks the shared edge backwards (~index).
+    assert len(shared) == 1 and ~shared[0] in refs
+    assert len(topology["arcs"]) == 3
+
+
+def test_arcs_are_delta_encoded_integers():
+    topology = encode_topology({"layer": _collection({"type": "Polygon", "coordinates": [_square(10, 20, 2)]})},
+                               quantization=11)
+    (arc,) = topology["arcs"]
+    assert all(isinstance(v, int) for point in arc for v in point)
+    absolute = np.cumsum(arc, axis=0)
+    assert absolute.min() == 0 and absolute.max() == 10
+    assert topology["transform"]["translate"] == [10.0, 20.0]
+
+
+def test_multipolygon_and_lines():
+    multi = {"type": "MultiPolygon", "coordinates": [[_square(0, 0)], [_square(3, 3)]]}
+    line = {"type": "LineString", "coordinates": [[0, 0], [1, 2], [2, 0]]}
+    topology = encode_topology({"polys": _collection(multi), "lines": _collection(line)}, quantization=1001)
+
+    polygon = decode_topology(topology, "polys")["features"][0]["geometry"]
+    assert polygon["type"] == "MultiPolygon" and len(polygon["coordinates"]) == 2
+    decoded_line = decode_topology(topology, "lines")["features"][0]["geometry"]
+    assert decoded_line["type"] == "LineString"
+    assert np.allclose(decoded_line["coordinates"], line["coordinates"], atol=max(topology["transform"]["scale"]))
+
+
+def test_properties_filter_and_key():
+    collection = _collection({"type": "Polygon", "coordinates": [_square(0, 0)]}, extra=1)
+    topology = encode_topology({"layer": collection}, properties=["name"])
+    assert topology["objects"]["layer"]["geometries"][0]["properties"] == {"name": "f0"}
+    # The key only depends on the content, so the browser can skip re-decoding.
+    assert topology["key"] == encode_topology({"layer": collection}, properties=["name"])["key"]
+    assert topology["key"] != encode_topology({"layer": collection})["key"]
+
+
+def test_sliver_collapses_to_null_geometry():
+    sliver = {"type": "Polygon", "coordinates": [[[0, 0], [1e-9, 0], [0, 1e-9], [0, 0]]]}
+    big = {"type": "Polygon", "coordinates": [_square(0, 0, 100)]}
+    topology = encode_topology({"layer": _collection(big, sliver)}, quantization=100)
+    assert decode_topology(topology, "layer")["features"][1]["geometry"] is None
+
+
+def test_points_are_rejected():
+    with pytest.raises(ValueError):
+        encode_topology({"layer": _collection({"type": "Point", "coordinates": [0, 0]})})
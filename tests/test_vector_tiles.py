@@ -0,0 +1,76 @@
+"""MVT encoding (vector_tiles.py) against the Mapbox Vector Tile 2.1 spec examples."""
+
+from shapely.geometry import LineString, MultiPoint, Point, Polygon
+
+from vector_tiles import _command, _geometry_commands, _varint, _zigzag, encode_tile, tile_url
+
+
+def test_zigzag():
+    assert [_zigzag(v) for v in (0, -1, 1, -2, 2)] == [0, 1, 2, 3, 4]
+    assert _zigzag(2 ** 31 - 1) == 2 ** 32 - 2
+    assert _zigzag(-(2 ** 31)) == 2 ** 32 - 1
+
+
+def test_varint():
+    assert _varint(1) == b"\x01"
+    assert _varint(300) == b"\xac\x02"
+    assert _varint(4096) == b"\x80\x20"
+
+
+def test_command_integers():
+    assert _command(1, 1) == 9  # MoveTo(1)
+    assert _command(2, 3) == 26  # LineTo(3)
+    assert _command(7, 1) == 15  # ClosePath
+
+
+def test_geometry_commands_match_spec_examples():
+    assert _geometry_commands(Point(25, 17)) == (1, [9, 50, 34])
+    assert _geometry_commands(MultiPoint([(5, 7), (3, 2)])) == (1, [17, 10, 14, 3, 9])
+    assert _geometry_commands(LineString([(2, 2), (2, 10), (10, 10)])) == (2, [9, 4, 4, 18, 0, 16, 16, 0])
+    assert _geometry_commands(Polygon([(3, 6), (8, 12), (20, 34), (3, 6)])) == (3, [9, 6, 12, 18, 10, 12, 24, 44, 15])
+
+
+def test_polygon_winding_is_fixed():
+    # The same ring given the other way round comes out as an exterior ring.
+    assert _geometry_commands(Polygon([(3, 6), (20, 34), (8, 12), (3, 6)])) == (3, [9, 6, 12, 18, 10, 12, 24, 44, 15])
+
+
+def test_encode_tile_known_bytes():
+    feature = bytes([
+        0x08, 0x01,  # id 1
+        0x12, 0x02, 0x00, 0x00,  # tags: key 0, value 0
+        0x18, 0x01,  # type POINT
+        0x22, 0x03, 0x09, 0x32, 0x22,  # geometry MoveTo(25, 17)
+    ])
+    layer = (
+        bytes([0x78, 0x02])  # version 2
+        + bytes([0x0A, 0x06]) + b"points"
+        + bytes([0x12, len(feature)]) + feature
+        + bytes([0x1A, 0x04]) + b"name"
+        + bytes([0x22, 0x03, 0x0A, 0x01]) + b"a"  # string value
+        + bytes([0x28, 0x80, 0x20])  # extent 4096
+    )
+    expected = bytes([0x1A, len(layer)]) + layer
+    assert encode_tile([("points", [(1, Point(25, 17), {"name": "a"})])]) == expected
+
+
+def test_empty_layers_are_dropped():
+    assert encode_tile([("points", [])]) == b""
+
+
+def test_tile_url_is_root_relative_under_the_prefix():
+    url = tile_url("hanoi", "boundaries")
+    assert url.startswith("/tiles/hanoi/boundaries/{z}/{x}/{y}.pbf?v=")
+    url = tile_url("addis", "isochrones", ["b", "a"], prefix="/dash/")
+    assert url.startswith("/dash/tiles/addis/isochrones/{z}/{x}/{y}.pbf?v=")
+    assert url.endswith("&categories=b,a")
+
+
+def test_tile_url_version_follows_the_data(monkeypatch):
+    import vector_tiles
+
+    before = tile_url("addis", "isochrones", ["a", "b"])
+    # Category order does not change the version
+    assert before.split("&")[0] == tile_url("addis", "isochrones", ["b", "a"]).split("&")[0]
+    monkeypatch.setattr(vector_tiles, "loaded_hash", lambda path: "changed")
+    assert tile_url("addis", "isochrones", ["a", "b"]) != before
@@ -0,0 +1,284 @@
+"""
+Quantized TopoJSON transport for the EcoFoodSystems Dashboard
+
+Commune and district boundary sets share almost every edge, and GeoJSON
+stores each shared border twice at full float precision. encode_topology()
+turns GeoJSON FeatureCollections into one TopoJSON Topology: coordinates are
+snapped to an integer grid (quantization), rings are cut into arcs at the
+points where neighbouring polygons meet, every shared arc is stored once,
+and arcs are delta-encoded.
+
+figure_payload() ships a figure with its choropleth geometry as a topology;
+assets/topojson_decode.js rebuilds the GeoJSON in the browser
+(dash_clientside.topojson.figure) before Plotly draws it.
+
+    python benchmarks.py topojson
+"""
+
+import hashlib
+import json
+
+import numpy as np
+
+
+DEFAULT_QUANTIZATION = 100000
+
+_POLYGONAL = ("Polygon", "MultiPolygon")
+_LINEAR = ("LineString", "MultiLineString")
+
+
+def _polygons(geometry):
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    return geometry["coordinates"]
+
+
+def _lines(geometry):
+    if geometry["type"] == "LineString":
+        return [geometry["coordinates"]]
+    return geometry["coordinates"]
+
+
+def _bbox(layers):
+    mins, maxs = [], []
+    for collection in layers.values():
+        for feature in collection.get("features", []):
+            geometry = feature.get("geometry")
+            if not geometry or geometry["type"] not in _POLYGONAL + _LINEAR:
+                # Unsupported types are rejected by encode_topology().
+                continue
+            parts = _polygons(geometry) if geometry["type"] in _POLYGONAL else [_lines(geometry)]
+            for part in parts:
+                for ring in part:
+                    coords = np.asarray(ring, dtype=float)[:, :2]
+                    mins.append(coords.min(axis=0))
+                    maxs.append(coords.max(axis=0))
+    if not mins:
+        return None
+    return np.min(mins, axis=0), np.max(maxs, axis=0)
+
+
+class _ArcBuilder:
+    """Collects quantized rings and lines, then cuts and deduplicates arcs."""
+
+    def __init__(self, origin, scale):
+        self.origin = origin
+        self.scale = scale
+        self.paths = []  # (points as list of (x, y), closed)
+        self.first_neighbours = {}
+        self.junctions = set()
+
+    def add(self, coords, closed):
+        """Index of the new path, or None for a ring that collapsed on the grid."""
+        quantized = np.rint((np.asarray(coords, dtype=float)[:, :2] - self.origin) / self.scale).astype(np.int64)
+        # Snapping can collapse neighbouring vertices onto one grid point.
+        keep = np.ones(len(quantized), dtype=bool)
+        keep[1:] = np.any(quantized[1:] != quantized[:-1], axis=1)
+        points = [tuple(p) for p in quantized[keep].tolist()]
+        if closed and len(points) > 1 and points[0] != points[-1]:
+            points.append(points[0])
+        if closed and len(points) < 4:
+            # Slivers thinner than the grid collapse; drop them like topojson does.
+            return None
+        index = len(self.paths)
+        self.paths.append((points, closed))
+        self._visit(points, closed)
+        return index
+
+    def _visit(self, points, closed):
+        n = len(points) - 1 if closed else len(points)
+        if n <= 0:
+            return
+        if not closed:
+            # Line ends always start or end an arc.
+            self.junctions.add(points[0])
+            self.junctions.add(points[-1])
+        for i in range(n):
+            if closed:
+                prev, nxt = points[i - 1 if i else n - 1], points[i + 1]
+            else:
+                if i == 0 or i == n - 1:
+                    continue
+                prev, nxt = points[i - 1], points[i + 1]
+            point = points[i]
+            first = self.first_neighbours.get(point)
+            if first is None:
+                self.first_neighbours[point] = (prev, nxt)
+            elif first != (prev, nxt) and first != (nxt, prev):
+                self.junctions.add(point)
+
+    def cut(self):
+        """Arcs (delta-encoded) and, per path, the list of arc indexes."""
+        arcs, arc_index, path_arcs = [], {}, []
+        for points, closed in self.paths:
+            pieces = self._split(points, closed)
+            refs = []
+            for piece in pieces:
+                key = tuple(piece)
+                if key in arc_index:
+                    refs.append(arc_index[key])
+                    continue
+                reverse = key[::-1]
+                if reverse in arc_index:
+                    refs.append(~arc_index[reverse])
+                    continue
+                arc_index[key] = len(arcs)
+                refs.append(len(arcs))
+                arcs.append(piece)
+            path_arcs.append(refs)
+        encoded = []
+        for piece in arcs:
+            points = np.asarray(piece, dtype=np.int64)
+            points[1:] = np.diff(points, axis=0)
+            encoded.append(points.tolist())
+        return encoded, path_arcs
+
+    def _split(self, points, closed):
+        if len(points) < 2:
+            # Collapsed to a single grid point by quantization.
+            return [[points[0], points[0]]] if points else []
+        if closed:
+            ring = points[:-1]
+            starts = [i for i, p in enumerate(ring) if p in self.junctions]
+            if not starts:
+                # A ring touching nothing: start it at its smallest point so the
+                # same ring traced by another feature (or reversed) dedupes.
+                start = min(range(len(ring)), key=ring.__getitem__)
+                rotated = ring[start:] + ring[:start]
+                return [rotated + [rotated[0]]]
+            rotated = ring[starts[0]:] + ring[:starts[0]]
+            rotated.append(rotated[0])
+            cuts = [i for i, p in enumerate(rotated) if p in self.junctions and 0 < i]
+        else:
+            rotated = points
+            cuts = [i for i, p in enumerate(rotated) if p in self.junctions and 0 < i < len(points) - 1]
+            cuts.append(len(points) - 1)
+        pieces, start = [], 0
+        for cut in cuts:
+            pieces.append(rotated[start:cut + 1])
+            start = cut
+        return pieces
+
+
+def encode_topology(layers, quantization=DEFAULT_QUANTIZATION, properties=None):
+    """Quantized TopoJSON Topology of {object name: GeoJSON FeatureCollection dict}.
+
+    properties limits which feature properties are kept (None keeps all);
+    feature ids are always kept. Only (Multi)Polygon and (Multi)LineString
+    geometries are supported.
+    """
+    bounds = _bbox(layers)
+    if bounds is None:
+        origin, extent = np.zeros(2), np.ones(2)
+    else:
+        origin, extent = bounds[0], bounds[1] - bounds[0]
+    scale = np.where(extent > 0, extent / (quantization - 1), 1.0)
+
+    builder = _ArcBuilder(origin, scale)
+    pending = {}
+    for name, collection in layers.items():
+        geometries = []
+        for feature in collection.get("features", []):
+            geometry = feature.get("geometry")
+            entry = {"type": geometry["type"] if geometry else None}
+            if geometry:
+                if geometry["type"] in _POLYGONAL:
+                    polygons = []
+                    for polygon in _polygons(geometry):
+                        rings = [builder.add(ring, True) for ring in polygon]
+                        if rings and rings[0] is not None:
+                            polygons.append([ring for ring in rings if ring is not None])
+                    entry["paths"] = polygons
+                    if not polygons:
+                        entry["type"] = None
+                elif geometry["type"] in _LINEAR:
+                    entry["paths"] = [builder.add(line, False) for line in _lines(geometry)]
+                else:
+                    raise ValueError(f"TopoJSON encoding does not support {geometry['type']} geometries")
+            if "id" in feature:
+                entry["id"] = feature["id"]
+            props = feature.get("properties") or {}
+            if properties is not None:
+                props = {k: props[k] for k in properties if k in props}
+            if props:
+                entry["properties"] = props
+            geometries.append(entry)
+        pending[name] = geometries
+
+    arcs, path_arcs = builder.cut()
+    objects = {}
+    for name, geometries in pending.items():
+        for entry in geometries:
+            paths = entry.pop("paths", None)
+            if entry["type"] == "Polygon":
+                entry["arcs"] = [path_arcs[i] for i in paths[0]]
+            elif entry["type"] == "MultiPolygon":
+                entry["arcs"] = [[path_arcs[i] for i in polygon] for polygon in paths]
+            elif entry["type"] == "LineString":
+                entry["arcs"] = path_arcs[paths[0]]
+            elif entry["type"] == "MultiLineString":
+                entry["arcs"] = [path_arcs[i] for i in paths]
+        objects[name] = {"type": "GeometryCollection", "geometries": geometries}
+
+    topology = {
+        "type": "Topology",
+        "transform": {"scale": scale.tolist(), "translate": origin.tolist()},
+        "objects": objects,
+        "arcs": arcs,
+    }
+    # Lets the browser skip decoding a topology it has already decoded.
+    topology["key"] = hashlib.sha1(json.dumps(topology, separators=(",", ":")).encode()).hexdigest()[:16]
+    return topology
+
+
+def decode_topology(topology, name):
+    """GeoJSON FeatureCollection of one object; the Python twin of topojson_decode.js."""
+    scale = topology["transform"]["scale"]
+    translate = topology["transform"]["translate"]
+    decoded = []
+    for arc in topology["arcs"]:
+        points = np.cumsum(np.asarray(arc, dtype=np.int64), axis=0) * scale + translate
+        decoded.append(points.tolist())
+
+    def path(refs):
+        coords = []
+        for ref in refs:
+            points = decoded[ref] if ref >= 0 else decoded[~ref][::-1]
+            coords.extend(points[1:] if coords else points)
+        return coords
+
+    features = []
+    for entry in topology["objects"][name]["geometries"]:
+        kind = entry.get("type")
+        if kind == "Polygon":
+            geometry = {"type": kind, "coordinates": [path(ring) for ring in entry["arcs"]]}
+        elif kind == "MultiPolygon":
+            geometry = {"type": kind, "coordinates": [[path(ring) for ring in polygon] for polygon in entry["arcs"]]}
+        elif kind == "LineString":
+            geometry = {"type": kind, "coordinates": path(entry["arcs"])}
+        elif kind == "MultiLineString":
+            geometry = {"type": kind, "coordinates": [path(line) for line in entry["arcs"]]}
+        else:
+            geometry = None
+        feature = {"type": "Feature", "properties": entry.get("properties", {}), "geometry": geometry}
+        if "id" in entry:
+            feature["id"] = entry["id"]
+        features.append(feature)
+    return {"type": "FeatureCollection", "features": features}
+
+
+def figure_payload(fig, topology, objects):
+    """Figure dict plus topology for dash_clientside.topojson.figure.
+
+    objects maps trace index -> topology object name; those traces are sent
+    without their geojson, which the browser decodes from the topology.
+    """
+    figure = fig.to_plotly_json() if hasattr(fig, "to_plotly_json") else dict(fig)
+    data = [dict(trace) for trace in figure.get("data", [])]
+    for index in objects:
+        data[index].pop("geojson", None)
+    return {
+        "figure": {"data": data, "layout": figure.get("layout", {})},
+        "topology": topology,
+        "objects": {str(index): name for index, name in objects.items()},
+    }
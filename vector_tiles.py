@@ -0,0 +1,434 @@
+"""
+Mapbox Vector Tiles for the EcoFoodSystems Dashboard
+
+Serves the food-environment layers as MVT tiles cut on demand, so a map only
+downloads the outlets, isochrones and boundaries inside its viewport at its
+current zoom instead of every selected feature in one figure response.
+
+    GET /tiles/<city>/outlets/<z>/<x>/<y>.pbf?categories=shop_bakery_hanoi
+    GET /tiles/<city>/isochrones/<z>/<x>/<y>.pbf?categories=a,b,...
+    GET /tiles/<city>/boundaries/<z>/<x>/<y>.pbf
+
+categories are outlet file stems (as in the outlet selector). Outlet tiles
+hold one MVT layer per category: its clusters (with a "count" property) up
+to outlet_clusters.CLUSTER_MAX_ZOOM, the outlets themselves above it.
+Isochrone tiles hold the union of the selected categories as one
+"isochrones" layer, so overlapping polygons do not stack their opacity;
+boundary tiles hold the food-environment polygons.
+
+Each source layer is projected to Web Mercator once and indexed with an
+STRtree; each tile is clipped, simplified to half a pixel and snapped to the
+tile grid. Tiles are kept in an LRU cache (TILE_CACHE_SIZE, default 4096)
+keyed by the source files' content hashes, and tile URLs carry a digest of
+the same files, so a data reload never serves stale tiles. MAP_VECTOR_TILES=0 makes the maps fall back to figure traces.
+
+The encoder writes the MVT protobuf directly and needs no extra dependency.
+"""
+
+import os
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from data_manifest import cached_builder, dependency_digest, loaded_hash
+from data_registry import (
+    registry, outlets_path, isochrones_path, outlets_path_hanoi, isochrones_path_hanoi,
+    food_env_path, food_env_path_hanoi, food_env_values_path_hanoi,
+)
+from geometry_lod import PIXEL_TOLERANCE, TILE_SIZE, WORLD_METRES, to_mercator
+from isochrone_store import dissolved_category
+import outlet_store
+from outlet_clusters import CLUSTER_MAX_ZOOM, clusters
+
+
+ENABLED = os.environ.get("MAP_VECTOR_TILES", "1").strip().lower() not in ("0", "false", "no", "off")
+TILE_CACHE_SIZE = int(os.environ.get("TILE_CACHE_SIZE", "4096"))
+
+EXTENT = 4096
+# Features are clipped a little beyond the tile so strokes and markers on the
+# edge are not cut off.
+BUFFER = 64
+MAX_ZOOM = 20
+CONTENT_TYPE = "application/vnd.mapbox-vector-tile"
+
+_DIRS = {
+    "addis": {"outlets": outlets_path, "isochrones": isochrones_path},
+    "hanoi": {"outlets": outlets_path_hanoi, "isochrones": isochrones_path_hanoi},
+}
+_BOUNDARY_DEPS = {
+    "addis": [food_env_path],
+    "hanoi": [food_env_path_hanoi, food_env_values_path_hanoi],
+}
+_BOUNDARY_LABELS = ["Dist_Name", "Dist_name", "shapeName", "district", "name", "ma_xa"]
+LAYERS = ("outlets", "isochrones", "boundaries")
+
+
+# -------------------------- Sources ------------------------- #
+
+def _category_path(city, layer, category):
+    suffix = "_isochrone30min.geojson" if layer == "isochrones" else ".geojson"
+    return os.path.join(_DIRS[city][layer], category + suffix)
+
+
+def _source_deps(city, layer, category=None):
+    if layer == "boundaries":
+        return _BOUNDARY_DEPS.get(city, [])
+    return [_category_path(city, layer, category)]
+
+
+def _project(geoms):
+    return shapely.transform(geoms, lambda xy: np.column_stack(to_mercator(xy[:, 0], xy[:, 1])))
+
+
+@cached_builder(_source_deps, maxsize=128)
+def _get_source(city, layer, category=None):
+    """(Web Mercator geometries, properties per feature, STRtree) for one source layer."""
+    if layer == "boundaries":
+        gdf = registry.get(city, "food_env")
+        if gdf is None:
+            return None
+        label = next((c for c in _BOUNDARY_LABELS if c in gdf.columns), None)
+        properties = [
+            {"id": str(index), "name": str(name)}
+            for index, name in zip(gdf.index, gdf[label] if label else gdf.index)
+        ]
+    elif layer == "isochrones":
+        # One pre-dissolved catchment per category (see isochrone_store.py):
+        # tiles then union a few clipped shapes, not every outlet's isochrone.
+        geom = dissolved_category(_DIRS[city][layer], os.path.basename(_category_path(city, layer, category)))
+        if geom is None:
+            return None
+        gdf = gpd.GeoDataFrame({"geometry": [geom]}, crs="EPSG:4326")
+        properties = [{}]
+    else:
+        # Points come from the city's columnar outlet store (outlet_store.py).
+        points = outlet_store.category_points(city, category)
+        if points is None:
+            return None
+        lon, lat, source_ids = points
+        gdf = gpd.GeoDataFrame(geometry=gpd.points_from_xy(lon, lat), crs="EPSG:4326")
+        properties = [{"id": int(i)} for i in source_ids]
+
+    geoms = np.asarray(gdf.to_crs("EPSG:4326").geometry.values, dtype=object)
+    present = ~(shapely.is_missing(geoms) | shapely.is_empty(geoms))
+    geoms = _project(geoms[present])
+    properties = [p for p, keep in zip(properties, present) if keep]
+    return geoms, properties, shapely.STRtree(geoms)
+
+
+def warm_sources(city):
+    """Load and index every source layer of a city ahead of the first tile."""
+    _get_source(city, "boundaries")
+    for filename in registry.get(city, "outlet_files"):
+        category = os.path.splitext(filename)[0]
+        _get_source(city, "outlets", category)
+        _get_source(city, "isochrones", category)
+
+
+# -------------------------- Tile cutting ------------------------- #
+
+def tile_bounds(z, x, y):
+    """Web Mercator (minx, miny, maxx, maxy) of tile z/x/y."""
+    size = WORLD_METRES / 2 ** z
+    minx = -WORLD_METRES / 2 + x * size
+    maxy = WORLD_METRES / 2 - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+def _to_tile_coords(geoms, z, x, y):
+    minx, _, _, maxy = tile_bounds(z, x, y)
+    scale = EXTENT / (WORLD_METRES / 2 ** z)
+    return shapely.transform(
+        geoms, lambda xy: np.column_stack(((xy[:, 0] - minx) * scale, (maxy - xy[:, 1]) * scale))
+    )
+
+
+def _cut(geoms, z, x, y, polygonal):
+    """Clip geoms to the buffered tile and snap them to the tile grid; None for empties."""
+    minx, miny, maxx, maxy = tile_bounds(z, x, y)
+    pad = (maxx - minx) * BUFFER / EXTENT
+    clipped = shapely.clip_by_rect(geoms, minx - pad, miny - pad, maxx + pad, maxy + pad)
+    local = _to_tile_coords(clipped, z, x, y)
+    if polygonal:
+        local = shapely.simplify(local, PIXEL_TOLERANCE * EXTENT / TILE_SIZE, preserve_topology=True)
+    snapped = shapely.set_precision(local, 1.0)
+    return [None if g is None or g.is_empty else g for g in snapped]
+
+
+def _query(source, z, x, y):
+    minx, miny, maxx, maxy = tile_bounds(z, x, y)
+    pad = (maxx - minx) * BUFFER / EXTENT
+    box = shapely.box(minx - pad, miny - pad, maxx + pad, maxy + pad)
+    return np.sort(source[2].query(box, predicate="intersects"))
+
+
+def _cluster_layer(city, category, z, x, y):
+    minx, miny, maxx, maxy = tile_bounds(z, x, y)
+    pad = (maxx - minx) * BUFFER / EXTENT
+    found = clusters(city, [category], z, (minx - pad, miny - pad, maxx + pad, maxy + pad))
+    if not found or len(found["count"]) == 0:
+        return None
+    points = _to_tile_coords(shapely.points(found["x"], found["y"]), z, x, y)
+    points = shapely.set_precision(points, 1.0)
+    return [(i, point, {"count": int(count)}) for i, (point, count) in enumerate(zip(points, found["count"]))]
+
+
+def _outlet_layer(city, category, z, x, y):
+    if z <= CLUSTER_MAX_ZOOM:
+        return _cluster_layer(city, category, z, x, y)
+    source = _get_source(city, "outlets", category)
+    if source is None:
+        return None
+    hits = _query(source, z, x, y)
+    if len(hits) == 0:
+        return None
+    geoms = _cut(source[0][hits], z, x, y, polygonal=False)
+    return [(int(i), g, source[1][i]) for i, g in zip(hits, geoms) if g is not None]
+
+
+def _isochrone_layer(city, categories, z, x, y):
+    minx, miny, maxx, maxy = tile_bounds(z, x, y)
+    pad = (maxx - minx) * BUFFER / EXTENT
+    parts = []
+    for category in categories:
+        source = _get_source(city, "isochrones", category)
+        if source is None:
+            continue
+        hits = _query(source, z, x, y)
+        if len(hits):
+            parts.append(shapely.clip_by_rect(source[0][hits], minx - pad, miny - pad, maxx + pad, maxy + pad))
+    if not parts:
+        return None
+    union = shapely.union_all(np.concatenate(parts))
+    geoms = _cut(np.array([union], dtype=object), z, x, y, polygonal=True)
+    return [(0, g, {}) for g in geoms if g is not None]
+
+
+def _boundary_layer(city, z, x, y):
+    source = _get_source(city, "boundaries")
+    if source is None:
+        return None
+    hits = _query(source, z, x, y)
+    if len(hits) == 0:
+        return None
+    geoms = _cut(source[0][hits], z, x, y, polygonal=True)
+    return [(int(i), g, source[1][i]) for i, g in zip(hits, geoms) if g is not None]
+
+
+def _tile_deps(city, layer, categories, z, x, y):
+    if layer == "boundaries":
+        return _source_deps(city, layer)
+    return [_category_path(city, layer, category) for category in categories]
+
+
+@cached_builder(_tile_deps, maxsize=TILE_CACHE_SIZE)
+def get_tile(city, layer, categories, z, x, y):
+    """Encoded MVT bytes of one tile; categories is a tuple of outlet file stems."""
+    layers = []
+    if layer == "outlets":
+        for category in categories:
+            features = _outlet_layer(city, category, z, x, y)
+            if features:
+                layers.append((category, features))
+    elif layer == "isochrones":
+        features = _isochrone_layer(city, categories, z, x, y)
+        if features:
+            layers.append(("isochrones", features))
+    elif layer == "boundaries":
+        features = _boundary_layer(city, z, x, y)
+        if features:
+            layers.append(("boundaries", features))
+    return encode_tile(layers)
+
+
+# -------------------------- MVT encoding ------------------------- #
+# Tile, Layer, Feature and Value messages of the Mapbox Vector Tile 2.1
+# spec, written as protobuf wire format by hand.
+
+_POINT, _LINESTRING, _POLYGON = 1, 2, 3
+_MOVE_TO, _LINE_TO, _CLOSE_PATH = 1, 2, 7
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _field(number, wire_type):
+    return _varint((number << 3) | wire_type)
+
+
+def _bytes_field(number, payload):
+    return _field(number, 2) + _varint(len(payload)) + payload
+
+
+def _packed(number, values):
+    return _bytes_field(number, b"".join(_varint(v) for v in values))
+
+
+def _command(command_id, count):
+    return (command_id & 0x7) | (count << 3)
+
+
+def _encode_value(value):
+    if isinstance(value, bool):
+        return _field(7, 0) + _varint(int(value))
+    if isinstance(value, (int, np.integer)):
+        value = int(value)
+        if value >= 0:
+            return _field(5, 0) + _varint(value)
+        return _field(6, 0) + _varint(_zigzag(value))
+    if isinstance(value, (float, np.floating)):
+        return _field(3, 1) + np.float64(value).astype("<f8").tobytes()
+    return _bytes_field(1, str(value).encode("utf-8"))
+
+
+class _Cursor:
+    """Delta-encodes command parameters against the previous point."""
+
+    def __init__(self):
+        self.x = 0
+        self.y = 0
+        self.commands = []
+
+    def points(self, coords):
+        for px, py in coords:
+            px, py = int(px), int(py)
+            self.commands.append(_zigzag(px - self.x))
+            self.commands.append(_zigzag(py - self.y))
+            self.x, self.y = px, py
+
+    def path(self, coords, closed):
+        if closed:
+            coords = coords[:-1]
+        self.commands.append(_command(_MOVE_TO, 1))
+        self.points(coords[:1])
+        self.commands.append(_command(_LINE_TO, len(coords) - 1))
+        self.points(coords[1:])
+        if closed:
+            self.commands.append(_command(_CLOSE_PATH, 1))
+
+
+def _ring_area(coords):
+    """Surveyor's formula in tile coordinates (positive = exterior for MVT)."""
+    xy = np.asarray(coords, dtype=float)
+    return 0.5 * float(np.sum(xy[:-1, 0] * xy[1:, 1] - xy[1:, 0] * xy[:-1, 1]))
+
+
+def _geometry_commands(geom):
+    """(MVT geometry type, command integers) for a shapely geometry in tile coordinates."""
+    cursor = _Cursor()
+    kind = geom.geom_type
+    if kind in ("Point", "MultiPoint"):
+        coords = shapely.get_coordinates(geom)
+        cursor.commands.append(_command(_MOVE_TO, len(coords)))
+        cursor.points(coords)
+        return _POINT, cursor.commands
+    if kind in ("LineString", "MultiLineString"):
+        for line in getattr(geom, "geoms", [geom]):
+            coords = shapely.get_coordinates(line)
+            if len(coords) >= 2:
+                cursor.path(coords, closed=False)
+        return _LINESTRING, cursor.commands
+    if kind in ("Polygon", "MultiPolygon"):
+        for polygon in getattr(geom, "geoms", [geom]):
+            for ring_index, ring in enumerate([polygon.exterior, *polygon.interiors]):
+                coords = shapely.get_coordinates(ring)
+                if len(coords) < 4:
+                    continue
+                # Exterior rings wind clockwise on screen (positive area), holes the other way.
+                if (_ring_area(coords) > 0) != (ring_index == 0):
+                    coords = coords[::-1]
+                cursor.path(coords, closed=True)
+        return _POLYGON, cursor.commands
+    if kind == "GeometryCollection":
+        # Clipping can leave stray points/lines next to a polygon; keep the polygons.
+        polygons = [g for g in geom.geoms if g.geom_type in ("Polygon", "MultiPolygon")]
+        if polygons:
+            return _geometry_commands(shapely.multipolygons(
+                [p for g in polygons for p in getattr(g, "geoms", [g])]
+            ))
+    return None, []
+
+
+def encode_tile(layers):
+    """MVT bytes for [(layer name, [(feature id, tile-coordinate geometry, properties)])]."""
+    tile = bytearray()
+    for name, features in layers:
+        keys, values = {}, {}
+        encoded_features = bytearray()
+        for feature_id, geom, properties in features:
+            geom_type, commands = _geometry_commands(geom)
+            if not commands:
+                continue
+            tags = []
+            for key, value in properties.items():
+                tags.append(keys.setdefault(key, len(keys)))
+                tags.append(values.setdefault((type(value).__name__, value), len(values)))
+            feature = _field(1, 0) + _varint(feature_id)
+            if tags:
+                feature += _packed(2, tags)
+            feature += _field(3, 0) + _varint(geom_type) + _packed(4, commands)
+            encoded_features += _bytes_field(2, feature)
+        if not encoded_features:
+            continue
+        layer = bytearray(_field(15, 0) + _varint(2) + _bytes_field(1, name.encode("utf-8")))
+        layer += encoded_features
+        for key in keys:
+            layer += _bytes_field(3, key.encode("utf-8"))
+        for _, value in values:
+            layer += _bytes_field(4, _encode_value(value))
+        layer += _field(5, 0) + _varint(EXTENT)
+        tile += _bytes_field(3, bytes(layer))
+    return bytes(tile)
+
+
+# -------------------------- Routes ------------------------- #
+
+def tile_url(city, layer, categories=(), prefix="/"):
+    """Root-relative tile URL template for a mapbox layer source.
+
+    prefix is the app's requests_pathname_prefix. mapbox-gl fetches tiles in
+    a web worker that cannot resolve relative URLs, so the browser makes the
+    URL absolute against the page (assets/vector_tiles.js). v is a digest of
+    the source files, so the URL changes with the data and browsers never
+    reuse tiles cached for an older version.
+    """
+    deps = [os.path.abspath(p) for p in _tile_deps(city, layer, tuple(sorted(categories)), 0, 0, 0)]
+    path = f"{prefix}tiles/{city}/{layer}/{{z}}/{{x}}/{{y}}.pbf?v={dependency_digest(deps, loaded_hash)[:16]}"
+    if categories:
+        path += "&categories=" + ",".join(categories)
+    return path
+
+
+def register_tile_routes(server):
+    from flask import abort, request
+
+    @server.route("/tiles/<city>/<layer>/<int:z>/<int:x>/<int:y>.pbf")
+    def vector_tile(city, layer, z, x, y):
+        if city not in _DIRS or layer not in LAYERS or not 0 <= z <= MAX_ZOOM:
+            abort(404)
+        if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            abort(404)
+        categories = tuple(sorted(c for c in request.args.get("categories", "").split(",") if c))
+        if layer != "boundaries" and not categories:
+            abort(400)
+        if any(os.sep in c or c.startswith(".") for c in categories):
+            abort(400)
+        response = server.response_class(get_tile(city, layer, categories, z, x, y), mimetype=CONTENT_TYPE)
+        # The URL carries the data version (tile_url), so the browser can
+        # reuse tiles across selections and page loads for a while.
+        response.headers["Cache-Control"] = "private, max-age=3600"
+        return response